@@ -1,3 +1,5 @@
-from .database import DatabaseManager
+from .database import DatabaseManager, QueryError
+from .duckdb_backend import DuckDBManager
+from .registry import ConnectionRegistry, create_database_manager
 
-__all__ = ["DatabaseManager"]
\ No newline at end of file
+__all__ = ["DatabaseManager", "DuckDBManager", "QueryError", "ConnectionRegistry", "create_database_manager"]
@@ -1,17 +1,91 @@
-from sqlalchemy import create_engine, text, inspect, Engine
+from sqlalchemy import create_engine, text, make_url, Connection, Engine, URL
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from fastapi import HTTPException
-from typing import Optional
-import logging
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, TypeVar
+import asyncio
+import hashlib
+import importlib.util
 import json
-from datetime import datetime, date, time
+import logging
+import math
+from app.core.config import settings
+from app.core.state import StateStoreError, state_store
+from app.core.tracing import span, record_cache, RESULT_ROWS
+from .result_cache import result_cache, analyze_sql, encode_columns, decode_columns
+from .schema_catalog import SchemaCatalog
+from .schema_profile import SchemaProfile, profile_schema
+from .serialization import RowSerializer
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# State store namespace for schema catalogs, keyed by `cache_key`
+SCHEMA_CATALOGS = "schema"
+
+# Async driver used for each backend when the URL doesn't name a driver explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+}
+
+# Server-side per-statement timeout for each backend that has one
+STATEMENT_TIMEOUTS = {
+    "postgresql": "SET LOCAL statement_timeout = {ms}",
+    "mysql": "SET SESSION MAX_EXECUTION_TIME = {ms}",
+    "mariadb": "SET SESSION max_statement_time = {seconds}",
+}
+
+
+class QueryError(HTTPException):
+    """
+    A statement the database (or the SQL validator) rejected. `error` is the underlying
+    message without the response prefix, suitable for feeding back to the LLM.
+    """
+
+    def __init__(self, detail: str, error: str, status_code: int = 400):
+        super().__init__(status_code=status_code, detail=detail)
+        self.error = error
+
+
+def backend_name(connection: Connection) -> str:
+    """Dialect name, telling MariaDB apart from MySQL (SQLAlchemy reports both as "mysql")."""
+    if getattr(connection.dialect, "is_mariadb", False):
+        return "mariadb"
+    return connection.dialect.name
+
+_sync_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_sync_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool shared by every connection that has to use a sync driver."""
+    global _sync_executor
+    if _sync_executor is None:
+        _sync_executor = ThreadPoolExecutor(
+            max_workers=settings.DB_THREAD_POOL_SIZE, thread_name_prefix="db-sync"
+        )
+    return _sync_executor
+
+
 class DatabaseManager:
-    def __init__(self, db_url: str):
+    # Whether `stream_record_batches` yields Arrow batches straight from the engine
+    native_arrow = False
+
+    def __init__(self, db_url: str, result_cache_ttl: Optional[float] = None):
         self.db_url = db_url
+        # Identifies this database in the shared result cache without keeping credentials in keys
+        self.cache_key = hashlib.sha256(db_url.encode("utf-8")).hexdigest()
+        self.result_cache_ttl = settings.RESULT_CACHE_TTL_SECONDS if result_cache_ttl is None else result_cache_ttl
+        # With an async driver `engine` is the async engine's sync facade (used for dialect info)
         self.engine: Optional[Engine] = None
+        self.async_engine: Optional[AsyncEngine] = None
+        self._schema_lock = asyncio.Lock()
+        self.schema_catalog = SchemaCatalog(ttl_seconds=settings.SCHEMA_CACHE_TTL_SECONDS)
+        self.schema_profile: Optional[SchemaProfile] = None
+        self._profile_task: Optional[asyncio.Task] = None
 
     def _sanitize_db_url(self, db_url: str) -> str:
         """
@@ -42,13 +116,133 @@ class DatabaseManager:
             logger.warning(f"Failed to sanitize database URL: {e}. Using original URL.")
             return db_url
 
+    def _engine_options(self, url: URL) -> dict:
+        options = {
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        }
+        # SQLite uses single-connection/static pools that don't accept sizing arguments
+        if url.get_backend_name() != "sqlite":
+            options.update(
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            )
+        return options
+
+    def _async_url(self, url: URL) -> Optional[URL]:
+        """
+        Return the URL rewritten for an installed async driver, or None if the
+        sync driver has to be used.
+        """
+        if not settings.DB_ASYNC_DRIVERS_ENABLED:
+            return None
+        backend, _, driver = url.drivername.partition("+")
+        if driver:
+            # An explicitly requested driver is honoured as-is
+            return url if driver in ASYNC_DRIVERS.values() else None
+        async_driver = ASYNC_DRIVERS.get(backend)
+        if async_driver is None or importlib.util.find_spec(async_driver) is None:
+            return None
+        async_url = url.set(drivername=f"{backend}+{async_driver}")
+        if async_driver == "asyncpg":
+            # asyncpg takes `ssl` instead of libpq's `sslmode` and has no channel_binding option
+            query = dict(async_url.query)
+            if "sslmode" in query:
+                query["ssl"] = query.pop("sslmode")
+            query.pop("channel_binding", None)
+            async_url = async_url.set(query=query)
+        return async_url
+
+    def _create_engines(self, db_url: str):
+        url = make_url(db_url)
+        async_url = self._async_url(url)
+        if async_url is not None:
+            self.async_engine = create_async_engine(async_url, **self._engine_options(async_url))
+            self.engine = self.async_engine.sync_engine
+        else:
+            self.async_engine = None
+            self.engine = create_engine(url, **self._engine_options(url))
+
+    async def _dispose_engines(self):
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        elif self.engine is not None:
+            self.engine.dispose()
+        self.async_engine = None
+        self.engine = None
+
+    @property
+    def connected(self) -> bool:
+        return self.engine is not None
+
+    @property
+    def is_async(self) -> bool:
+        return self.async_engine is not None
+
+    @property
+    def dialect_name(self) -> Optional[str]:
+        return self.engine.dialect.name if self.engine is not None else None
+
+    def pool_status(self) -> Dict[str, Any]:
+        """Connection pool occupancy, for metrics."""
+        if self.engine is None:
+            return {"connected": False}
+        pool = self.engine.pool
+        status: Dict[str, Any] = {"connected": True, "async_driver": self.is_async}
+        # Not every pool class (e.g. SQLite's StaticPool) tracks all of these
+        for key, method in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+            if hasattr(pool, method):
+                status[key] = getattr(pool, method)()
+        return status
+
+    async def run_sync(self, fn: Callable[[Connection], T]) -> T:
+        """
+        Run `fn` with a pooled sync-style Connection without blocking the event loop.
+
+        With an async driver the function runs on the loop through SQLAlchemy's greenlet
+        bridge, so every database round-trip is awaited. Sync drivers run the function in
+        a bounded thread pool shared by all connections.
+        """
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as connection:
+                return await connection.run_sync(fn)
+        if self.engine is None:
+            raise HTTPException(status_code=400, detail="Not connected to a database.")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_sync_executor(), self._run_on_sync_engine, fn)
+
+    def _run_on_sync_engine(self, fn: Callable[[Connection], T]) -> T:
+        with self.engine.connect() as connection:
+            return fn(connection)
+
+    def _apply_statement_timeout(self, connection: Connection):
+        """Bound how long the next statements on `connection` may run, where the backend supports it."""
+        timeout = settings.QUERY_STATEMENT_TIMEOUT_SECONDS
+        template = STATEMENT_TIMEOUTS.get(backend_name(connection))
+        if not timeout or template is None:
+            return
+        connection.execute(text(template.format(ms=int(timeout * 1000), seconds=timeout)))
+
+    async def _ping(self):
+        await self.run_sync(lambda connection: connection.execute(text("SELECT 1")))
+
     async def connect(self):
         try:
             # First, try with the original URL
-            self.engine = create_engine(self.db_url)
-            with self.engine.connect() as connection:
-                connection.execute(text("SELECT 1"))
-            logger.info(f"Successfully connected to database: {self.db_url}")
+            self._create_engines(self.db_url)
+            try:
+                await self._ping()
+            except Exception as async_e:
+                if not self.is_async:
+                    raise
+                # The async driver may not support every option in the URL; use the sync driver instead
+                logger.warning(f"Async driver connection failed ({async_e}); falling back to sync driver")
+                await self._dispose_engines()
+                self.engine = create_engine(self.db_url, **self._engine_options(make_url(self.db_url)))
+                await self._ping()
+            logger.info(f"Successfully connected to database: {self.db_url} (async driver: {self.is_async})")
+            self._schedule_profile()
             return True
         except Exception as e:
             logger.warning(f"Initial connection failed: {e}")
@@ -60,72 +254,347 @@ class DatabaseManager:
                     logger.info("Retrying connection with sanitized URL (removed channel_binding)")
                     
                     # Dispose of the previous engine if it exists
-                    if self.engine:
-                        self.engine.dispose()
+                    await self._dispose_engines()
                     
-                    self.engine = create_engine(sanitized_url)
-                    with self.engine.connect() as connection:
-                        connection.execute(text("SELECT 1"))
+                    self._create_engines(sanitized_url)
+                    await self._ping()
                     logger.info(f"Successfully connected to database with sanitized URL")
+                    self._schedule_profile()
                     return True
                 except Exception as retry_e:
                     logger.error(f"Failed to connect with sanitized URL: {retry_e}")
                     raise HTTPException(status_code=400, detail=f"Database connection failed: {retry_e}")
             else:
+                await self._dispose_engines()
                 logger.error(f"Failed to connect to database {self.db_url}: {e}")
                 raise HTTPException(status_code=400, detail=f"Database connection failed: {e}")
 
     async def disconnect(self):
+        if self._profile_task is not None:
+            task, self._profile_task = self._profile_task, None
+            task.cancel()
+            # Let the run hand back its connection before the engine goes away under it
+            await asyncio.gather(task, return_exceptions=True)
         if self.engine:
-            self.engine.dispose()
+            await self._dispose_engines()
+            self.schema_catalog.clear()
+            self.schema_profile = None
             logger.info(f"Disconnected from database: {self.db_url}")
 
-    async def fetch_schema(self):
-        if not self.engine:
+    @property
+    def schema_fingerprint(self) -> Optional[str]:
+        return self.schema_catalog.fingerprint
+
+    @property
+    def schema_relations(self) -> Dict[str, List[str]]:
+        return self.schema_catalog.relations
+
+    @property
+    def schema_comments(self) -> Dict[str, str]:
+        return self.schema_catalog.comments
+
+    async def fetch_schema(self, force_refresh: bool = False):
+        if not self.connected:
             raise HTTPException(status_code=400, detail="Not connected to a database.")
 
+        if not force_refresh and self.schema_catalog.is_fresh():
+            self._schedule_profile()
+            return self.schema_catalog.tables
         try:
-            with self.engine.connect() as connection:
-                inspector = inspect(self.engine)
-                tables = inspector.get_table_names()
-                schema = {}
-                for table_name in tables:
-                    columns = [col['name'] for col in inspector.get_columns(table_name)]
-                    schema[table_name] = columns
-                logger.info(f"Fetched schema for {self.db_url}: {schema}")
-                return schema
+            with span("db.schema") as stage:
+                async with self._schema_lock:
+                    # Another request may have refreshed the catalog while we waited for the lock
+                    if not force_refresh and self.schema_catalog.is_fresh():
+                        return self.schema_catalog.tables
+                    if not force_refresh and await self._load_shared_catalog():
+                        schema = self.schema_catalog.tables
+                        stage.set("shared", True)
+                    else:
+                        schema = await self.run_sync(
+                            lambda connection: self.schema_catalog.get(connection, force=force_refresh)
+                        )
+                        await self._share_catalog()
+                    if self.schema_catalog.changed_tables:
+                        result_cache.invalidate_tables(self.cache_key, self.schema_catalog.changed_tables)
+                stage.set("tables", len(schema))
+                stage.set("changed_tables", len(self.schema_catalog.changed_tables))
+            logger.debug(f"Fetched schema for {self.db_url}: {schema}")
+            self._schedule_profile()
+            return schema
         except Exception as e:
             logger.error(f"Failed to fetch schema for {self.db_url}: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to fetch schema: {e}")
 
-    async def execute_query(self, query: str):
-        if not self.engine:
+    async def _load_shared_catalog(self) -> bool:
+        """Adopt a catalog another worker reflected for this database, if it is still fresh."""
+        if not state_store.shared:
+            return False
+        try:
+            snapshot = await state_store.run(state_store.get, SCHEMA_CATALOGS, self.cache_key)
+        except StateStoreError as e:
+            logger.warning(f"Failed to read shared schema catalog: {e}")
+            return False
+        return snapshot is not None and self.schema_catalog.load_snapshot(json.loads(snapshot))
+
+    async def _share_catalog(self):
+        if not state_store.shared:
+            return
+        try:
+            await state_store.run(
+                state_store.set, SCHEMA_CATALOGS, self.cache_key, json.dumps(self.schema_catalog.snapshot()),
+                self.schema_catalog.ttl_seconds,
+            )
+        except StateStoreError as e:
+            logger.warning(f"Failed to share schema catalog: {e}")
+
+    def schema_prompt(self, tables: Iterable[str]) -> Optional[str]:
+        """
+        The pre-rendered prompt fragment (types, keys, row estimates, value samples) for
+        `tables`, or None while the profile is missing or older than the schema catalog.
+        """
+        profile = self.schema_profile
+        if profile is None or profile.fingerprint != self.schema_fingerprint:
+            return None
+        return profile.render(tables)
+
+    def _schedule_profile(self):
+        """Start a background profiling run unless one is in flight or the profile is current."""
+        if not settings.SCHEMA_PROFILING_ENABLED or not self.connected:
+            return
+        if self._profile_task is not None and not self._profile_task.done():
+            return
+        profile = self.schema_profile
+        if profile is not None and self.schema_fingerprint is not None and profile.fingerprint == self.schema_fingerprint:
+            return
+        self._profile_task = asyncio.create_task(self._profile_schema())
+
+    async def wait_for_profile(self, timeout: float) -> Optional[SchemaProfile]:
+        """The schema profile, waiting up to `timeout` seconds for a profiling run in flight."""
+        task = self._profile_task
+        if self.schema_profile is None and task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.schema_profile
+
+    async def _profile_schema(self):
+        try:
+            await self.fetch_schema()
+            fingerprint = self.schema_fingerprint
+            if self.schema_profile is not None and self.schema_profile.fingerprint == fingerprint:
+                return
+            version = self.schema_profile.version + 1 if self.schema_profile is not None else 1
+            with span("db.profile") as stage:
+                profile = await self.run_sync(lambda connection: self._build_profile(connection, version, fingerprint))
+                stage.set("tables", len(profile.tables))
+            self.schema_profile = profile
+        except Exception as e:
+            logger.warning(f"Schema profiling failed for {self.db_url}: {e}")
+
+    def _build_profile(self, connection: Connection, version: int, fingerprint: Optional[str]) -> SchemaProfile:
+        return profile_schema(
+            connection,
+            version,
+            fingerprint,
+            sample_tables=settings.SCHEMA_PROFILE_SAMPLE_TABLES,
+            sample_values=settings.SCHEMA_PROFILE_SAMPLE_VALUES,
+        )
+
+    async def execute_query(
+        self, query: str, max_rows: Optional[int] = None, row_format: str = "records", use_cache: bool = True
+    ):
+        """
+        Execute `query` and return `{"results": ..., "truncated": bool, "cached": bool}`.
+
+        Results are a list of `{column: value}` dicts, or `{"columns": [...], "rows": [[...]]}`
+        when `row_format` is "compact". Temporal values are left native for orjson to render
+        (see `RowSerializer`). At most `max_rows` rows (default `QUERY_MAX_ROWS`)
+        are fetched; `truncated` is set when the query produced more.
+
+        Row results are served from and stored in `result_cache` unless `use_cache` is False;
+        statements that don't return rows drop this database's cached results.
+        """
+        with span("db.execute") as stage:
+            result = await self._execute_query(query, max_rows, row_format, use_cache)
+            results = result["results"]
+            if isinstance(results, list):
+                row_count = len(results)
+            else:
+                row_count = len(results.get("rows", ()))
+            stage.set("rows", row_count)
+            stage.set("cached", result["cached"])
+        RESULT_ROWS.observe(row_count)
+        return result
+
+    async def _execute_query(self, query: str, max_rows: Optional[int], row_format: str, use_cache: bool):
+        if not self.connected:
             raise HTTPException(status_code=400, detail="Not connected to a database.")
+        max_rows = max_rows or settings.QUERY_MAX_ROWS
+        use_cache = use_cache and self._result_cache_enabled()
+        if use_cache:
+            cache_key, tables = self._result_cache_key(query, max_rows)
+            payload = result_cache.get(cache_key)
+            record_cache("result", payload is not None)
+            if payload is not None:
+                columns, column_values, truncated = decode_columns(payload)
+                results = self._shape(columns, column_values, row_format)
+                return {"results": results, "truncated": truncated, "cached": True}
         try:
-            with self.engine.connect() as connection:
-                result = connection.execute(text(query))
-                if result.returns_rows:
-                    rows = []
-                    for row in result.mappings():
-                        row_dict = {}
-                        for key, value in row.items():
-                            # Convert Decimal to float for JSON serialization
-                            if isinstance(value, Decimal):
-                                row_dict[key] = float(value)
-                            # Convert datetime objects to ISO format strings
-                            elif isinstance(value, (datetime, date, time)):
-                                if isinstance(value, datetime):
-                                    row_dict[key] = value.isoformat()
-                                elif isinstance(value, date):
-                                    row_dict[key] = value.isoformat()
-                                elif isinstance(value, time):
-                                    row_dict[key] = value.isoformat()
-                            else:
-                                row_dict[key] = value
-                        rows.append(row_dict)
-                    # rows = CustomJSONResponse.render(result.mappings())
-                    return rows
-                return {"message": "Query executed successfully, no rows returned."}
+            result = await self.run_sync(lambda connection: self._execute(connection, query, max_rows, use_cache))
         except Exception as e:
             logger.error(f"Failed to execute query '{query}' on {self.db_url}: {e}")
-            raise HTTPException(status_code=400, detail=f"Query execution failed: {e}")
\ No newline at end of file
+            raise QueryError(f"Query execution failed: {e}", str(getattr(e, "orig", None) or e))
+        if result is None:
+            # The statement may have written to any table
+            result_cache.invalidate_connection(self.cache_key)
+            message = {"message": "Query executed successfully, no rows returned."}
+            return {"results": message, "truncated": False, "cached": False}
+        columns, column_values, truncated, payload = result
+        if payload is not None:
+            result_cache.put(cache_key, self.cache_key, payload, tables, self.result_cache_ttl)
+        return {"results": self._shape(columns, column_values, row_format), "truncated": truncated, "cached": False}
+
+    def _result_cache_enabled(self) -> bool:
+        return settings.RESULT_CACHE_ENABLED and self.result_cache_ttl > 0
+
+    def _result_cache_key(self, query: str, max_rows: int) -> Tuple[str, Optional[FrozenSet[str]]]:
+        normalized_sql, tables = analyze_sql(query, self.dialect_name)
+        return result_cache.key(self.cache_key, normalized_sql, max_rows), tables
+
+    def has_cached_result(self, query: str, max_rows: Optional[int] = None) -> bool:
+        """Whether `execute_query(query, max_rows)` would be served from `result_cache`."""
+        if not self._result_cache_enabled():
+            return False
+        cache_key, _ = self._result_cache_key(query, max_rows or settings.QUERY_MAX_ROWS)
+        return result_cache.contains(cache_key)
+
+    def _execute(self, connection: Connection, query: str, max_rows: int, encode: bool = False):
+        """Run `query`; return `(columns, column_values, truncated, payload)`, or None if it returned no rows."""
+        self._apply_statement_timeout(connection)
+        # Server-side cursor so drivers don't buffer rows beyond the cap
+        result = connection.execution_options(stream_results=True).execute(text(query))
+        if not result.returns_rows:
+            return None
+        # Fetch one extra row to detect truncation
+        rows = result.fetchmany(max_rows + 1)
+        truncated = len(rows) > max_rows
+        columns = list(result.keys())
+        result.close()
+        column_values = RowSerializer(columns, native_temporal=True).to_columns(rows[:max_rows])
+        # Encoded here so the sync-driver path does it off the event loop
+        payload = self._cache_payload(columns, column_values, truncated) if encode else None
+        return columns, column_values, truncated, payload
+
+    @staticmethod
+    def _cache_payload(columns: List[str], column_values: Sequence[Sequence[Any]], truncated: bool) -> Optional[bytes]:
+        try:
+            return encode_columns(columns, column_values, truncated)
+        except TypeError as e:
+            # The query ran fine; a value JSON can't hold is no reason to send it for repair
+            logger.warning(f"Not caching a result with an unserializable value: {e}")
+            return None
+
+    @staticmethod
+    def _shape(columns: List[str], column_values: Sequence[Sequence[Any]], row_format: str):
+        if row_format == "compact":
+            return {"columns": columns, "rows": list(map(list, zip(*column_values)))}
+        return [dict(zip(columns, values)) for values in zip(*column_values)]
+
+    async def explain(self, query: str) -> Dict[str, Any]:
+        """
+        Ask the database for its plan of `query` without running it.
+
+        Returns the estimated rows and cost where the backend reports them, and the full table
+        scans in the plan for SQLite (whose planner gives no estimates). Raises if the database
+        rejects the query.
+        """
+        if not self.connected:
+            raise HTTPException(status_code=400, detail="Not connected to a database.")
+        with span("db.explain"):
+            return await self.run_sync(lambda connection: self._explain(connection, query))
+
+    def _explain(self, connection: Connection, query: str) -> Dict[str, Any]:
+        self._apply_statement_timeout(connection)
+        dialect = backend_name(connection)
+        plan: Dict[str, Any] = {"estimated_rows": None, "estimated_cost": None}
+        if dialect == "postgresql":
+            document = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+            if isinstance(document, str):
+                document = json.loads(document)
+            root = document[0]["Plan"]
+            plan.update(estimated_rows=root.get("Plan Rows"), estimated_cost=root.get("Total Cost"))
+        elif dialect in ("mysql", "mariadb"):
+            result = connection.execute(text(f"EXPLAIN {query}"))
+            rows_index = list(result.keys()).index("rows")
+            # Nested-loop estimate: rows examined multiply across the joined tables
+            estimates = [row[rows_index] for row in result if row[rows_index] is not None]
+            plan["estimated_rows"] = math.prod(int(rows) for rows in estimates) if estimates else None
+        elif dialect == "sqlite":
+            details = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}"))]
+            plan["full_scans"] = [detail for detail in details if detail.startswith("SCAN") and " INDEX " not in detail]
+        else:
+            return {}
+        return plan
+
+    async def stream_query(
+        self, query: str, batch_size: Optional[int] = None, max_rows: Optional[int] = None, convert: bool = True
+    ) -> AsyncIterator[Tuple[List[str], List[Sequence[Any]]]]:
+        """
+        Execute `query` on a server-side cursor and yield `(columns, rows)` batches.
+
+        Rows are lists of orjson-ready values unless `convert` is False, in which case the
+        driver's native values are passed through (e.g. for Arrow encoding). Iteration stops
+        after `max_rows` rows (default `STREAM_MAX_ROWS`).
+        """
+        if not self.connected:
+            raise HTTPException(status_code=400, detail="Not connected to a database.")
+        batch_size = batch_size or settings.STREAM_BATCH_SIZE
+        max_rows = max_rows or settings.STREAM_MAX_ROWS
+        serializer: Optional[RowSerializer] = None
+
+        def convert_batch(columns, rows):
+            nonlocal serializer
+            if not convert:
+                return [tuple(row) for row in rows]
+            if serializer is None:
+                # Converters are picked from the first batch and reused for the rest of the stream
+                serializer = RowSerializer(columns, native_temporal=True)
+            return serializer.to_rows(rows)
+
+        remaining = max_rows
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as connection:
+                await connection.run_sync(self._apply_statement_timeout)
+                result = await connection.stream(text(query))
+                columns = list(result.keys())
+                async for rows in result.partitions(min(batch_size, remaining)):
+                    rows = rows[:remaining]
+                    remaining -= len(rows)
+                    yield columns, convert_batch(columns, rows)
+                    if remaining <= 0:
+                        break
+                await result.close()
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = get_sync_executor()
+        connection = await loop.run_in_executor(executor, self.engine.connect)
+        try:
+            await loop.run_in_executor(executor, self._apply_statement_timeout, connection)
+            result = await loop.run_in_executor(
+                executor,
+                lambda: connection.execution_options(stream_results=True, yield_per=batch_size).execute(text(query)),
+            )
+            if not result.returns_rows:
+                return
+            columns = list(result.keys())
+            while remaining > 0:
+                rows = await loop.run_in_executor(executor, result.fetchmany, min(batch_size, remaining))
+                if not rows:
+                    break
+                remaining -= len(rows)
+                yield columns, convert_batch(columns, rows)
+            await loop.run_in_executor(executor, result.close)
+        finally:
+            await loop.run_in_executor(executor, connection.close)
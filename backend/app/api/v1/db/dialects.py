@@ -0,0 +1,10 @@
+# sqlglot dialect for each SQLAlchemy backend name
+SQLGLOT_DIALECTS = {
+    "postgresql": "postgres",
+    "mysql": "mysql",
+    "mariadb": "mysql",
+    "mssql": "tsql",
+    "sqlite": "sqlite",
+    "oracle": "oracle",
+    "duckdb": "duckdb",
+}
@@ -0,0 +1,614 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fastapi import HTTPException
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlsplit
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from app.core.config import settings
+from .database import DatabaseManager, get_sync_executor
+from .schema_catalog import SchemaCatalog
+from .schema_profile import (
+    ColumnProfile, SchemaProfile, TableProfile, build_profile, _compact_type, _is_text, _sample_values, _SAMPLE_ROWS,
+)
+from .serialization import arrow_columns
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DUCKDB_SCHEME = "duckdb://"
+
+# Query parameters of a duckdb:// URL that configure the engine rather than name a source
+ENGINE_OPTIONS = ("threads", "memory_limit")
+
+# Table functions scanning each kind of file source
+FILE_READERS = {
+    "csv": "read_csv_auto",
+    "parquet": "read_parquet",
+    "json": "read_json_auto",
+}
+_FILE_SUFFIXES = {
+    "csv": (".csv", ".tsv", ".txt", ".csv.gz", ".tsv.gz"),
+    "parquet": (".parquet", ".pq"),
+    "json": (".json", ".ndjson", ".jsonl", ".json.gz", ".ndjson.gz", ".jsonl.gz"),
+}
+_SQLITE_HEADER = b"SQLite format 3\x00"
+_WILDCARD = re.compile(r"[*?\[{]")
+# Catalogs whose tables are reported to the LLM without a catalog prefix
+_IN_MEMORY_CATALOGS = ("memory", "temp")
+
+COLUMNS_QUERY = """
+    SELECT database_name, schema_name, table_name, column_name, data_type
+    FROM duckdb_columns()
+    WHERE NOT internal
+    ORDER BY database_name, schema_name, table_name, column_index
+"""
+ROW_ESTIMATES_QUERY = """
+    SELECT database_name, schema_name, table_name, estimated_size
+    FROM duckdb_tables()
+    WHERE NOT internal
+"""
+KEYS_QUERY = """
+    SELECT database_name, schema_name, table_name, constraint_type, constraint_column_names,
+           referenced_table, referenced_column_names
+    FROM duckdb_constraints()
+    WHERE constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY')
+"""
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(
+            status_code=400, detail="duckdb:// connections require the duckdb and pyarrow packages to be installed."
+        )
+    return duckdb
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _source_name(path: str) -> str:
+    """Table or catalog name for a file, e.g. `/exports/Sales 2024.csv.gz` -> `sales_2024`."""
+    name = os.path.basename(path).split(".")[0]
+    name = re.sub(r"\W+", "_", name).strip("_").lower()
+    return name or "data"
+
+
+def source_kind(path: str) -> str:
+    """"csv", "parquet" or "json" for file sources; "sqlite" or "duckdb" for database files."""
+    lower = path.lower()
+    for kind, suffixes in _FILE_SUFFIXES.items():
+        if lower.endswith(suffixes):
+            return kind
+    if os.path.isfile(path):
+        with open(path, "rb") as handle:
+            if handle.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER:
+                return "sqlite"
+    return "duckdb"
+
+
+def _within(root: str, path: str) -> bool:
+    return os.path.commonpath([root, path]) == root
+
+
+def resolve_source_path(path: str) -> str:
+    """
+    The real path of a file source, which must lie under `DUCKDB_DATA_DIR`.
+
+    Relative paths resolve against that directory. `..` components, symlinks leading out of it
+    and globs matching files outside it are rejected, since the sources come from the client.
+    """
+    if not settings.DUCKDB_DATA_DIR:
+        raise HTTPException(
+            status_code=400, detail="DuckDB file sources are disabled on this server (DUCKDB_DATA_DIR is not set)."
+        )
+    if ".." in re.split(r"[\\/]", path):
+        raise HTTPException(status_code=400, detail=f"DuckDB source paths may not contain '..': {path!r}")
+    root = os.path.realpath(settings.DUCKDB_DATA_DIR)
+    path = os.path.join(root, path)
+    wildcard = _WILDCARD.search(path)
+    if wildcard is None:
+        resolved = os.path.realpath(path)
+        matches = [resolved]
+    else:
+        # Resolve the fixed leading directory; whatever the pattern matches must stay under the root too
+        directory, pattern = os.path.split(path[:wildcard.start()])
+        resolved = os.path.join(os.path.realpath(directory), pattern + path[wildcard.start():])
+        matches = [os.path.realpath(match) for match in glob.glob(resolved, recursive=True)]
+        matches.append(os.path.realpath(directory))
+    if not all(_within(root, match) for match in matches):
+        raise HTTPException(status_code=400, detail=f"DuckDB source {path!r} is outside the data directory.")
+    return resolved
+
+
+@dataclass
+class DuckDBSource:
+    name: str
+    path: str
+    kind: str
+
+
+@dataclass
+class DuckDBConfig:
+    sources: List[DuckDBSource] = field(default_factory=list)
+    # Attached database whose tables resolve without a prefix (the URL's main path)
+    default_catalog: Optional[str] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+def parse_duckdb_url(db_url: str) -> DuckDBConfig:
+    """
+    Read the sources of a duckdb:// URL.
+
+    The path follows SQLAlchemy's file URLs (`duckdb:///relative.parquet`,
+    `duckdb:////abs/warehouse.duckdb`, `duckdb:///:memory:`); every file must be under
+    `DUCKDB_DATA_DIR` (see `resolve_source_path`). A CSV, Parquet or JSON path (globs
+    allowed) becomes a view named after the file; a DuckDB or SQLite database is attached and
+    its tables are queried without a prefix. Each other query parameter names one more source:
+    `?sales=/data/sales/*.parquet` is a view `sales`, `?app=/data/app.sqlite` attaches a
+    database whose tables are `app.<table>`. `threads` and `memory_limit` configure the engine.
+    """
+    parts = urlsplit(db_url)
+    config = DuckDBConfig()
+    if settings.DUCKDB_THREADS > 0:
+        config.options["threads"] = settings.DUCKDB_THREADS
+    if settings.DUCKDB_MEMORY_LIMIT:
+        config.options["memory_limit"] = settings.DUCKDB_MEMORY_LIMIT
+
+    path = parts.path[1:] if parts.path.startswith("/") else parts.path
+    if path and path != ":memory:":
+        path = resolve_source_path(path)
+        kind = source_kind(path)
+        name = _source_name(path)
+        config.sources.append(DuckDBSource(name, path, kind))
+        if kind not in FILE_READERS:
+            config.default_catalog = name
+
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key in ENGINE_OPTIONS:
+            if key == "threads" and not value.isdigit():
+                raise HTTPException(status_code=400, detail=f"Invalid DuckDB threads setting: {value!r}")
+            config.options[key] = int(value) if key == "threads" else value
+            continue
+        if not re.fullmatch(r"[A-Za-z_]\w*", key):
+            raise HTTPException(
+                status_code=400, detail=f"Invalid DuckDB source name {key!r}: use letters, digits and underscores."
+            )
+        path = resolve_source_path(value)
+        config.sources.append(DuckDBSource(key, path, source_kind(path)))
+    return config
+
+
+def _table_name(database: str, schema: str, table: str, default_catalog: Optional[str]) -> str:
+    """The name a query uses for a table: catalog and schema prefixes only where needed."""
+    parts = []
+    if database not in _IN_MEMORY_CATALOGS and database != default_catalog:
+        parts.append(database)
+    if schema != "main":
+        parts.append(schema)
+    parts.append(table)
+    return ".".join(parts)
+
+
+class DuckDBSchemaCatalog(SchemaCatalog):
+    """
+    Schema catalog for the embedded engine. Every view and attached table is listed by one
+    query against `duckdb_columns()`, which costs about as much as a fingerprint query would.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, default_catalog: Optional[str] = None):
+        super().__init__(ttl_seconds=ttl_seconds)
+        self.default_catalog = default_catalog
+
+    def _refresh(self, cursor):
+        started = time.perf_counter()
+        tables: Dict[str, List[str]] = {}
+        types: Dict[str, List[str]] = {}
+        for database, schema, table, column, type_name in cursor.execute(COLUMNS_QUERY).fetchall():
+            name = _table_name(database, schema, table, self.default_catalog)
+            tables.setdefault(name, []).append(column)
+            types.setdefault(name, []).append(f"{column}:{type_name}")
+        fingerprints = {
+            name: hashlib.md5(",".join(columns).encode("utf-8")).hexdigest() for name, columns in types.items()
+        }
+        changed = [
+            name for name, fingerprint in fingerprints.items()
+            if name not in self.tables or self.table_fingerprints.get(name) != fingerprint
+        ]
+        relations: Dict[str, List[str]] = {}
+        for database, schema, table, constraint, _, referenced_table, _ in cursor.execute(KEYS_QUERY).fetchall():
+            if constraint == "FOREIGN KEY" and referenced_table:
+                name = _table_name(database, schema, table, self.default_catalog)
+                referenced = _table_name(database, schema, referenced_table, self.default_catalog)
+                relations.setdefault(name, [])
+                if referenced not in relations[name]:
+                    relations[name].append(referenced)
+        self._store(tables, relations, {}, fingerprints, changed, started)
+
+
+def _profile_duckdb(
+    cursor, default_catalog: Optional[str], sample_tables: int, sample_values: int
+) -> Dict[str, TableProfile]:
+    tables: Dict[str, TableProfile] = {}
+    # table -> (catalog, schema, table) for building sample queries
+    locations: Dict[str, Tuple[str, str, str]] = {}
+    for database, schema, table, column, type_name in cursor.execute(COLUMNS_QUERY).fetchall():
+        name = _table_name(database, schema, table, default_catalog)
+        tables.setdefault(name, TableProfile(columns=[])).columns.append(ColumnProfile(column, _compact_type(type_name)))
+        locations[name] = (database, schema, table)
+
+    for database, schema, table, constraint, columns, referenced_table, referenced_columns in (
+        cursor.execute(KEYS_QUERY).fetchall()
+    ):
+        profile = tables.get(_table_name(database, schema, table, default_catalog))
+        if profile is None:
+            continue
+        by_name = {column.name: column for column in profile.columns}
+        if constraint == "PRIMARY KEY":
+            for column_name in columns:
+                if column_name in by_name:
+                    by_name[column_name].primary_key = True
+        elif referenced_table:
+            referenced = _table_name(database, schema, referenced_table, default_catalog)
+            for column_name, target in zip(columns, referenced_columns or []):
+                if column_name in by_name:
+                    by_name[column_name].references = f"{referenced}.{target}"
+
+    for database, schema, table, estimated_size in cursor.execute(ROW_ESTIMATES_QUERY).fetchall():
+        profile = tables.get(_table_name(database, schema, table, default_catalog))
+        if profile is not None and estimated_size is not None:
+            profile.row_estimate = int(estimated_size)
+
+    if sample_values <= 0:
+        return tables
+    sampled = 0
+    for name, profile in tables.items():
+        if sampled >= sample_tables:
+            break
+        text_columns = [column for column in profile.columns if _is_text(column) and not column.primary_key]
+        if not text_columns:
+            continue
+        sampled += 1
+        relation = ".".join(_quote_identifier(part) for part in locations[name])
+        select = ", ".join(_quote_identifier(column.name) for column in text_columns)
+        try:
+            rows = cursor.execute(f"SELECT {select} FROM {relation} LIMIT {_SAMPLE_ROWS}").fetchall()
+        except Exception as e:
+            logger.debug(f"Sampling values from {name} failed: {e}")
+            continue
+        for position, column in enumerate(text_columns):
+            column.samples = _sample_values((row[position] for row in rows), sample_values)
+    return tables
+
+
+def _next_batch(reader):
+    try:
+        return reader.read_next_batch()
+    except StopIteration:
+        return None
+
+
+def _copy_sqlite(connection, name: str, path: str):
+    """
+    Load every table of a SQLite file into an in-memory catalog `name`, for when DuckDB's
+    sqlite extension can't be installed (e.g. offline hosts). Only suitable for small files.
+    """
+    import pyarrow as pa
+
+    connection.execute(f"ATTACH ':memory:' AS {_quote_identifier(name)}")
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        table_names = [
+            row[0] for row in source.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        for table_name in table_names:
+            cursor = source.execute(f"SELECT * FROM {_quote_identifier(table_name)}")
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+            arrays = []
+            for values in (zip(*rows) if rows else [() for _ in columns]):
+                try:
+                    arrays.append(pa.array(values))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # SQLite's dynamic typing allows mixed types in one column
+                    arrays.append(pa.array([None if value is None else str(value) for value in values]))
+            data = pa.Table.from_arrays(arrays, names=columns)
+            connection.register("_easyquery_import", data)
+            try:
+                connection.execute(
+                    f"CREATE TABLE {_quote_identifier(name)}.main.{_quote_identifier(table_name)} "
+                    f"AS SELECT * FROM _easyquery_import"
+                )
+            finally:
+                connection.unregister("_easyquery_import")
+    finally:
+        source.close()
+
+
+def _restrict_file_access(connection, sources: Sequence[DuckDBSource]):
+    """
+    Limit the engine to the configured sources and lock its settings, so generated SQL can't
+    read other files on the server (`read_csv('/etc/passwd')`, `glob('/root/*')`) or undo that.
+    """
+    paths, directories = [], []
+    for source in sources:
+        wildcard = _WILDCARD.search(source.path)
+        if wildcard:
+            # A glob reads whatever matches under its fixed leading directory
+            directories.append(os.path.join(os.path.dirname(source.path[:wildcard.start()]), ""))
+        else:
+            paths.append(source.path)
+    if paths:
+        connection.execute(f"SET allowed_paths = [{', '.join(_quote_literal(path) for path in paths)}]")
+    if directories:
+        connection.execute(
+            f"SET allowed_directories = [{', '.join(_quote_literal(path) for path in directories)}]"
+        )
+    connection.execute("SET enable_external_access = false")
+    connection.execute("SET lock_configuration = true")
+
+
+class DuckDBManager(DatabaseManager):
+    """
+    `DatabaseManager` over an embedded DuckDB engine, for duckdb:// URLs (see `parse_duckdb_url`).
+
+    CSV, Parquet and JSON files are exposed as views and DuckDB/SQLite databases are attached
+    read-only, so analysts can query exports in place instead of loading them into a server
+    database first. Queries run vectorized on DuckDB's own thread pool; each request gets its
+    own cursor on the shared in-process database, run on the sync executor. Results come out as
+    Arrow record batches: JSON responses convert them column-wise, and Arrow streams pass the
+    batches through without per-row work (`native_arrow`).
+    """
+
+    native_arrow = True
+
+    def __init__(self, db_url: str, result_cache_ttl: Optional[float] = None):
+        super().__init__(db_url, result_cache_ttl=result_cache_ttl)
+        self.config = parse_duckdb_url(db_url)
+        self.schema_catalog = DuckDBSchemaCatalog(
+            ttl_seconds=settings.SCHEMA_CACHE_TTL_SECONDS, default_catalog=self.config.default_catalog
+        )
+        self.connection = None
+
+    @property
+    def connected(self) -> bool:
+        return self.connection is not None
+
+    @property
+    def is_async(self) -> bool:
+        return False
+
+    @property
+    def dialect_name(self) -> Optional[str]:
+        return "duckdb" if self.connection is not None else None
+
+    def pool_status(self) -> Dict[str, Any]:
+        if self.connection is None:
+            return {"connected": False}
+        return {"connected": True, "async_driver": False, "embedded": True, **self.config.options}
+
+    def _open(self):
+        duckdb = _import_duckdb()
+        connection = duckdb.connect(":memory:", config=dict(self.config.options))
+        try:
+            for source in self.config.sources:
+                name = _quote_identifier(source.name)
+                if source.kind in FILE_READERS:
+                    reader = FILE_READERS[source.kind]
+                    connection.execute(f"CREATE VIEW {name} AS SELECT * FROM {reader}({_quote_literal(source.path)})")
+                elif source.kind == "sqlite":
+                    try:
+                        connection.execute(f"ATTACH {_quote_literal(source.path)} AS {name} (TYPE sqlite, READ_ONLY)")
+                    except duckdb.Error as e:
+                        logger.warning(f"DuckDB sqlite extension unavailable ({e}); copying {source.path} into memory")
+                        _copy_sqlite(connection, source.name, source.path)
+                else:
+                    connection.execute(f"ATTACH {_quote_literal(source.path)} AS {name} (READ_ONLY)")
+            _restrict_file_access(connection, self.config.sources)
+        except Exception:
+            connection.close()
+            raise
+        self.connection = connection
+
+    def _cursor(self):
+        cursor = self.connection.cursor()
+        if self.config.default_catalog:
+            # Search paths are per cursor; unqualified names resolve in the main database, then the views
+            search_path = f"{self.config.default_catalog}.main,memory.main"
+            cursor.execute(f"SET search_path = {_quote_literal(search_path)}")
+        return cursor
+
+    def _start_timeout(self, cursor) -> Optional[threading.Timer]:
+        """DuckDB has no statement timeout setting; interrupt the cursor from a timer instead."""
+        timeout = settings.QUERY_STATEMENT_TIMEOUT_SECONDS
+        if not timeout:
+            return None
+        timer = threading.Timer(timeout, cursor.interrupt)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    async def run_sync(self, fn: Callable[[Any], T]) -> T:
+        """Run `fn` with a fresh cursor in the shared sync thread pool, interrupting it if cancelled."""
+        if self.connection is None:
+            raise HTTPException(status_code=400, detail="Not connected to a database.")
+        loop = asyncio.get_running_loop()
+        executor = get_sync_executor()
+        cursor = await loop.run_in_executor(executor, self._cursor)
+        future = executor.submit(self._run_on_cursor, cursor, fn)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The caller went away (e.g. the client disconnected): stop the statement too
+            if future.cancelled():
+                cursor.close()
+            else:
+                cursor.interrupt()
+            raise
+
+    def _run_on_cursor(self, cursor, fn: Callable[[Any], T]) -> T:
+        timer = self._start_timeout(cursor)
+        try:
+            return fn(cursor)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            cursor.close()
+
+    def _apply_statement_timeout(self, connection):
+        pass
+
+    async def _ping(self):
+        await self.run_sync(lambda cursor: cursor.execute("SELECT 1").fetchall())
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(get_sync_executor(), self._open)
+            await self._ping()
+        except HTTPException:
+            raise
+        except Exception as e:
+            await self.disconnect()
+            logger.error(f"Failed to open DuckDB sources for {self.db_url}: {e}")
+            raise HTTPException(status_code=400, detail=f"Database connection failed: {e}")
+        logger.info(f"Opened embedded DuckDB database: {self.db_url} ({len(self.config.sources)} sources)")
+        self._schedule_profile()
+        return True
+
+    async def disconnect(self):
+        if self._profile_task is not None:
+            task, self._profile_task = self._profile_task, None
+            task.cancel()
+            # Let the run hand back its connection before the engine goes away under it
+            await asyncio.gather(task, return_exceptions=True)
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            self.schema_catalog.clear()
+            self.schema_profile = None
+            logger.info(f"Disconnected from database: {self.db_url}")
+
+    def _build_profile(self, cursor, version: int, fingerprint: Optional[str]) -> SchemaProfile:
+        started = time.perf_counter()
+        tables = _profile_duckdb(
+            cursor,
+            self.config.default_catalog,
+            sample_tables=settings.SCHEMA_PROFILE_SAMPLE_TABLES,
+            sample_values=settings.SCHEMA_PROFILE_SAMPLE_VALUES,
+        )
+        return build_profile(tables, version, fingerprint, started)
+
+    @staticmethod
+    def _read_batches(cursor, query: str, max_rows: int, batch_size: int):
+        """Arrow batches holding up to `max_rows + 1` rows, or None if `query` returned no rows."""
+        cursor.execute(query)
+        if cursor.description is None:
+            return None
+        reader = cursor.fetch_record_batch(batch_size)
+        batches = []
+        row_count = 0
+        while row_count <= max_rows:
+            batch = _next_batch(reader)
+            if batch is None:
+                break
+            batches.append(batch)
+            row_count += batch.num_rows
+        return reader.schema, batches
+
+    def _execute(self, cursor, query: str, max_rows: int, encode: bool = False):
+        import pyarrow as pa
+
+        read = self._read_batches(cursor, query, max_rows, min(max_rows + 1, settings.STREAM_BATCH_SIZE))
+        if read is None:
+            return None
+        schema, batches = read
+        table = pa.Table.from_batches(batches, schema=schema)
+        truncated = table.num_rows > max_rows
+        table = table.slice(0, max_rows)
+        columns = table.column_names
+        column_values = arrow_columns(table)
+        payload = self._cache_payload(columns, column_values, truncated) if encode else None
+        return columns, column_values, truncated, payload
+
+    def _explain(self, cursor, query: str) -> Dict[str, Any]:
+        plan: Dict[str, Any] = {"estimated_rows": None, "estimated_cost": None}
+        document = cursor.execute(f"EXPLAIN (FORMAT json) {query}").fetchall()
+        try:
+            nodes = json.loads(document[0][1])
+        except (IndexError, TypeError, ValueError):
+            return plan
+        # The top operators (projections, limits) may carry no estimate; take the first one that does
+        while nodes:
+            node = nodes[0]
+            extra = node.get("extra_info") if isinstance(node, dict) else None
+            estimate = extra.get("Estimated Cardinality") if isinstance(extra, dict) else None
+            if estimate is not None:
+                plan["estimated_rows"] = int(estimate)
+                break
+            nodes = node.get("children") if isinstance(node, dict) else None
+        return plan
+
+    async def stream_record_batches(
+        self, query: str, batch_size: Optional[int] = None, max_rows: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Execute `query` and yield its result as `pyarrow.RecordBatch`es straight from DuckDB,
+        stopping after `max_rows` rows (default `STREAM_MAX_ROWS`).
+        """
+        if self.connection is None:
+            raise HTTPException(status_code=400, detail="Not connected to a database.")
+        batch_size = batch_size or settings.STREAM_BATCH_SIZE
+        remaining = max_rows or settings.STREAM_MAX_ROWS
+        loop = asyncio.get_running_loop()
+        executor: ThreadPoolExecutor = get_sync_executor()
+        cursor = await loop.run_in_executor(executor, self._cursor)
+        timer = self._start_timeout(cursor)
+        try:
+            await loop.run_in_executor(executor, cursor.execute, query)
+            if cursor.description is None:
+                return
+            reader = await loop.run_in_executor(executor, cursor.fetch_record_batch, batch_size)
+            while remaining > 0:
+                batch = await loop.run_in_executor(executor, _next_batch, reader)
+                if batch is None:
+                    break
+                if batch.num_rows > remaining:
+                    batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+                yield batch
+        except (asyncio.CancelledError, GeneratorExit):
+            cursor.interrupt()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            await loop.run_in_executor(executor, cursor.close)
+
+    async def stream_query(
+        self, query: str, batch_size: Optional[int] = None, max_rows: Optional[int] = None, convert: bool = True
+    ) -> AsyncIterator[Tuple[List[str], List[Sequence[Any]]]]:
+        async for batch in self.stream_record_batches(query, batch_size, max_rows):
+            if convert:
+                yield batch.schema.names, list(map(list, zip(*arrow_columns(batch))))
+            else:
+                yield batch.schema.names, list(zip(*(column.to_pylist() for column in batch.columns)))
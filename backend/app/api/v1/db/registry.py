@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import asyncio
+import json
+import logging
+import secrets
+import time
+
+from app.core.state import MemoryStateStore, StateStore, StateStoreError, unavailable
+from .database import DatabaseManager
+from .duckdb_backend import DUCKDB_SCHEME, DuckDBManager
+
+logger = logging.getLogger(__name__)
+
+# State store namespace for session metadata
+SESSIONS = "session"
+
+
+def create_database_manager(db_url: str, result_cache_ttl: Optional[float] = None) -> DatabaseManager:
+    """The manager for `db_url`: the embedded DuckDB engine for duckdb:// URLs, SQLAlchemy otherwise."""
+    if db_url.startswith(DUCKDB_SCHEME):
+        return DuckDBManager(db_url, result_cache_ttl=result_cache_ttl)
+    return DatabaseManager(db_url, result_cache_ttl=result_cache_ttl)
+
+
+@dataclass
+class SessionEntry:
+    db_url: str
+    last_used: float = field(default_factory=time.monotonic)
+    # When the shared store last confirmed the session still exists
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class PoolEntry:
+    manager: DatabaseManager
+    refcount: int = 0
+
+
+class ConnectionRegistry:
+    """
+    Maps session tokens to database connections.
+
+    Sessions connecting to the same database URL share one `DatabaseManager` (and so one
+    connection pool and schema catalog); the pool is disposed when its last session goes away.
+    The number of sessions is bounded: connecting past `max_sessions` evicts the least recently
+    used session, and `reap` evicts sessions idle for longer than `idle_timeout`.
+
+    Session metadata (URL and result cache TTL) is also kept in the shared state store, so a
+    worker that receives a session it has never seen opens its own connection for it. The
+    local table is then only a cache: with a shared store, evicting a session here releases
+    this worker's pool but leaves the session usable, while `disconnect` ends it everywhere.
+    Workers re-check the sessions they hold against the store every `sync_interval` seconds,
+    which also keeps the shared entry from expiring while the session is in use.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 100,
+        idle_timeout: float = 1800.0,
+        store: Optional[StateStore] = None,
+        sync_interval: float = 5.0,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.store = store or MemoryStateStore()
+        self.sync_interval = sync_interval
+        self._sessions: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._pools: Dict[str, PoolEntry] = {}
+        self._lock = asyncio.Lock()
+        self._adopting: Dict[str, asyncio.Future] = {}
+        self.evictions = 0
+        self.adoptions = 0
+
+    async def get(self, session_id: Optional[str]) -> Optional[DatabaseManager]:
+        """
+        The connection for a session, marking the session as used. Sessions created by other
+        workers are connected here on first use.
+        """
+        if not session_id:
+            return None
+        try:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return await self._adopt(session_id)
+            now = time.monotonic()
+            if now - session.checked_at >= self.sync_interval:
+                if not await self.store.run(self.store.touch, SESSIONS, session_id, self.idle_timeout):
+                    # Disconnected or expired elsewhere
+                    async with self._lock:
+                        await self._release(session_id)
+                    return None
+                session.checked_at = now
+        except StateStoreError as e:
+            raise unavailable(e)
+        pool = self._pools.get(session.db_url)
+        if pool is None:
+            return None
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return pool.manager
+
+    async def _adopt(self, session_id: str) -> Optional[DatabaseManager]:
+        # Concurrent first requests for a session share one connection attempt
+        task = self._adopting.get(session_id)
+        if task is None:
+            task = asyncio.ensure_future(self._connect_shared(session_id))
+            self._adopting[session_id] = task
+            task.add_done_callback(lambda _: self._adopting.pop(session_id, None))
+        return await asyncio.shield(task)
+
+    async def _connect_shared(self, session_id: str) -> Optional[DatabaseManager]:
+        value = await self.store.run(self.store.get, SESSIONS, session_id)
+        if value is None:
+            return None
+        metadata = json.loads(value)
+        await self._open(session_id, metadata["db_url"], metadata.get("result_cache_ttl"))
+        self.adoptions += 1
+        logger.info(f"Reconnected session {session_id[:8]} from shared session metadata")
+        session = self._sessions.get(session_id)
+        pool = self._pools.get(session.db_url) if session is not None else None
+        return pool.manager if pool is not None else None
+
+    async def connect(self, db_url: str, result_cache_ttl: Optional[float] = None) -> str:
+        """Open (or share) a connection for `db_url` and return a new session token."""
+        session_id = secrets.token_urlsafe(24)
+        await self._open(session_id, db_url, result_cache_ttl)
+        metadata = {"db_url": db_url, "result_cache_ttl": result_cache_ttl}
+        try:
+            await self.store.run(self.store.set, SESSIONS, session_id, json.dumps(metadata), self.idle_timeout)
+        except StateStoreError as e:
+            async with self._lock:
+                await self._release(session_id)
+            raise unavailable(e)
+        return session_id
+
+    async def _open(self, session_id: str, db_url: str, result_cache_ttl: Optional[float]):
+        """Register `session_id` on this worker, opening a pool for `db_url` unless one is open."""
+        manager: Optional[DatabaseManager] = None
+        while True:
+            if manager is None and db_url not in self._pools:
+                # Connect outside the lock so one slow database doesn't hold up everyone else
+                manager = create_database_manager(db_url, result_cache_ttl=result_cache_ttl)
+                await manager.connect()
+
+            async with self._lock:
+                pool = self._pools.get(db_url)
+                if pool is None and manager is None:
+                    # The last session on the URL went away after we checked; connect after all
+                    continue
+                if pool is None:
+                    pool = PoolEntry(manager=manager)
+                    self._pools[db_url] = pool
+                    logger.info(f"Opened connection pool for {db_url}")
+                elif manager is not None:
+                    # Another session connected to the same URL while we were connecting
+                    await manager.disconnect()
+                self._sessions[session_id] = SessionEntry(db_url=db_url)
+                pool.refcount += 1
+                while len(self._sessions) > self.max_sessions:
+                    oldest = next(iter(self._sessions))
+                    logger.info("Session limit reached; evicting least recently used session")
+                    await self._evict(oldest)
+                    self.evictions += 1
+                return
+
+    async def disconnect(self, session_id: str) -> bool:
+        """End a session on every worker; False if it was unknown."""
+        try:
+            shared = await self.store.run(self.store.delete, SESSIONS, session_id)
+        except StateStoreError as e:
+            raise unavailable(e)
+        async with self._lock:
+            local = session_id in self._sessions
+            await self._release(session_id)
+        return shared or local
+
+    async def _release(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        pool = self._pools.get(session.db_url)
+        if pool is None:
+            return
+        pool.refcount -= 1
+        if pool.refcount <= 0:
+            del self._pools[session.db_url]
+            await pool.manager.disconnect()
+
+    async def _evict(self, session_id: str):
+        await self._release(session_id)
+        if not self.store.shared:
+            # Nobody else can pick the session up again, so end it
+            await self.store.run(self.store.delete, SESSIONS, session_id)
+
+    async def reap(self) -> int:
+        """
+        Release sessions idle on this worker for longer than `idle_timeout`; return how many
+        were released. The shared entries expire on their own once no worker touches them.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        async with self._lock:
+            idle = [sid for sid, session in self._sessions.items() if session.last_used < cutoff]
+            for session_id in idle:
+                await self._evict(session_id)
+            self.evictions += len(idle)
+        if idle:
+            logger.info(f"Evicted {len(idle)} idle sessions")
+        try:
+            await self.store.run(self.store.purge)
+        except StateStoreError as e:
+            logger.warning(f"Failed to purge expired shared state: {e}")
+        return len(idle)
+
+    async def run_reaper(self, interval: float = 60.0):
+        """Background task: periodically evict idle sessions until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper failed: {e}")
+
+    async def close_all(self):
+        """Close this worker's connections; sessions stay valid for the other workers."""
+        async with self._lock:
+            for session_id in list(self._sessions):
+                await self._release(session_id)
+
+    def metrics(self) -> dict:
+        pools = [
+            {"refcount": pool.refcount, "dialect": pool.manager.dialect_name, **pool.manager.pool_status()}
+            for pool in self._pools.values()
+        ]
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "open_pools": len(self._pools),
+            "checked_out_connections": sum(pool.get("checked_out", 0) for pool in pools),
+            "evictions": self.evictions,
+            "state_backend": self.store.name,
+            "adopted_sessions": self.adoptions,
+            "pools": pools,
+        }
@@ -0,0 +1,190 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import orjson
+import sqlglot
+from sqlglot import exp
+
+from app.core.config import settings
+from app.utils.json_response import dumps
+from .dialects import SQLGLOT_DIALECTS
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def analyze_sql(sql: str, dialect: Optional[str]) -> Tuple[str, Optional[FrozenSet[str]]]:
+    """
+    Normalize `sql` for use as a cache key and collect the tables it reads.
+
+    Formatting and keyword case differences normalize away. If the SQL can't be parsed the
+    whitespace-collapsed text is used and the table set is None (unknown).
+    """
+    try:
+        statement = sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(dialect))
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError):
+        return _WHITESPACE.sub(" ", sql).strip().rstrip(";"), None
+    ctes = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+    tables = frozenset(
+        table.name.lower() for table in statement.find_all(exp.Table)
+        if table.name and table.name.lower() not in ctes
+    )
+    return statement.sql(dialect=SQLGLOT_DIALECTS.get(dialect)), tables
+
+
+def encode_columns(columns: Sequence[str], column_values: Sequence[Sequence[Any]], truncated: bool) -> bytes:
+    """Pack a result column-wise into orjson bytes; much smaller than the row objects it came from."""
+    return dumps({"columns": list(columns), "values": list(column_values), "truncated": truncated})
+
+
+def decode_columns(payload: bytes) -> Tuple[List[str], List[List[Any]], bool]:
+    data = orjson.loads(payload)
+    return data["columns"], data["values"], data["truncated"]
+
+
+@dataclass
+class CachedResult:
+    connection_key: str
+    payload: bytes
+    tables: Optional[FrozenSet[str]]
+    expires_at: float
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU cache of query results, keyed on normalized SQL, the connection and the
+    row cap.
+
+    Results are held as compact column-wise orjson bytes, so the bound is on the bytes actually
+    held rather than on the number of entries. Each entry expires after its connection's TTL
+    and is dropped early when any table it reads is invalidated (results with an unknown table
+    set go whenever anything on their connection is invalidated).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # A single result may take at most this share of the cache
+        self.max_entry_bytes = max_bytes // 4
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        # (connection, table) -> keys of entries reading that table; table None = unknown tables
+        self._tables: Dict[Tuple[str, Optional[str]], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(connection_key: str, normalized_sql: str, max_rows: int) -> str:
+        return hashlib.sha256(f"{connection_key}\n{max_rows}\n{normalized_sql}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.payload
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` has a live entry, without counting a hit or miss or refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.monotonic()
+
+    def put(
+        self,
+        key: str,
+        connection_key: str,
+        payload: bytes,
+        tables: Optional[FrozenSet[str]],
+        ttl_seconds: Optional[float] = None,
+    ):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl_seconds <= 0 or len(payload) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = CachedResult(
+                connection_key=connection_key,
+                payload=payload,
+                tables=tables,
+                expires_at=time.monotonic() + ttl_seconds,
+            )
+            self.bytes += len(payload)
+            for table in tables if tables is not None else (None,):
+                self._tables.setdefault((connection_key, table), set()).add(key)
+            while self.bytes > self.max_bytes:
+                evicted = next(iter(self._entries))
+                self._remove(evicted)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= len(entry.payload)
+        for table in entry.tables if entry.tables is not None else (None,):
+            keys = self._tables.get((entry.connection_key, table))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[(entry.connection_key, table)]
+
+    def invalidate_tables(self, connection_key: str, tables: Sequence[str]) -> int:
+        """Drop results on `connection_key` reading any of `tables` (or reading unknown tables)."""
+        with self._lock:
+            keys: Set[str] = set(self._tables.get((connection_key, None), ()))
+            for table in tables:
+                keys.update(self._tables.get((connection_key, table.lower()), ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached results for tables {sorted(tables)}")
+        return len(keys)
+
+    def invalidate_connection(self, connection_key: str) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.connection_key == connection_key]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
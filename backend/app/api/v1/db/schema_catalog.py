@@ -0,0 +1,223 @@
+from sqlalchemy import text, inspect, Connection
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# One cheap catalog query per dialect returning (table_name, table_fingerprint) rows.
+# A table is only re-reflected when its fingerprint changes between refreshes.
+FINGERPRINT_QUERIES = {
+    "postgresql": """
+        SELECT table_name,
+               md5(string_agg(column_name || ':' || data_type, ',' ORDER BY ordinal_position))
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        GROUP BY table_name
+    """,
+    "mysql": """
+        SELECT table_name,
+               MD5(GROUP_CONCAT(CONCAT(column_name, ':', column_type) ORDER BY ordinal_position SEPARATOR ','))
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+        GROUP BY table_name
+    """,
+    "mariadb": """
+        SELECT table_name,
+               MD5(GROUP_CONCAT(CONCAT(column_name, ':', column_type) ORDER BY ordinal_position SEPARATOR ','))
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+        GROUP BY table_name
+    """,
+    "mssql": """
+        SELECT TABLE_NAME,
+               CONVERT(VARCHAR(32), HASHBYTES('MD5', STRING_AGG(CONCAT(COLUMN_NAME, ':', DATA_TYPE), ',')
+                   WITHIN GROUP (ORDER BY ORDINAL_POSITION)), 2)
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = SCHEMA_NAME()
+        GROUP BY TABLE_NAME
+    """,
+    # sqlite keeps the original CREATE statement, which changes whenever the table does
+    "sqlite": """
+        SELECT name, sql
+        FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+    """,
+}
+
+
+class SchemaCatalog:
+    """
+    Per-connection cache of the reflected database schema.
+
+    The catalog is served from memory until its TTL expires. On refresh it runs a single
+    fingerprint query for the dialect and only re-reflects tables that were added or changed,
+    so a refresh on a large, mostly static warehouse costs one round-trip instead of one per table.
+    Dialects without a fingerprint query fall back to a full reflection.
+
+    The catalog itself is not locked; `DatabaseManager` serializes refreshes.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self.tables: Dict[str, List[str]] = {}
+        # table -> tables it references through foreign keys
+        self.relations: Dict[str, List[str]] = {}
+        self.comments: Dict[str, str] = {}
+        self.table_fingerprints: Dict[str, Optional[str]] = {}
+        self.fingerprint: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        # Wall-clock time of the last refresh, for snapshots shared with other workers
+        self.refreshed_at: Optional[float] = None
+        # Tables added, changed or dropped by the last refresh
+        self.changed_tables: List[str] = []
+
+    def is_fresh(self) -> bool:
+        if self.loaded_at is None:
+            return False
+        return (time.monotonic() - self.loaded_at) < self.ttl_seconds
+
+    def invalidate(self):
+        """Force the next `get` to re-check the database."""
+        self.loaded_at = None
+
+    def clear(self):
+        """Drop everything, forcing a full reflection on the next `get`."""
+        self.tables = {}
+        self.relations = {}
+        self.comments = {}
+        self.table_fingerprints = {}
+        self.fingerprint = None
+        self.loaded_at = None
+        self.refreshed_at = None
+
+    def snapshot(self) -> dict:
+        """The catalog as JSON-serializable data, for workers connected to the same database."""
+        return {
+            "tables": self.tables,
+            "relations": self.relations,
+            "comments": self.comments,
+            "table_fingerprints": self.table_fingerprints,
+            "refreshed_at": self.refreshed_at,
+        }
+
+    def load_snapshot(self, snapshot: dict) -> bool:
+        """
+        Adopt another worker's catalog if it is still within the TTL, keeping its age so it
+        expires when the original would; returns whether it was adopted.
+        """
+        age = time.time() - snapshot["refreshed_at"]
+        if not 0 <= age < self.ttl_seconds:
+            return False
+        fingerprints = snapshot["table_fingerprints"]
+        changed = [
+            name for name, fingerprint in fingerprints.items()
+            if name not in self.tables or self.table_fingerprints.get(name) != fingerprint
+        ]
+        self._store(
+            snapshot["tables"], snapshot["relations"], snapshot["comments"], fingerprints, changed,
+            time.perf_counter(), action="loaded from shared state",
+        )
+        self.loaded_at = time.monotonic() - age
+        self.refreshed_at = snapshot["refreshed_at"]
+        return True
+
+    def get(self, connection: Connection, force: bool = False) -> Dict[str, List[str]]:
+        if force or not self.is_fresh():
+            self._refresh(connection)
+        return self.tables
+
+    def _refresh(self, connection: Connection):
+        started = time.perf_counter()
+        fingerprints = self._fetch_fingerprints(connection)
+        inspector = inspect(connection)
+
+        if fingerprints is None:
+            # No cheap change detection for this dialect: reflect everything
+            table_names = inspector.get_table_names()
+            changed = table_names
+            fingerprints = {name: None for name in table_names}
+        else:
+            changed = [
+                name for name, fingerprint in fingerprints.items()
+                if name not in self.tables or self.table_fingerprints.get(name) != fingerprint
+            ]
+
+        tables = {name: columns for name, columns in self.tables.items() if name in fingerprints}
+        relations = {name: refs for name, refs in self.relations.items() if name in fingerprints}
+        comments = {name: comment for name, comment in self.comments.items() if name in fingerprints}
+        for table_name in changed:
+            tables[table_name] = [col['name'] for col in inspector.get_columns(table_name)]
+            relations[table_name] = self._reflect_relations(inspector, table_name)
+            comment = self._reflect_comment(inspector, table_name)
+            if comment:
+                comments[table_name] = comment
+            else:
+                comments.pop(table_name, None)
+
+        self._store(tables, relations, comments, fingerprints, changed, started)
+
+    def _store(
+        self,
+        tables: Dict[str, List[str]],
+        relations: Dict[str, List[str]],
+        comments: Dict[str, str],
+        fingerprints: Dict[str, Optional[str]],
+        changed: List[str],
+        started: float,
+        action: str = "refreshed",
+    ):
+        self.changed_tables = sorted(set(changed) | (set(self.tables) - set(fingerprints)))
+        self.tables = {name: tables[name] for name in sorted(tables)}
+        self.relations = relations
+        self.comments = comments
+        self.table_fingerprints = fingerprints
+        self.fingerprint = hashlib.sha256(
+            json.dumps(self.tables, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        self.loaded_at = time.monotonic()
+        self.refreshed_at = time.time()
+        logger.info(
+            f"Schema catalog {action}: {len(self.tables)} tables, {len(changed)} changed "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    @staticmethod
+    def _reflect_relations(inspector, table_name: str) -> List[str]:
+        try:
+            foreign_keys = inspector.get_foreign_keys(table_name)
+        except NotImplementedError:
+            return []
+        return sorted({fk['referred_table'] for fk in foreign_keys if fk.get('referred_table')})
+
+    @staticmethod
+    def _reflect_comment(inspector, table_name: str) -> Optional[str]:
+        if not inspector.dialect.supports_comments:
+            return None
+        try:
+            return inspector.get_table_comment(table_name).get('text')
+        except NotImplementedError:
+            return None
+
+    def _fetch_fingerprints(self, connection: Connection) -> Optional[Dict[str, Optional[str]]]:
+        dialect_name = connection.dialect.name
+        query = FINGERPRINT_QUERIES.get(dialect_name)
+        if query is None:
+            return None
+        try:
+            rows = connection.execute(text(query)).fetchall()
+        except Exception as e:
+            logger.warning(f"Schema fingerprint query failed for dialect {dialect_name}: {e}")
+            # Roll back so the reflection fallback doesn't run inside an aborted transaction
+            connection.rollback()
+            return None
+        fingerprints = {}
+        for table_name, fingerprint in rows:
+            if isinstance(fingerprint, bytes):
+                fingerprint = fingerprint.hex()
+            if fingerprint is not None and dialect_name == "sqlite":
+                fingerprint = hashlib.md5(fingerprint.encode("utf-8")).hexdigest()
+            fingerprints[table_name] = fingerprint
+        return fingerprints
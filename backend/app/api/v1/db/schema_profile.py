@@ -0,0 +1,362 @@
+from dataclasses import dataclass, field
+from sqlalchemy import text, inspect, Connection
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bulk catalog queries per dialect. Each returns rows for every table of the current schema in
+# one round-trip, so profiling a 5000-table warehouse doesn't cost thousands of inspector calls.
+#   columns:  (table, column, type, is_primary_key)
+#   keys:     (table, column, referenced_table, referenced_column)
+#   rows:     (table, estimated_row_count)
+#   samples:  (table, column, most common values as text), where the catalog keeps them
+PROFILE_QUERIES = {
+    "postgresql": {
+        "columns": """
+            SELECT cl.relname, a.attname, format_type(a.atttypid, a.atttypmod),
+                   EXISTS (
+                       SELECT 1 FROM pg_constraint con
+                       WHERE con.conrelid = cl.oid AND con.contype = 'p' AND a.attnum = ANY (con.conkey)
+                   )
+            FROM pg_attribute a
+            JOIN pg_class cl ON cl.oid = a.attrelid
+            JOIN pg_namespace n ON n.oid = cl.relnamespace
+            WHERE n.nspname = current_schema() AND cl.relkind IN ('r', 'p', 'v', 'm')
+              AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY cl.relname, a.attnum
+        """,
+        "keys": """
+            SELECT src.relname, sa.attname, dst.relname, da.attname
+            FROM pg_constraint con
+            JOIN pg_class src ON src.oid = con.conrelid
+            JOIN pg_namespace n ON n.oid = src.relnamespace
+            JOIN pg_class dst ON dst.oid = con.confrelid
+            CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(src_attnum, dst_attnum)
+            JOIN pg_attribute sa ON sa.attrelid = con.conrelid AND sa.attnum = k.src_attnum
+            JOIN pg_attribute da ON da.attrelid = con.confrelid AND da.attnum = k.dst_attnum
+            WHERE n.nspname = current_schema() AND con.contype = 'f'
+        """,
+        "rows": """
+            SELECT cl.relname, cl.reltuples::bigint
+            FROM pg_class cl
+            JOIN pg_namespace n ON n.oid = cl.relnamespace
+            WHERE n.nspname = current_schema() AND cl.relkind IN ('r', 'p', 'm')
+        """,
+        "samples": """
+            SELECT tablename, attname, most_common_vals::text
+            FROM pg_stats
+            WHERE schemaname = current_schema() AND most_common_vals IS NOT NULL
+        """,
+    },
+    "mysql": {
+        "columns": """
+            SELECT table_name, column_name, column_type, column_key = 'PRI'
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+            ORDER BY table_name, ordinal_position
+        """,
+        "keys": """
+            SELECT table_name, column_name, referenced_table_name, referenced_column_name
+            FROM information_schema.key_column_usage
+            WHERE table_schema = DATABASE() AND referenced_table_name IS NOT NULL
+        """,
+        "rows": """
+            SELECT table_name, table_rows
+            FROM information_schema.tables
+            WHERE table_schema = DATABASE()
+        """,
+    },
+    "sqlite": {
+        "columns": """
+            SELECT m.name, p.name, p.type, p.pk > 0
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.name, p.cid
+        """,
+        "keys": """
+            SELECT m.name, f."from", f."table", f."to"
+            FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+        """,
+    },
+}
+PROFILE_QUERIES["mariadb"] = PROFILE_QUERIES["mysql"]
+
+# Verbose catalog type names and their prompt spelling
+_TYPE_ALIASES = {
+    "character varying": "varchar",
+    "character": "char",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+    "time without time zone": "time",
+    "double precision": "double",
+}
+_TEXT_TYPES = ("char", "text", "string", "enum", "clob")
+# Rows read per table when sampling values from the data rather than the catalog
+_SAMPLE_ROWS = 20
+_SAMPLE_VALUE_CHARS = 32
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    type: str
+    primary_key: bool = False
+    # "table.column" this column references through a foreign key
+    references: Optional[str] = None
+    samples: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TableProfile:
+    columns: List[ColumnProfile]
+    row_estimate: Optional[int] = None
+
+
+@dataclass
+class SchemaProfile:
+    """
+    Column types, keys, row-count estimates and value samples for one database, with each
+    table's prompt line rendered once up front. `version` increases with every profiling run
+    and `fingerprint` is the schema catalog fingerprint the profile was built against.
+    """
+
+    version: int
+    fingerprint: Optional[str]
+    tables: Dict[str, TableProfile]
+    lines: Dict[str, str]
+    built_at: float
+    duration: float
+
+    def render(self, tables: Optional[Iterable[str]] = None) -> Optional[str]:
+        """
+        The prompt fragment for `tables` (all of them by default), or None if any is missing
+        from the profile.
+        """
+        names = self.lines.keys() if tables is None else tables
+        lines = []
+        for name in names:
+            line = self.lines.get(name)
+            if line is None:
+                return None
+            lines.append(line)
+        return "\n".join(lines)
+
+    def summary(self) -> dict:
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "tables": len(self.tables),
+            "foreign_keys": sum(1 for table in self.tables.values() for column in table.columns if column.references),
+            "prompt_chars": sum(len(line) + 1 for line in self.lines.values()),
+            "built_at": self.built_at,
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+
+def _compact_type(type_name: str) -> str:
+    type_name = (type_name or "").strip().lower()
+    for verbose, alias in _TYPE_ALIASES.items():
+        if type_name.startswith(verbose):
+            return alias + type_name[len(verbose):]
+    return type_name or "?"
+
+
+def _is_text(column: ColumnProfile) -> bool:
+    return any(marker in column.type for marker in _TEXT_TYPES)
+
+
+def _quote_value(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def render_table(name: str, table: TableProfile) -> str:
+    """One compact prompt line, e.g. `orders (~1200 rows): id int PK, user_id int -> users.id`."""
+    columns = []
+    for column in table.columns:
+        entry = f"{column.name} {column.type}"
+        if column.primary_key:
+            entry += " PK"
+        if column.references:
+            entry += f" -> {column.references}"
+        if column.samples:
+            entry += " e.g. " + "|".join(_quote_value(value) for value in column.samples)
+        columns.append(entry)
+    rows = f" (~{table.row_estimate} rows)" if table.row_estimate is not None else ""
+    return f"{name}{rows}: {', '.join(columns)}"
+
+
+def _parse_pg_array(value: str) -> List[str]:
+    """Elements of a PostgreSQL array literal such as `{view,click,"two words"}`."""
+    if not value or value[0] != "{" or value[-1] != "}":
+        return []
+    body = value[1:-1]
+    if not body:
+        return []
+    return next(csv.reader([body], quotechar='"', escapechar="\\"))
+
+
+def _sample_values(values: Iterable, limit: int) -> List[str]:
+    samples: List[str] = []
+    for value in values:
+        if value is None:
+            continue
+        value = str(value)
+        if len(value) > _SAMPLE_VALUE_CHARS or value in samples:
+            continue
+        samples.append(value)
+        if len(samples) >= limit:
+            break
+    return samples
+
+
+def _profile_from_catalog(connection: Connection, queries: Dict[str, str]) -> Dict[str, TableProfile]:
+    tables: Dict[str, TableProfile] = {}
+    columns_by_name: Dict[Tuple[str, str], ColumnProfile] = {}
+    for table_name, column_name, type_name, primary_key in connection.execute(text(queries["columns"])):
+        column = ColumnProfile(column_name, _compact_type(type_name), bool(primary_key))
+        tables.setdefault(table_name, TableProfile(columns=[])).columns.append(column)
+        columns_by_name[(table_name, column_name)] = column
+
+    for table_name, column_name, referenced_table, referenced_column in connection.execute(text(queries["keys"])):
+        column = columns_by_name.get((table_name, column_name))
+        if column is None:
+            continue
+        if referenced_column is None:
+            # SQLite leaves the target column out when the key references the primary key
+            referenced = tables.get(referenced_table)
+            primary = [c.name for c in referenced.columns if c.primary_key] if referenced else []
+            referenced_column = primary[0] if len(primary) == 1 else "?"
+        column.references = f"{referenced_table}.{referenced_column}"
+
+    if "rows" in queries:
+        for table_name, row_estimate in connection.execute(text(queries["rows"])):
+            # PostgreSQL reports -1 for tables that have never been analyzed
+            if table_name in tables and row_estimate is not None and row_estimate >= 0:
+                tables[table_name].row_estimate = int(row_estimate)
+    elif connection.dialect.name == "sqlite":
+        _sqlite_row_estimates(connection, tables)
+    return tables
+
+
+def _sqlite_row_estimates(connection: Connection, tables: Dict[str, TableProfile]):
+    """Row counts from `sqlite_stat1`, which only exists once ANALYZE has been run."""
+    has_stats = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    ).first()
+    if not has_stats:
+        return
+    for table_name, stat in connection.execute(text("SELECT tbl, stat FROM sqlite_stat1")):
+        try:
+            row_estimate = int(str(stat).split()[0])
+        except (ValueError, IndexError):
+            continue
+        if table_name in tables:
+            tables[table_name].row_estimate = max(row_estimate, tables[table_name].row_estimate or 0)
+
+
+def _profile_with_inspector(connection: Connection) -> Dict[str, TableProfile]:
+    """Fallback for dialects without catalog queries, using SQLAlchemy's multi-table reflection."""
+    inspector = inspect(connection)
+    tables: Dict[str, TableProfile] = {}
+    primary_keys = inspector.get_multi_pk_constraint()
+    for (_, table_name), columns in inspector.get_multi_columns().items():
+        primary = set((primary_keys.get((None, table_name)) or {}).get("constrained_columns") or [])
+        tables[table_name] = TableProfile(columns=[
+            ColumnProfile(column["name"], _compact_type(str(column["type"])), column["name"] in primary)
+            for column in columns
+        ])
+    try:
+        foreign_keys = inspector.get_multi_foreign_keys()
+    except NotImplementedError:
+        foreign_keys = {}
+    for (_, table_name), keys in foreign_keys.items():
+        by_name = {column.name: column for column in tables.get(table_name, TableProfile(columns=[])).columns}
+        for key in keys:
+            for source, target in zip(key["constrained_columns"], key["referred_columns"]):
+                if source in by_name:
+                    by_name[source].references = f"{key['referred_table']}.{target}"
+    return tables
+
+
+def _catalog_samples(connection: Connection, query: str, tables: Dict[str, TableProfile], limit: int):
+    for table_name, column_name, values in connection.execute(text(query)):
+        table = tables.get(table_name)
+        if table is None:
+            continue
+        for column in table.columns:
+            if column.name == column_name and _is_text(column):
+                column.samples = _sample_values(_parse_pg_array(values), limit)
+
+
+def _data_samples(connection: Connection, tables: Dict[str, TableProfile], max_tables: int, limit: int):
+    """
+    Sample text column values from the first rows of up to `max_tables` tables, for dialects
+    whose catalog keeps no value statistics. One small query per table.
+    """
+    preparer = connection.dialect.identifier_preparer
+    sampled = 0
+    for table_name, table in tables.items():
+        if sampled >= max_tables:
+            break
+        text_columns = [column for column in table.columns if _is_text(column) and not column.primary_key]
+        if not text_columns:
+            continue
+        sampled += 1
+        select = ", ".join(preparer.quote(column.name) for column in text_columns)
+        try:
+            rows = connection.execute(
+                text(f"SELECT {select} FROM {preparer.quote(table_name)} LIMIT {_SAMPLE_ROWS}")
+            ).fetchall()
+        except Exception as e:
+            logger.debug(f"Sampling values from {table_name} failed: {e}")
+            connection.rollback()
+            continue
+        for position, column in enumerate(text_columns):
+            column.samples = _sample_values((row[position] for row in rows), limit)
+
+
+def profile_schema(
+    connection: Connection,
+    version: int,
+    fingerprint: Optional[str],
+    sample_tables: int = 50,
+    sample_values: int = 3,
+) -> SchemaProfile:
+    """Profile the connected database and pre-render each table's prompt line."""
+    started = time.perf_counter()
+    dialect_name = "mariadb" if getattr(connection.dialect, "is_mariadb", False) else connection.dialect.name
+    queries = PROFILE_QUERIES.get(dialect_name)
+    if queries is not None:
+        tables = _profile_from_catalog(connection, queries)
+    else:
+        tables = _profile_with_inspector(connection)
+
+    if sample_values > 0:
+        if queries is not None and "samples" in queries:
+            _catalog_samples(connection, queries["samples"], tables, sample_values)
+        elif sample_tables > 0:
+            _data_samples(connection, tables, sample_tables, sample_values)
+
+    return build_profile(tables, version, fingerprint, started)
+
+
+def build_profile(
+    tables: Dict[str, TableProfile], version: int, fingerprint: Optional[str], started: float
+) -> SchemaProfile:
+    """Sort the profiled tables and render their prompt lines."""
+    tables = {name: tables[name] for name in sorted(tables)}
+    lines = {name: render_table(name, table) for name, table in tables.items()}
+    duration = time.perf_counter() - started
+    logger.info(f"Schema profile v{version} built: {len(tables)} tables in {duration * 1000:.1f} ms")
+    return SchemaProfile(
+        version=version,
+        fingerprint=fingerprint,
+        tables=tables,
+        lines=lines,
+        built_at=time.time(),
+        duration=duration,
+    )
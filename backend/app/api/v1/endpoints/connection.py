@@ -1,21 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse
+from app.core.security import get_session_id
 from app.models.pydantic_models import ConnectRequest
-from ..db import DatabaseManager
-from app.services.query_service import db_connections
+from app.services.query_service import connection_registry
 
 connection_router = APIRouter()
 
 
 @connection_router.post("/connect")
-async def connect_to_database(request: ConnectRequest):
-    session_id = "default_session"  # In a real app, use a unique session ID per user
-    db_manager = DatabaseManager(request.db_url)
+async def connect_to_database(request: ConnectRequest, x_session_id: Optional[str] = Header(None)):
     try:
-        await db_manager.connect()
-        db_connections[session_id] = db_manager
-        return JSONResponse(status_code=200, content={"message": "Database connected successfully!"})
+        session_id = await connection_registry.connect(request.db_url, request.result_cache_ttl_seconds)
+        # Reconnecting replaces the caller's previous session
+        if x_session_id:
+            await connection_registry.disconnect(x_session_id)
+        return JSONResponse(
+            status_code=200,
+            content={"message": "Database connected successfully!", "session_id": session_id},
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error during connection: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error during connection: {e}")
+
+
+@connection_router.post("/disconnect")
+async def disconnect_from_database(session_id: str = Depends(get_session_id)):
+    if not await connection_registry.disconnect(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return JSONResponse(status_code=200, content={"message": "Database disconnected."})
+
+
+@connection_router.get("/metrics")
+async def connection_metrics():
+    return JSONResponse(status_code=200, content=connection_registry.metrics())
@@ -1,40 +1,120 @@
-from typing import Literal
-from fastapi import APIRouter, File, UploadFile, Form
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Query, WebSocket
 from fastapi.responses import JSONResponse
-from app.models.pydantic_models import QueryRequest
-from app.services.query_service import process_text_query, process_speech_query_service, speech_to_text_only, get_schema
+from app.core.security import get_session_id
+from app.models.pydantic_models import QueryRequest, BatchQueryRequest, CacheInvalidateRequest
+from app.utils.json_response import ORJSONResponse
+from app.services.query_service import (
+    process_text_query, stream_text_query, stream_query_events, stream_batch_query, process_speech_query_service,
+    speech_to_text_only, get_schema, get_schema_profile, refresh_schema, provider_stats, stream_speech_to_text,
+    cache_stats, invalidate_result_cache, get_result_page, close_result,
+)
 
 query_router = APIRouter()
 
 
 @query_router.post("/query")
-async def process_query(request: QueryRequest):
-    session_id = "default_session"
-    result = await process_text_query(session_id, request.query_text, request.llm_provider)
+async def process_query(request: QueryRequest, session_id: str = Depends(get_session_id)):
+    if request.response_format != "json":
+        return await stream_text_query(
+            session_id, request.query_text, request.llm_provider, request.response_format
+        )
+    result = await process_text_query(
+        session_id, request.query_text, request.llm_provider, request.row_format, request.page_size
+    )
+    return ORJSONResponse(status_code=200, content=result)
+
+
+@query_router.post("/stream")
+async def process_query_events(request: QueryRequest, session_id: str = Depends(get_session_id)):
+    # Server-Sent Events; `response_format` doesn't apply, rows arrive in the `result` event
+    return await stream_query_events(
+        session_id, request.query_text, request.llm_provider, request.row_format, request.page_size
+    )
+
+
+@query_router.get("/results/{handle_id}")
+async def get_result(
+    handle_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    row_format: Literal["records", "compact"] = "records",
+    session_id: str = Depends(get_session_id),
+):
+    # Pages of a result kept by a query sent with `page_size`; `cursor` (a page's next_cursor) overrides `offset`
+    result = await get_result_page(session_id, handle_id, offset, limit, cursor, row_format)
+    return ORJSONResponse(status_code=200, content=result)
+
+
+@query_router.delete("/results/{handle_id}")
+async def delete_result(handle_id: str, session_id: str = Depends(get_session_id)):
+    result = await close_result(session_id, handle_id)
     return JSONResponse(status_code=200, content=result)
 
 
+@query_router.post("/batch")
+async def process_batch_query(request: BatchQueryRequest, session_id: str = Depends(get_session_id)):
+    # NDJSON: one line per question as it completes, then a summary line
+    return await stream_batch_query(session_id, request.questions, request.llm_provider, request.row_format)
+
+
 @query_router.post("/speech-query")
 async def process_speech_query(
     audio_file: UploadFile = File(...),
-    llm_provider: Literal["openai", "gemini", "anthropic", "groq"] = Form(...)
+    llm_provider: Literal["openai", "gemini", "anthropic", "groq", "auto"] = Form(...),
+    session_id: str = Depends(get_session_id),
 ):
-    session_id = "default_session"
     result = await process_speech_query_service(session_id, audio_file, llm_provider)
-    return JSONResponse(status_code=200, content=result)
+    return ORJSONResponse(status_code=200, content=result)
 
 
 @query_router.post("/speech-to-text")
 async def convert_speech_to_text(
     audio_file: UploadFile = File(...)
 ):
-    session_id = "default_session"
-    result = await speech_to_text_only(session_id, audio_file)
+    # Transcription doesn't touch the database, so no session is required
+    result = await speech_to_text_only(None, audio_file)
     return JSONResponse(status_code=200, content=result)
 
 
+@query_router.websocket("/speech-stream")
+async def speech_stream(websocket: WebSocket, format: Literal["pcm", "webm", "ogg"] = "pcm"):
+    # "pcm" is raw mono 16-bit little-endian audio at SPEECH_SAMPLE_RATE; other formats are decoded with ffmpeg
+    await stream_speech_to_text(websocket, format)
+
+
 @query_router.get("/schema")
-async def get_database_schema():
-    session_id = "default_session"
+async def get_database_schema(session_id: str = Depends(get_session_id)):
     result = await get_schema(session_id)
-    return JSONResponse(status_code=200, content=result)
\ No newline at end of file
+    return JSONResponse(status_code=200, content=result)
+
+
+@query_router.post("/schema/refresh")
+async def refresh_database_schema(session_id: str = Depends(get_session_id)):
+    result = await refresh_schema(session_id)
+    return JSONResponse(status_code=200, content=result)
+
+
+@query_router.get("/schema/profile")
+async def get_database_schema_profile(session_id: str = Depends(get_session_id)):
+    result = await get_schema_profile(session_id)
+    return JSONResponse(status_code=200, content=result)
+
+
+@query_router.get("/cache/stats")
+async def get_cache_stats():
+    result = await cache_stats()
+    return JSONResponse(status_code=200, content=result)
+
+
+@query_router.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidateRequest, session_id: str = Depends(get_session_id)):
+    result = await invalidate_result_cache(session_id, request.tables)
+    return JSONResponse(status_code=200, content=result)
+
+
+@query_router.get("/providers/stats")
+async def get_provider_stats():
+    result = await provider_stats()
+    return JSONResponse(status_code=200, content=result)
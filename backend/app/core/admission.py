@@ -0,0 +1,350 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+import asyncio
+import logging
+import math
+import time
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = registry.register(Gauge(
+    "easyquery_admission_in_flight", "Admitted requests currently running, by endpoint class.", ("endpoint",),
+))
+QUEUE_DEPTH = registry.register(Gauge(
+    "easyquery_admission_queue_depth", "Requests waiting for admission, by endpoint class.", ("endpoint",),
+))
+QUEUE_WAIT = registry.register(Histogram(
+    "easyquery_admission_wait_seconds", "Time admitted requests spent queued.", ("endpoint",),
+))
+REJECTIONS = registry.register(Counter(
+    "easyquery_admission_rejections_total", "Requests refused by admission control.", ("endpoint", "reason"),
+))
+CANCELLATIONS = registry.register(Counter(
+    "easyquery_admission_cancellations_total", "Requests cancelled because the client disconnected.",
+    ("endpoint", "stage"),
+))
+
+# Weight of the latest request in each endpoint's running average service time
+_SERVICE_TIME_SMOOTHING = 0.2
+_MAX_RETRY_AFTER_SECONDS = 60
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    session: str
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class EndpointGate:
+    """In-flight cap and wait queue for one class of endpoints."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        # session -> its waiting requests in arrival order; sessions are served round-robin
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.waiting = 0
+        self.service_time = 1.0
+
+    def session_waiting(self, session: str) -> int:
+        queue = self.queues.get(session)
+        return len(queue) if queue else 0
+
+    def remove(self, waiter: _Waiter):
+        queue = self.queues.get(waiter.session)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.waiting -= 1
+        if not queue:
+            del self.queues[waiter.session]
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request has likely drained."""
+        estimate = self.service_time * (self.waiting + 1) / self.limit
+        return max(1, min(_MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    def record(self, duration: float):
+        self.service_time += _SERVICE_TIME_SMOOTHING * (duration - self.service_time)
+
+    def update_metrics(self):
+        IN_FLIGHT.set(self.in_flight, self.name)
+        QUEUE_DEPTH.set(self.waiting, self.name)
+
+
+class AdmissionController:
+    """
+    Caps concurrent work per endpoint class and per session.
+
+    A request that can't start right away waits in its endpoint's queue for up to
+    `queue_timeout` seconds. Freed slots go to the waiting sessions in turn rather than in
+    arrival order, so one session sending a burst can't starve the others, and a session
+    already running `session_limit` requests (across all endpoints) is skipped until one of
+    them finishes. Requests are refused with 429 when their session has too many waiting, and
+    with 503 when the endpoint's queue is full or the wait times out; both carry an estimate
+    for `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        session_limit: int,
+        queue_size: int,
+        session_queue_size: int,
+        queue_timeout: float,
+    ):
+        self.gates = {name: EndpointGate(name, limit) for name, limit in limits.items()}
+        self.session_limit = max(1, session_limit)
+        self.queue_size = queue_size
+        self.session_queue_size = session_queue_size
+        self.queue_timeout = queue_timeout
+        self.session_in_flight: Dict[str, int] = {}
+        for gate in self.gates.values():
+            gate.update_metrics()
+
+    def _can_start(self, session: str) -> bool:
+        return self.session_in_flight.get(session, 0) < self.session_limit
+
+    def _start(self, gate: EndpointGate, session: str):
+        gate.in_flight += 1
+        self.session_in_flight[session] = self.session_in_flight.get(session, 0) + 1
+
+    def _reject(self, gate: EndpointGate, status_code: int, reason: str, detail: str):
+        REJECTIONS.inc(gate.name, reason)
+        raise AdmissionRejected(status_code, detail, gate.retry_after())
+
+    async def acquire(self, endpoint: str, session: str):
+        """Wait for a slot on `endpoint` for `session`; raises `AdmissionRejected` if refused."""
+        gate = self.gates[endpoint]
+        if gate.waiting == 0 and gate.in_flight < gate.limit and self._can_start(session):
+            self._start(gate, session)
+            gate.update_metrics()
+            QUEUE_WAIT.observe(0.0, gate.name)
+            return
+        if gate.session_waiting(session) >= self.session_queue_size:
+            self._reject(gate, 429, "session_queue_full", "Too many requests waiting for this session; retry later.")
+        if gate.waiting >= self.queue_size:
+            self._reject(gate, 503, "queue_full", "Server is busy; retry later.")
+
+        waiter = _Waiter(session, asyncio.get_running_loop().create_future())
+        gate.queues.setdefault(session, deque()).append(waiter)
+        gate.waiting += 1
+        # Capacity may be free with only session-capped requests ahead of this one
+        self._dispatch(gate)
+        gate.update_metrics()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                gate.remove(waiter)
+                gate.update_metrics()
+                self._reject(gate, 503, "queue_timeout", "Timed out waiting for capacity; retry later.")
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                # Admitted just as the caller went away; hand the slot on
+                self.release(endpoint, session)
+            else:
+                gate.remove(waiter)
+                gate.update_metrics()
+            raise
+        QUEUE_WAIT.observe(time.perf_counter() - waiter.queued_at, gate.name)
+
+    def try_acquire(self, endpoint: str, session: str) -> bool:
+        """Take a slot on `endpoint` for `session` only if one is free now, without queueing."""
+        gate = self.gates[endpoint]
+        if gate.waiting or gate.in_flight >= gate.limit or not self._can_start(session):
+            REJECTIONS.inc(gate.name, "saturated")
+            return False
+        self._start(gate, session)
+        gate.update_metrics()
+        return True
+
+    def release(self, endpoint: str, session: str, duration: Optional[float] = None):
+        gate = self.gates[endpoint]
+        gate.in_flight -= 1
+        remaining = self.session_in_flight.get(session, 0) - 1
+        if remaining > 0:
+            self.session_in_flight[session] = remaining
+        else:
+            self.session_in_flight.pop(session, None)
+        if duration is not None:
+            gate.record(duration)
+        # The session cap spans endpoints, so a release can unblock waiters on any gate
+        for other in self.gates.values():
+            self._dispatch(other)
+            other.update_metrics()
+
+    def _dispatch(self, gate: EndpointGate):
+        while gate.in_flight < gate.limit and gate.waiting:
+            session = next((name for name in gate.queues if self._can_start(name)), None)
+            if session is None:
+                return
+            queue = gate.queues[session]
+            waiter = queue.popleft()
+            gate.waiting -= 1
+            if queue:
+                # Back of the rotation
+                gate.queues.move_to_end(session)
+            else:
+                del gate.queues[session]
+            self._start(gate, session)
+            waiter.future.set_result(True)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "limit": gate.limit,
+                "in_flight": gate.in_flight,
+                "waiting": gate.waiting,
+                "service_time_ms": round(gate.service_time * 1000, 1),
+            }
+            for name, gate in self.gates.items()
+        }
+
+
+# Endpoint class for each controlled path; everything else is admitted immediately
+ADMISSION_ENDPOINTS = {
+    "/api/v1/query/query": "query",
+    "/api/v1/query/stream": "query",
+    "/api/v1/query/batch": "batch",
+    "/api/v1/query/speech-query": "speech",
+    "/api/v1/query/speech-to-text": "speech",
+    # Websocket: holds an ffmpeg process and speech workers for as long as it stays open
+    "/api/v1/query/speech-stream": "speech",
+}
+
+# "Try Again Later": the websocket close code for connections refused while at capacity
+WS_TRY_AGAIN_LATER = 1013
+
+admission_controller = AdmissionController(
+    limits={
+        "query": settings.ADMISSION_QUERY_CONCURRENCY,
+        "batch": settings.ADMISSION_BATCH_CONCURRENCY,
+        "speech": settings.ADMISSION_SPEECH_CONCURRENCY,
+    },
+    session_limit=settings.ADMISSION_SESSION_CONCURRENCY,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    session_queue_size=settings.ADMISSION_SESSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+def _session_key(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-session-id" and value:
+            return value.decode("latin-1")
+    # Requests without a session (e.g. speech-to-text) are grouped by client address
+    client = scope.get("client")
+    return f"client:{client[0]}" if client else "client:unknown"
+
+
+class AdmissionMiddleware:
+    """
+    Runs requests to the endpoints in `ADMISSION_ENDPOINTS` through the admission controller
+    and cancels them when the client disconnects, whether they are still queued or already
+    running. Cancelling the handler cancels its pending LLM call and database query (async
+    drivers and the DuckDB engine stop the statement; sync drivers finish it in the
+    background).
+
+    Websocket connections to those endpoints hold their slot until they close. They are not
+    queued: when the endpoint is at capacity the connection is closed with code 1013.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        endpoint = ADMISSION_ENDPOINTS.get(scope["path"]) if scope["type"] in ("http", "websocket") else None
+        if endpoint is None or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send, endpoint)
+            return
+        session = _session_key(scope)
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        admitted = False
+
+        async def pump():
+            # The only reader of `receive`: forwards the body to the app and watches for disconnects
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def handle():
+            nonlocal admitted
+            try:
+                await self.controller.acquire(endpoint, session)
+            except AdmissionRejected as e:
+                logger.warning(f"Refused {scope['path']} for session {session[:8]}: {e.detail}")
+                response = JSONResponse(
+                    status_code=e.status_code,
+                    content={"detail": e.detail},
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+                await response(scope, messages.get, send)
+                return
+            admitted = True
+            started = time.perf_counter()
+            try:
+                await self.app(scope, messages.get, send)
+            finally:
+                self.controller.release(endpoint, session, time.perf_counter() - started)
+
+        reader = asyncio.create_task(pump())
+        handler = asyncio.create_task(handle())
+        watcher = asyncio.create_task(disconnected.wait())
+        try:
+            await asyncio.wait((handler, watcher), return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done():
+                CANCELLATIONS.inc(endpoint, "running" if admitted else "queued")
+                logger.info(f"Client disconnected; cancelling {scope['path']} for session {session[:8]}")
+                handler.cancel()
+                try:
+                    await handler
+                except asyncio.CancelledError:
+                    pass
+                return
+            await handler
+        finally:
+            for task in (reader, watcher, handler):
+                task.cancel()
+
+    async def _websocket(self, scope, receive, send, endpoint: str):
+        session = _session_key(scope)
+        if not self.controller.try_acquire(endpoint, session):
+            logger.warning(f"Refused websocket {scope['path']} for session {session[:8]}: at capacity")
+            message = await receive()
+            if message["type"] == "websocket.connect":
+                # Accept first so the client sees the close code rather than a failed handshake
+                await send({"type": "websocket.accept"})
+                await send({
+                    "type": "websocket.close", "code": WS_TRY_AGAIN_LATER, "reason": "Server is busy; retry later.",
+                })
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Connection lifetimes say nothing about request service times; don't record them
+            self.controller.release(endpoint, session)
@@ -14,8 +14,152 @@ class Settings(BaseSettings):
     GEMINI_MODEL_NAME: str = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash")
     ANTHROPIC_MODEL_NAME: str = os.getenv("ANTHROPIC_MODEL_NAME", "claude-3-5-haiku-20241022")
     GROQ_MODEL_NAME: str = os.getenv("GROQ_MODEL_NAME", "openai/gpt-oss-20b")
+    # OpenAI-compatible endpoint override (proxies, local servers)
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+
+    # llm client limits, applied per provider
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_KEEPALIVE_SECONDS: float = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    # stream completions and stop reading as soon as a complete SQL statement has arrived
+    LLM_STREAMING_ENABLED: bool = os.getenv("LLM_STREAMING_ENABLED", "true").lower() == "true"
+
+    # "auto" provider routing
+    # comma-separated providers to route between; empty means every provider with an API key
+    LLM_AUTO_PROVIDERS: str = os.getenv("LLM_AUTO_PROVIDERS", "")
+    # start a second provider if the first hasn't answered after this long; 0 disables hedging
+    LLM_HEDGE_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "0"))
+    LLM_AUTO_MAX_ERROR_RATE: float = float(os.getenv("LLM_AUTO_MAX_ERROR_RATE", "0.5"))
+
+    # schema pruning: only send the tables relevant to the question to the LLM
+    SCHEMA_PRUNING_ENABLED: bool = os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() == "true"
+    SCHEMA_PRUNING_MIN_TABLES: int = int(os.getenv("SCHEMA_PRUNING_MIN_TABLES", "30"))
+    SCHEMA_PRUNING_TOP_K: int = int(os.getenv("SCHEMA_PRUNING_TOP_K", "8"))
+
+    # generated SQL cache
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    # below 1.0, reuse SQL for near-duplicate questions (same content words, reworded); 1.0 is exact match only
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", "1.0"))
+    # SQLite file backing the cache across restarts; empty keeps it in memory only
+    LLM_CACHE_DB_PATH: str = os.getenv("LLM_CACHE_DB_PATH", "")
 
     # sql configs
     SQLALCHEMY_DATABASE_URL: str = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./test.db")
 
+    # connection pooling
+    DB_ASYNC_DRIVERS_ENABLED: bool = os.getenv("DB_ASYNC_DRIVERS_ENABLED", "true").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # worker threads for databases without an async driver
+    DB_THREAD_POOL_SIZE: int = int(os.getenv("DB_THREAD_POOL_SIZE", "16"))
+
+    # embedded DuckDB engine for duckdb:// URLs (CSV/Parquet/SQLite files); 0 and "" keep DuckDB's defaults
+    DUCKDB_THREADS: int = int(os.getenv("DUCKDB_THREADS", "0"))
+    DUCKDB_MEMORY_LIMIT: str = os.getenv("DUCKDB_MEMORY_LIMIT", "")
+    # directory file sources must live under (relative paths resolve against it); empty allows only :memory:
+    DUCKDB_DATA_DIR: str = os.getenv("DUCKDB_DATA_DIR", "")
+
+    # result limits
+    QUERY_MAX_ROWS: int = int(os.getenv("QUERY_MAX_ROWS", "10000"))
+    STREAM_MAX_ROWS: int = int(os.getenv("STREAM_MAX_ROWS", "5000000"))
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "5000"))
+
+    # speech recognition: "google" (remote) or "vosk" (offline, needs SPEECH_VOSK_MODEL_PATH)
+    SPEECH_RECOGNIZER: str = os.getenv("SPEECH_RECOGNIZER", "google")
+    SPEECH_VOSK_MODEL_PATH: str = os.getenv("SPEECH_VOSK_MODEL_PATH", "")
+    SPEECH_LANGUAGE: str = os.getenv("SPEECH_LANGUAGE", "en-US")
+    SPEECH_SAMPLE_RATE: int = int(os.getenv("SPEECH_SAMPLE_RATE", "16000"))
+    SPEECH_WORKERS: int = int(os.getenv("SPEECH_WORKERS", "4"))
+    # longest utterance buffered for recognizers without incremental results; also the most
+    # time ffmpeg gets to decode one uploaded clip
+    SPEECH_MAX_SECONDS: float = float(os.getenv("SPEECH_MAX_SECONDS", "120"))
+
+    # tracing: spans are exported over OTLP/HTTP when enabled (needs opentelemetry-sdk and the exporter)
+    OTEL_ENABLED: bool = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    OTEL_SERVICE_NAME: str = os.getenv("OTEL_SERVICE_NAME", "easyquery")
+
+    # startup warm-up: components built before a worker starts serving; the rest load on first use
+    # comma-separated LLM providers (may include "auto"); empty builds none
+    LLM_PRELOAD_PROVIDERS: str = os.getenv("LLM_PRELOAD_PROVIDERS", "")
+    SPEECH_PRELOAD: bool = os.getenv("SPEECH_PRELOAD", "false").lower() == "true"
+
+    # sessions
+    MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", "100"))
+    SESSION_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "1800"))
+    SESSION_REAPER_INTERVAL_SECONDS: float = float(os.getenv("SESSION_REAPER_INTERVAL_SECONDS", "60"))
+
+    # state shared between workers (session metadata, schema catalogs, generated SQL):
+    # "memory" (one process), "sqlite" (workers on one host) or "redis" (needs the redis package)
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "memory")
+    # empty uses $XDG_RUNTIME_DIR/easyquery (or ~/.cache/easyquery); the file holds database
+    # credentials and is created owner-only, so point it at a private directory
+    STATE_SQLITE_PATH: str = os.getenv("STATE_SQLITE_PATH", "")
+    STATE_REDIS_URL: str = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")
+    STATE_REDIS_PREFIX: str = os.getenv("STATE_REDIS_PREFIX", "easyquery:")
+    # how often a worker re-checks a session it already holds, so disconnects elsewhere take effect
+    STATE_SYNC_INTERVAL_SECONDS: float = float(os.getenv("STATE_SYNC_INTERVAL_SECONDS", "5"))
+
+    # admission control: in-flight caps and bounded wait queues for the expensive endpoints
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_QUERY_CONCURRENCY: int = int(os.getenv("ADMISSION_QUERY_CONCURRENCY", "32"))
+    ADMISSION_BATCH_CONCURRENCY: int = int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "4"))
+    ADMISSION_SPEECH_CONCURRENCY: int = int(os.getenv("ADMISSION_SPEECH_CONCURRENCY", os.getenv("SPEECH_WORKERS", "4")))
+    # requests one session may have running across all of these endpoints
+    ADMISSION_SESSION_CONCURRENCY: int = int(os.getenv("ADMISSION_SESSION_CONCURRENCY", "4"))
+    # waiting requests per endpoint, and per session within it; beyond these requests are refused
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+    ADMISSION_SESSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_SESSION_QUEUE_SIZE", "8"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "15"))
+
+    # query result cache
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # default per-connection TTL; a connection can override it at connect time (0 disables)
+    RESULT_CACHE_TTL_SECONDS: float = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "60"))
+
+    # result handles: results kept server-side for paging through /query/results/{id}
+    # rows read into each handle's snapshot; rows past it are reached by keyset pagination
+    RESULT_HANDLE_MAX_ROWS: int = int(os.getenv("RESULT_HANDLE_MAX_ROWS", "1000000"))
+    # encoded rows held by all handles together; one handle may take a quarter of it
+    RESULT_HANDLE_MAX_BYTES: int = int(os.getenv("RESULT_HANDLE_MAX_BYTES", str(256 * 1024 * 1024)))
+    RESULT_HANDLE_IDLE_TTL_SECONDS: float = float(os.getenv("RESULT_HANDLE_IDLE_TTL_SECONDS", "600"))
+    RESULT_HANDLE_MAX_PER_SESSION: int = int(os.getenv("RESULT_HANDLE_MAX_PER_SESSION", "4"))
+    RESULT_PAGE_MAX_ROWS: int = int(os.getenv("RESULT_PAGE_MAX_ROWS", "10000"))
+
+    # pre-execution SQL guard
+    SQL_GUARD_ENABLED: bool = os.getenv("SQL_GUARD_ENABLED", "true").lower() == "true"
+    # refuse queries the planner estimates above these (0 disables a check)
+    SQL_GUARD_MAX_COST: float = float(os.getenv("SQL_GUARD_MAX_COST", "10000000"))
+    SQL_GUARD_MAX_ROWS_EXAMINED: int = int(os.getenv("SQL_GUARD_MAX_ROWS_EXAMINED", "100000000"))
+    # server-side per-statement timeout (PostgreSQL, MySQL, MariaDB); 0 disables
+    QUERY_STATEMENT_TIMEOUT_SECONDS: float = float(os.getenv("QUERY_STATEMENT_TIMEOUT_SECONDS", "30"))
+
+    # repair loop: failing SQL and the database error are sent back to the LLM for a fix
+    # rounds of repair after the first failure; 0 disables repairs
+    SQL_REPAIR_MAX_ATTEMPTS: int = int(os.getenv("SQL_REPAIR_MAX_ATTEMPTS", "2"))
+    # alternative fixes requested concurrently per round; the first that validates and runs wins
+    SQL_REPAIR_CANDIDATES: int = int(os.getenv("SQL_REPAIR_CANDIDATES", "1"))
+
+    # batch queries
+    BATCH_MAX_QUESTIONS: int = int(os.getenv("BATCH_MAX_QUESTIONS", "100"))
+    BATCH_LLM_CONCURRENCY: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+    # queries of one batch running at once; defaults to the connection pool size
+    BATCH_QUERY_CONCURRENCY: int = int(os.getenv("BATCH_QUERY_CONCURRENCY", os.getenv("DB_POOL_SIZE", "5")))
+
+    # schema catalog
+    SCHEMA_CACHE_TTL_SECONDS: float = float(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "300"))
+    # background profiling (types, keys, row estimates, value samples) rendered into prompts
+    SCHEMA_PROFILING_ENABLED: bool = os.getenv("SCHEMA_PROFILING_ENABLED", "true").lower() == "true"
+    # tables whose rows may be read for value samples when the catalog keeps no statistics
+    SCHEMA_PROFILE_SAMPLE_TABLES: int = int(os.getenv("SCHEMA_PROFILE_SAMPLE_TABLES", "50"))
+    # sample values shown per text column; 0 disables sampling
+    SCHEMA_PROFILE_SAMPLE_VALUES: int = int(os.getenv("SCHEMA_PROFILE_SAMPLE_VALUES", "3"))
+
 settings = Settings()
@@ -0,0 +1,9 @@
+from typing import Optional
+from fastapi import Header, HTTPException
+
+
+async def get_session_id(x_session_id: Optional[str] = Header(None)) -> str:
+    """Session token issued by `/connection/connect`, sent back in the `X-Session-ID` header."""
+    if not x_session_id:
+        raise HTTPException(status_code=401, detail="Missing session token; connect to a database first.")
+    return x_session_id
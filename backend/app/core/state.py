@@ -0,0 +1,327 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Set, Tuple, TypeVar
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Write-throughs started from synchronous code; referenced until done so they aren't collected
+_background: Set[asyncio.Task] = set()
+
+
+class StateStoreError(Exception):
+    """The shared state backend could not be reached or failed a command."""
+
+
+class StateStore(ABC):
+    """
+    Key/value store for state the workers of one deployment share: session metadata,
+    schema catalogs and generated SQL. Keys live in namespaces, values are strings
+    (callers store JSON) and may expire after a TTL in seconds.
+
+    `shared` is False for stores only the current process can see; callers skip
+    mirroring their own in-memory caches into those. The methods block, so async code
+    calls them through `run` (or `submit`).
+    """
+
+    name = "base"
+    shared = True
+
+    def __init__(self):
+        # The latest `submit`ted call; the next one waits for it, so calls run in order
+        self._last_submitted: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        pass
+
+    @abstractmethod
+    def touch(self, namespace: str, key: str, ttl: Optional[float] = None) -> bool:
+        """Restart an entry's TTL; False if it no longer exists."""
+        pass
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def clear(self, namespace: str):
+        pass
+
+    def purge(self) -> int:
+        """Drop expired entries; returns how many. Backends that expire keys themselves return 0."""
+        return 0
+
+    def close(self):
+        pass
+
+    async def run(self, method: Callable[..., T], *args) -> T:
+        """
+        Call one of this store's methods from async code. Shared backends do file or network
+        I/O, so they run in a thread rather than blocking the event loop.
+        """
+        if not self.shared:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def submit(self, method: Callable[..., T], *args, action: str):
+        """
+        `run` in the background, for write-throughs from synchronous code; failures are logged.
+        Submitted calls run in order, so a later write to a key is never overtaken by an earlier one.
+        """
+        previous = self._last_submitted
+
+        async def call():
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            try:
+                await self.run(method, *args)
+            except StateStoreError as e:
+                logger.warning(f"Failed to {action}: {e}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to block (scripts, maintenance tasks)
+            try:
+                method(*args)
+            except StateStoreError as e:
+                logger.warning(f"Failed to {action}: {e}")
+            return
+        task = loop.create_task(call())
+        self._last_submitted = task
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+def _expires_at(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl else None
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store: the default for a single worker."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        super().__init__()
+        self._entries: Dict[Tuple[str, str], Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[(namespace, key)]
+                return None
+            return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[(namespace, key)] = (value, _expires_at(ttl))
+
+    def touch(self, namespace: str, key: str, ttl: Optional[float] = None) -> bool:
+        value = self.get(namespace, key)
+        if value is None:
+            return False
+        self.set(namespace, key, value, ttl)
+        return True
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop((namespace, key), None) is not None
+
+    def clear(self, namespace: str):
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+
+    def purge(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                entry_key for entry_key, (_, expires_at) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for entry_key in expired:
+                del self._entries[entry_key]
+        return len(expired)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    A SQLite file in WAL mode shared by the workers of one host. Session metadata holds
+    database URLs with their credentials, so the file is created readable by its owner only
+    (SQLite gives the WAL files the same mode) in a directory created private.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+        except OSError as e:
+            raise StateStoreError(f"Cannot create state store at {path}: {e}") from e
+        try:
+            # Autocommit: every statement is its own short transaction, so workers never wait on each other for long
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+        except sqlite3.Error as e:
+            raise StateStoreError(f"Cannot open state store at {path}: {e}") from e
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> Tuple[list, int]:
+        """The statement's rows and its affected row count."""
+        try:
+            with self._lock:
+                cursor = self._db.execute(sql, parameters)
+                return cursor.fetchall(), cursor.rowcount
+        except sqlite3.Error as e:
+            raise StateStoreError(str(e)) from e
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        rows, _ = self._execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        )
+        return rows[0][0] if rows else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        self._execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, _expires_at(ttl)),
+        )
+
+    def touch(self, namespace: str, key: str, ttl: Optional[float] = None) -> bool:
+        _, updated = self._execute(
+            "UPDATE state SET expires_at = ? WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (_expires_at(ttl), namespace, key, time.time()),
+        )
+        return updated > 0
+
+    def delete(self, namespace: str, key: str) -> bool:
+        _, deleted = self._execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+        return deleted > 0
+
+    def clear(self, namespace: str):
+        self._execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+    def purge(self) -> int:
+        _, deleted = self._execute("DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RedisStateStore(StateStore):
+    """
+    Redis (or any server speaking its protocol) shared by workers across hosts. Keys are
+    `<prefix><namespace>:<key>` and expire through Redis TTLs. Needs the `redis` package.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "easyquery:"):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise StateStoreError("The redis state backend requires the redis package to be installed.")
+        self.url = url
+        self.prefix = prefix
+        self._errors = (redis.RedisError,)
+        # RESP2: understood by every Redis-compatible server, including ones without HELLO
+        self._client = redis.Redis.from_url(url, protocol=2, socket_timeout=5.0, socket_connect_timeout=5.0)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def _call(self, method: str, *args, **kwargs):
+        try:
+            return getattr(self._client, method)(*args, **kwargs)
+        except self._errors as e:
+            raise StateStoreError(str(e)) from e
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        value = self._call("get", self._key(namespace, key))
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        self._call("set", self._key(namespace, key), value, px=int(ttl * 1000) if ttl else None)
+
+    def touch(self, namespace: str, key: str, ttl: Optional[float] = None) -> bool:
+        name = self._key(namespace, key)
+        if ttl:
+            return bool(self._call("pexpire", name, int(ttl * 1000)))
+        self._call("persist", name)
+        return bool(self._call("exists", name))
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return bool(self._call("delete", self._key(namespace, key)))
+
+    def clear(self, namespace: str):
+        try:
+            keys = list(self._client.scan_iter(match=f"{self.prefix}{namespace}:*", count=500))
+        except self._errors as e:
+            raise StateStoreError(str(e)) from e
+        for start in range(0, len(keys), 500):
+            self._call("delete", *keys[start:start + 500])
+
+    def close(self):
+        self._client.close()
+
+
+def _default_sqlite_path() -> str:
+    """A per-user location: $XDG_RUNTIME_DIR (a private tmpfs on most Linux hosts) or ~/.cache."""
+    base = os.getenv("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "easyquery", "state.sqlite")
+
+
+def create_state_store(backend: str) -> StateStore:
+    """The store named by `STATE_BACKEND`: "memory", "sqlite" or "redis"."""
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        return SQLiteStateStore(settings.STATE_SQLITE_PATH or _default_sqlite_path())
+    if backend == "redis":
+        return RedisStateStore(settings.STATE_REDIS_URL, prefix=settings.STATE_REDIS_PREFIX)
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r}; expected memory, sqlite or redis")
+
+
+def unavailable(e: StateStoreError) -> HTTPException:
+    """The response for a request that can't proceed without the shared state backend."""
+    logger.error(f"Shared state backend unavailable: {e}")
+    return HTTPException(status_code=503, detail="Session store unavailable; retry later.")
+
+
+state_store = create_state_store(settings.STATE_BACKEND)
@@ -0,0 +1,175 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry, SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = registry.register(Histogram(
+    "easyquery_http_request_duration_seconds", "HTTP request latency.", ("method", "endpoint", "status"),
+))
+STAGE_DURATION = registry.register(Histogram(
+    "easyquery_stage_duration_seconds", "Duration of each query pipeline stage.", ("stage",),
+))
+RESULT_ROWS = registry.register(Histogram(
+    "easyquery_result_rows", "Rows returned per executed query.", buckets=SIZE_BUCKETS,
+))
+PROMPT_CHARS = registry.register(Histogram(
+    "easyquery_llm_prompt_chars", "Size of prompts sent to LLM providers.", ("model",), buckets=SIZE_BUCKETS,
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "easyquery_cache_requests_total", "Cache lookups by cache and outcome.", ("cache", "outcome"),
+))
+
+
+class Span:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.duration: Optional[float] = None
+        self._otel_span = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel_span is not None and value is not None:
+            self._otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+
+
+class Trace:
+    """The stages recorded while handling one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value: one metric per recorded stage, durations in ms."""
+        entries = [f"{span.name};dur={span.duration * 1000:.1f}" for span in self.spans if span.duration is not None]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("easyquery_trace", default=None)
+
+_tracer = None
+_tracer_initialized = False
+
+
+def _get_tracer():
+    """OpenTelemetry tracer exporting over OTLP/HTTP, or None when disabled or not installed."""
+    global _tracer, _tracer_initialized
+    if _tracer_initialized:
+        return _tracer
+    _tracer_initialized = True
+    if not settings.OTEL_ENABLED:
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry-sdk / the OTLP exporter are not installed")
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("easyquery")
+    logger.info(f"Exporting OpenTelemetry spans to {settings.OTEL_EXPORTER_OTLP_ENDPOINT}")
+    return _tracer
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a pipeline stage.
+
+    The duration is observed in the stage histogram, added to the current request's trace
+    (and so to its `Server-Timing` header) and, if enabled, exported as an OpenTelemetry span.
+    """
+    current = Span(name, attributes)
+    tracer = _get_tracer()
+    started = time.perf_counter()
+    if tracer is None:
+        try:
+            yield current
+        finally:
+            _finish(current, started)
+        return
+    with tracer.start_as_current_span(name) as otel_span:
+        current._otel_span = otel_span
+        for key, value in attributes.items():
+            current.set(key, value)
+        try:
+            yield current
+        finally:
+            _finish(current, started)
+
+
+def _finish(current: Span, started: float):
+    current.duration = time.perf_counter() - started
+    STAGE_DURATION.observe(current.duration, current.name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append(current)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+class TimingMiddleware:
+    """
+    Starts a trace per HTTP request, adds its `Server-Timing` header and records the request
+    latency histogram (labelled by endpoint name, not raw path, to keep cardinality bounded).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = start_trace()
+        status = 500
+        tracer = _get_tracer()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if tracer is None:
+                await self.app(scope, receive, send_with_timing)
+            else:
+                with tracer.start_as_current_span(f"{scope['method']} {scope['path']}"):
+                    await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - trace.started,
+                scope["method"],
+                getattr(route, "name", "unmatched"),
+                str(status),
+            )
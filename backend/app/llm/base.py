@@ -1,13 +1,145 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Optional
+import asyncio
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.tracing import span, PROMPT_CHARS
+from app.utils.clean_code import SQLStreamExtractor, clean_ai_response
+
+# Database errors can carry whole statements and driver tracebacks; keep re-prompts short
+REPAIR_ERROR_CHARS = 500
+
+
+def build_async_http_client() -> httpx.AsyncClient:
+    """Keep-alive HTTP pool shared by every request an engine makes to its provider."""
+    limits = httpx.Limits(
+        max_connections=settings.LLM_MAX_CONCURRENCY,
+        max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+        keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=settings.LLM_TIMEOUT_SECONDS)
+
 
 class BaseLLMEngine(ABC):
     def __init__(self, model_name: str = "", api_key: str = ""):
-        pass
+        self.model_name = model_name
+        # Engines are long-lived (see `get_llm_engine`), so these are shared by all requests
+        self._limiter = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._http_client: Optional[httpx.AsyncClient] = None
     
     @abstractmethod
     async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
         """
-        Generates an SQL query from a natural language query and a database schema.
+        Generates an SQL query from a natural language query and a database schema, given
+        either as `{table: [columns]}` or as a pre-rendered schema profile fragment.
+        """
+        pass
+
+    async def repair_sql(
+        self,
+        natural_language_query: str,
+        db_schema: Dict[str, Any],
+        failed_sql: str,
+        error: str,
+        variant: int = 0,
+    ) -> str:
+        """
+        Ask for a corrected query after `failed_sql` was rejected with `error`. A non-zero
+        `variant` asks for a different approach, so concurrent candidates don't all repeat
+        the same fix.
+        """
+        question = (
+            f"{natural_language_query}\n\n"
+            f"This SQL query was tried and failed:\n{failed_sql}\n"
+            f"Database error: {error[:REPAIR_ERROR_CHARS]}\n"
+            f"Write a corrected SQL query."
+        )
+        if variant:
+            question += f" Take a different approach from the failed query (alternative {variant + 1})."
+        return await self.generate_sql(question, db_schema)
+
+    async def stream_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Yields the raw completion text as it arrives. Engines without token streaming yield
+        their whole answer at once.
+        """
+        yield await self.generate_sql(natural_language_query, db_schema)
+
+    async def _ainvoke(self, prompt: Any) -> Any:
+        """
+        Call `self.llm` without blocking the event loop, bounded by the per-provider
+        concurrency limit and `LLM_TIMEOUT_SECONDS`.
+        """
+        prompt_chars = len(str(prompt))
+        PROMPT_CHARS.observe(prompt_chars, self.model_name)
+        with span("llm.queue", model=self.model_name):
+            await self._limiter.acquire()
+        try:
+            with span("llm.call", model=self.model_name, prompt_chars=prompt_chars):
+                return await asyncio.wait_for(self.llm.ainvoke(prompt), timeout=settings.LLM_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504, detail=f"LLM provider timed out after {settings.LLM_TIMEOUT_SECONDS}s"
+            )
+        finally:
+            self._limiter.release()
+
+    async def _astream(self, prompt: Any) -> AsyncIterator[str]:
+        """
+        Stream `self.llm`'s completion as text chunks, under the same concurrency limit and
+        overall `LLM_TIMEOUT_SECONDS` as `_ainvoke`. Closing the generator early aborts the
+        provider request.
         """
-        pass
\ No newline at end of file
+        prompt_chars = len(str(prompt))
+        PROMPT_CHARS.observe(prompt_chars, self.model_name)
+        with span("llm.queue", model=self.model_name):
+            await self._limiter.acquire()
+        chunks = self.llm.astream(prompt)
+        try:
+            with span("llm.call", model=self.model_name, prompt_chars=prompt_chars, streamed=True):
+                async with asyncio.timeout(settings.LLM_TIMEOUT_SECONDS):
+                    async for chunk in chunks:
+                        text = _chunk_text(chunk.content)
+                        if text:
+                            yield text
+        except TimeoutError:
+            raise HTTPException(
+                status_code=504, detail=f"LLM provider timed out after {settings.LLM_TIMEOUT_SECONDS}s"
+            )
+        finally:
+            await chunks.aclose()
+            self._limiter.release()
+
+    async def _complete_sql(self, prompt: Any) -> str:
+        """
+        The SQL statement answering `prompt`. With `LLM_STREAMING_ENABLED` the completion is
+        streamed and abandoned as soon as a complete statement has been parsed, rather than
+        waiting for any explanation the model adds after it.
+        """
+        if not settings.LLM_STREAMING_ENABLED:
+            response = await self._ainvoke(prompt)
+            return clean_ai_response(_chunk_text(response.content))
+        extractor = SQLStreamExtractor()
+        tokens = self._astream(prompt)
+        try:
+            async for token in tokens:
+                if extractor.feed(token):
+                    break
+        finally:
+            await tokens.aclose()
+        return extractor.finish()
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+def _chunk_text(content: Any) -> str:
+    # Some providers (Anthropic) return content as a list of typed blocks rather than a string
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
@@ -0,0 +1,373 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, FrozenSet, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+from app.core.state import StateStore, StateStoreError, state_store
+from app.core.tracing import record_cache
+from app.llm.base import BaseLLMEngine
+from app.utils.clean_code import SQLStreamExtractor
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# Quoted literals keep their case and punctuation: 'NY' and 'ny' are different filters
+_QUOTED = re.compile(r"('[^']*'|\"[^\"]*\")")
+# Words a rewording may add or drop; negations ("not", "no", "without", ...) are deliberately absent
+_STOPWORDS = frozenset(
+    "a an the of in on at to for from by with and or is are was were be been me my our us we i you "
+    "please show list give get find tell what which who whom whose how all any some each every that "
+    "this these those there their its it do does did can could would should".split()
+)
+
+# State store namespace for entries shared with other workers
+SQL_ENTRIES = "sql"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lower-case, drop punctuation and collapse whitespace so trivial rewordings share a key.
+    Quoted literals are kept verbatim.
+    """
+    parts = []
+    for index, part in enumerate(_QUOTED.split(question)):
+        # split() puts the quoted literals at odd positions
+        parts.append(part if index % 2 else _PUNCTUATION.sub(" ", part.lower()))
+    return _WHITESPACE.sub(" ", " ".join(parts)).strip()
+
+
+def _content_words(question: str) -> FrozenSet[str]:
+    """The words of a normalized question that carry meaning, with quoted literals as single words."""
+    words = set()
+    for index, part in enumerate(_QUOTED.split(question)):
+        if index % 2:
+            words.add(part)
+        else:
+            words.update(word for word in part.split() if word not in _STOPWORDS)
+    return frozenset(words)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(left: Set[str], right: Set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    sql: str
+    created_at: float
+    trigrams: Set[str]
+    words: FrozenSet[str]
+
+
+@dataclass
+class CacheHit:
+    sql: str
+    similarity: float
+
+    @property
+    def match(self) -> str:
+        return "exact" if self.similarity >= 1.0 else "similar"
+
+
+class SQLCache:
+    """
+    LRU/TTL cache of generated SQL keyed on the normalized question, the schema fingerprint
+    and the provider/model that produced it.
+
+    With a similarity threshold below 1.0, an exact miss falls back to questions in the same
+    scope (schema + provider + model) with the same content words, i.e. differing only in
+    stopwords, word order and punctuation, compared by character-trigram Jaccard similarity.
+    Any differing content word rules a match out, so "active" and "not active", "ascending"
+    and "descending" or "top 5" and "top 10" stay distinct.
+    Entries are optionally written through to a SQLite file (from a thread, off the event loop)
+    so the cache survives restarts, and to the shared state store so other workers can reuse them: an exact miss here is
+    looked up there before the question counts as a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400.0,
+        similarity_threshold: float = 1.0,
+        db_path: Optional[str] = None,
+        store: Optional[StateStore] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.db_path = db_path
+        # Only stores other workers can see; a process-local one would just duplicate `_entries`
+        self.store = store if store is not None and store.shared else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._scopes: Dict[str, Set[str]] = {}
+        self._entry_scopes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # Serializes writes to the SQLite file, which happen outside `_lock`
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_store(db_path)
+
+    @staticmethod
+    def _scope(schema_fingerprint: str, provider: str, model: str) -> str:
+        return f"{schema_fingerprint}:{provider}:{model}"
+
+    @staticmethod
+    def _key(scope: str, question: str) -> str:
+        return hashlib.sha256(f"{scope}\n{question}".encode("utf-8")).hexdigest()
+
+    def _open_store(self, db_path: str):
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sql_cache ("
+                "key TEXT PRIMARY KEY, scope TEXT, question TEXT, sql TEXT, created_at REAL)"
+            )
+            self._db.commit()
+            # Warm the in-memory cache with the most recent unexpired entries
+            rows = self._db.execute(
+                "SELECT key, scope, question, sql, created_at FROM sql_cache "
+                "WHERE created_at > ? ORDER BY created_at DESC LIMIT ?",
+                (time.time() - self.ttl_seconds, self.max_entries),
+            ).fetchall()
+            for key, scope, question, sql, created_at in reversed(rows):
+                self._store(key, scope, question, sql, created_at)
+            logger.info(f"Loaded {len(rows)} cached SQL entries from {db_path}")
+        except sqlite3.Error as e:
+            logger.warning(f"SQL cache store at {db_path} unavailable, using memory only: {e}")
+            self._db = None
+
+    def _store(self, key: str, scope: str, question: str, sql: str, created_at: float):
+        self._entries[key] = CacheEntry(
+            question=question,
+            sql=sql,
+            created_at=created_at,
+            trigrams=_trigrams(question),
+            words=_content_words(question),
+        )
+        self._entries.move_to_end(key)
+        self._scopes.setdefault(scope, set()).add(key)
+        self._entry_scopes[key] = scope
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._forget(evicted)
+
+    def _forget(self, key: str):
+        self._entries.pop(key, None)
+        scope = self._entry_scopes.pop(key, None)
+        if scope is not None:
+            keys = self._scopes.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._scopes[scope]
+
+    def _is_expired(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.created_at > self.ttl_seconds
+
+    def _find_similar(self, scope: str, question: str) -> Optional[Tuple[str, float]]:
+        if self.similarity_threshold >= 1.0:
+            return None
+        trigrams = _trigrams(question)
+        words = _content_words(question)
+        best: Optional[Tuple[str, float]] = None
+        for key in self._scopes.get(scope, ()):
+            entry = self._entries[key]
+            if entry.words != words or self._is_expired(entry):
+                continue
+            similarity = _similarity(trigrams, entry.trigrams)
+            if similarity >= self.similarity_threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    async def get(self, question: str, schema_fingerprint: str, provider: str, model: str) -> Optional[CacheHit]:
+        question = normalize_question(question)
+        scope = self._scope(schema_fingerprint, provider, model)
+        key = self._key(scope, question)
+        with self._lock:
+            entry = self._lookup(key)
+        if entry is None and self.store is not None:
+            # Outside the lock and off the event loop: the store may be a network round trip
+            entry = await self._load_shared(key, scope)
+        with self._lock:
+            if entry is not None:
+                self.hits += 1
+                return CacheHit(sql=entry.sql, similarity=1.0)
+            similar = self._find_similar(scope, question)
+            if similar is not None:
+                similar_key, similarity = similar
+                self._entries.move_to_end(similar_key)
+                self.hits += 1
+                return CacheHit(sql=self._entries[similar_key].sql, similarity=similarity)
+            self.misses += 1
+            return None
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and self._is_expired(entry):
+            self._forget(key)
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, question: str, schema_fingerprint: str, provider: str, model: str, sql: str):
+        if not sql or not sql.strip():
+            return
+        question = normalize_question(question)
+        scope = self._scope(schema_fingerprint, provider, model)
+        key = self._key(scope, question)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, scope, question, sql, created_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._persist, key, scope, question, sql, created_at)
+        if self.store is not None:
+            entry = {"scope": scope, "question": question, "sql": sql, "created_at": created_at}
+            self.store.submit(
+                self.store.set, SQL_ENTRIES, key, json.dumps(entry), self.ttl_seconds, action="share SQL cache entry"
+            )
+
+    def _persist(self, key: str, scope: str, question: str, sql: str, created_at: float):
+        with self._db_lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sql_cache (key, scope, question, sql, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, scope, question, sql, created_at),
+                )
+                self._db.execute("DELETE FROM sql_cache WHERE created_at < ?", (created_at - self.ttl_seconds,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist SQL cache entry: {e}")
+
+    def _clear_persisted(self):
+        with self._db_lock:
+            try:
+                self._db.execute("DELETE FROM sql_cache")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to clear persisted SQL cache: {e}")
+
+    async def _load_shared(self, key: str, scope: str) -> Optional[CacheEntry]:
+        """An entry another worker cached under `key`, copied into this cache."""
+        try:
+            value = await self.store.run(self.store.get, SQL_ENTRIES, key)
+        except StateStoreError as e:
+            logger.warning(f"Failed to read shared SQL cache: {e}")
+            return None
+        if value is None:
+            return None
+        shared = json.loads(value)
+        if time.time() - shared["created_at"] > self.ttl_seconds:
+            return None
+        with self._lock:
+            self._store(key, scope, shared["question"], shared["sql"], shared["created_at"])
+            return self._entries[key]
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._entry_scopes.clear()
+        if self._db is not None:
+            await asyncio.to_thread(self._clear_persisted)
+        if self.store is not None:
+            try:
+                await self.store.run(self.store.clear, SQL_ENTRIES)
+            except StateStoreError as e:
+                logger.warning(f"Failed to clear shared SQL cache: {e}")
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+sql_cache = SQLCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.LLM_CACHE_SIMILARITY_THRESHOLD,
+    db_path=settings.LLM_CACHE_DB_PATH or None,
+    store=state_store,
+)
+
+
+async def generate_sql_cached(
+    llm_engine: BaseLLMEngine,
+    llm_provider: str,
+    query_text: str,
+    db_schema: Dict[str, Any],
+    schema_fingerprint: Optional[str],
+) -> Tuple[str, dict]:
+    """
+    Generate SQL, or take it from `sql_cache`, returning the SQL and a cache report for the
+    response. Generated SQL is not cached here: callers `put` it once it has passed the guard
+    (and run), so SQL that is refused or fails is never replayed.
+    """
+    model = getattr(llm_engine, "model_name", "")
+    if not settings.LLM_CACHE_ENABLED or not schema_fingerprint:
+        sql = await llm_engine.generate_sql(query_text, db_schema)
+        return sql, {"hit": False, **sql_cache.stats()}
+
+    hit = await sql_cache.get(query_text, schema_fingerprint, llm_provider, model)
+    record_cache("sql", hit is not None)
+    if hit is not None:
+        logger.info(f"SQL cache {hit.match} hit (similarity {hit.similarity:.2f}) for: {query_text}")
+        return hit.sql, {"hit": True, "match": hit.match, "similarity": round(hit.similarity, 3), **sql_cache.stats()}
+
+    sql = await llm_engine.generate_sql(query_text, db_schema)
+    return sql, {"hit": False, **sql_cache.stats()}
+
+
+async def stream_sql_cached(
+    llm_engine: BaseLLMEngine,
+    llm_provider: str,
+    query_text: str,
+    db_schema: Dict[str, Any],
+    schema_fingerprint: Optional[str],
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming counterpart of `generate_sql_cached`. Yields `("token", text)` for each chunk of
+    the completion, then `("sql", (sql, cache_report))`. The completion is abandoned as soon as
+    it contains a complete statement; a cache hit yields only the final event. As there, the
+    SQL is left for the caller to cache once it has run.
+    """
+    model = getattr(llm_engine, "model_name", "")
+    use_cache = settings.LLM_CACHE_ENABLED and bool(schema_fingerprint)
+    if use_cache:
+        hit = await sql_cache.get(query_text, schema_fingerprint, llm_provider, model)
+        record_cache("sql", hit is not None)
+        if hit is not None:
+            logger.info(f"SQL cache {hit.match} hit (similarity {hit.similarity:.2f}) for: {query_text}")
+            report = {"hit": True, "match": hit.match, "similarity": round(hit.similarity, 3), **sql_cache.stats()}
+            yield "sql", (hit.sql, report)
+            return
+
+    extractor = SQLStreamExtractor()
+    tokens = llm_engine.stream_sql(query_text, db_schema)
+    try:
+        async for token in tokens:
+            yield "token", token
+            if extractor.feed(token):
+                break
+    finally:
+        await tokens.aclose()
+    yield "sql", (extractor.finish(), {"hit": False, **sql_cache.stats()})
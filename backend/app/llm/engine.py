@@ -1,18 +1,74 @@
+from typing import Dict, List, Tuple
+import importlib
+import logging
+
 from app.llm.base import BaseLLMEngine
-from app.llm.providers.openai import OpenAIEngine
-from app.llm.providers.gemini import GeminiEngine
-from app.llm.providers.anthropic import AnthropicEngine
-from app.llm.providers.groq import GroqEngine
+from app.llm.router import RoutingLLMEngine
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# provider -> (module, engine class). Each provider module pulls in its LangChain package, which
+# takes hundreds of milliseconds to import, so a module is only imported when its engine is built.
+PROVIDER_ENGINES: Dict[str, Tuple[str, str]] = {
+    "openai": ("app.llm.providers.openai", "OpenAIEngine"),
+    "gemini": ("app.llm.providers.gemini", "GeminiEngine"),
+    "anthropic": ("app.llm.providers.anthropic", "AnthropicEngine"),
+    "groq": ("app.llm.providers.groq", "GroqEngine"),
+}
+PROVIDERS = tuple(PROVIDER_ENGINES)
+
+# Process-wide engine registry: each provider client (and its HTTP pool) is built once
+_engines: Dict[str, BaseLLMEngine] = {}
+
+
+def auto_providers() -> List[str]:
+    """Providers the "auto" mode routes between: `LLM_AUTO_PROVIDERS`, or every provider with an API key."""
+    if settings.LLM_AUTO_PROVIDERS:
+        return [name.strip() for name in settings.LLM_AUTO_PROVIDERS.split(",") if name.strip()]
+    return [name for name in PROVIDERS if _provider_settings(name)[1]]
+
+
+def _provider_settings(provider: str) -> Tuple[str, str]:
+    """(model name, API key) configured for `provider`."""
+    return {
+        "openai": (settings.OPENAI_MODEL_NAME, settings.OPENAI_API_KEY),
+        "gemini": (settings.GEMINI_MODEL_NAME, settings.GEMINI_API_KEY),
+        "anthropic": (settings.ANTHROPIC_MODEL_NAME, settings.ANTHROPIC_API_KEY),
+        "groq": (settings.GROQ_MODEL_NAME, settings.GROQ_API_KEY),
+    }[provider]
+
+
+def _create_llm_engine(provider: str) -> BaseLLMEngine:
+    if provider == "auto":
+        engines = {name: get_llm_engine(name) for name in auto_providers()}
+        return RoutingLLMEngine(engines, hedge_delay=settings.LLM_HEDGE_DELAY_SECONDS)
+    if provider not in PROVIDER_ENGINES:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    module_name, class_name = PROVIDER_ENGINES[provider]
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    model_name, api_key = _provider_settings(provider)
+    return engine_class(model_name=model_name, api_key=api_key)
+
+
 def get_llm_engine(provider: str) -> BaseLLMEngine:
-    if provider == "openai":
-        return OpenAIEngine(model_name=settings.OPENAI_MODEL_NAME, api_key=settings.OPENAI_API_KEY)
-    elif provider == "gemini":
-        return GeminiEngine(model_name=settings.GEMINI_MODEL_NAME, api_key=settings.GEMINI_API_KEY)
-    elif provider == "anthropic":
-        return AnthropicEngine(model_name=settings.ANTHROPIC_MODEL_NAME, api_key=settings.ANTHROPIC_API_KEY)
-    elif provider == "groq":
-        return GroqEngine(model_name=settings.GROQ_MODEL_NAME, api_key=settings.GROQ_API_KEY)
-    else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
\ No newline at end of file
+    engine = _engines.get(provider)
+    if engine is None:
+        engine = _create_llm_engine(provider)
+        _engines[provider] = engine
+        logger.info(f"Initialized LLM engine for provider: {provider}")
+    return engine
+
+
+def registered_llm_engines() -> Dict[str, BaseLLMEngine]:
+    """Engines built so far, without creating any."""
+    return dict(_engines)
+
+
+async def close_llm_engines():
+    for provider, engine in list(_engines.items()):
+        try:
+            await engine.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close LLM engine {provider}: {e}")
+    _engines.clear()
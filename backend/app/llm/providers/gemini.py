@@ -1,16 +1,31 @@
 from app.llm.base import BaseLLMEngine
+from app.core.config import settings
+from app.core.tracing import span
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 
 class GeminiEngine(BaseLLMEngine):
     def __init__(self, model_name: str = "", api_key: str = ""):
-        self.llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model_name, temperature=0)
+        super().__init__(model_name, api_key)
+        self.llm = ChatGoogleGenerativeAI(
+            google_api_key=api_key,
+            model=model_name,
+            temperature=0,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
 
     async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
-        prompt = self._create_prompt(natural_language_query, db_schema)
-        response = self.llm.invoke(prompt)
-        return response.content
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        return await self._complete_sql(prompt)
+
+    async def stream_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> AsyncIterator[str]:
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        async for token in self._astream(prompt):
+            yield token
 
     def _create_prompt(self, query: str, schema: Dict[str, Any]) -> str:
         template = """
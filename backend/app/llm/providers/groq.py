@@ -1,21 +1,36 @@
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 
-from ..base import BaseLLMEngine
+from ..base import BaseLLMEngine, build_async_http_client
 from ...core.config import settings
-from ...utils.clean_code import clean_ai_response
+from ...core.tracing import span
 
 class GroqEngine(BaseLLMEngine):
     def __init__(self, model_name: str = "", api_key=settings.GROQ_API_KEY):
-        self.llm = ChatGroq(model=model_name, api_key=api_key, temperature=0)
+        super().__init__(model_name, api_key)
+        self._http_client = build_async_http_client()
+        self.llm = ChatGroq(
+            model=model_name,
+            api_key=api_key,
+            temperature=0,
+            http_async_client=self._http_client,
+            request_timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
 
     async def generate_sql(
         self, natural_language_query: str, db_schema: Dict[str, Any]
     ) -> str:
-        prompt = self._create_prompt(natural_language_query, db_schema)
-        response = self.llm.invoke(prompt)
-        return clean_ai_response(response.content)
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        return await self._complete_sql(prompt)
+
+    async def stream_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> AsyncIterator[str]:
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        async for token in self._astream(prompt):
+            yield token
 
     def _create_prompt(self, query: str, schema: Dict[str, Any]) -> str:
         template = """
@@ -1,16 +1,34 @@
-from app.llm.base import BaseLLMEngine
+from app.llm.base import BaseLLMEngine, build_async_http_client
+from app.core.config import settings
+from app.core.tracing import span
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 
 class OpenAIEngine(BaseLLMEngine):
     def __init__(self, model_name: str, api_key: str):
-        self.llm = ChatOpenAI(api_key=api_key, model=model_name, temperature=0)
+        super().__init__(model_name, api_key)
+        self._http_client = build_async_http_client()
+        self.llm = ChatOpenAI(
+            api_key=api_key,
+            model=model_name,
+            temperature=0,
+            base_url=settings.OPENAI_BASE_URL or None,
+            http_async_client=self._http_client,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
 
     async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
-        prompt = self._create_prompt(natural_language_query, db_schema)
-        response = self.llm.invoke(prompt)
-        return response.content
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        return await self._complete_sql(prompt)
+
+    async def stream_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> AsyncIterator[str]:
+        with span("llm.prompt"):
+            prompt = self._create_prompt(natural_language_query, db_schema)
+        async for token in self._astream(prompt):
+            yield token
 
     def _create_prompt(self, query: str, schema: Dict[str, Any]) -> str:
         # A simple but effective prompt template
@@ -0,0 +1,161 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.llm.base import BaseLLMEngine
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider."""
+
+    def __init__(self, window: int = 100, min_samples: int = 5, max_error_rate: float = 0.5, cooldown: float = 30.0):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.last_failure_at: Optional[float] = None
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_cancelled(self, elapsed: float):
+        """A hedged call that lost the race took at least `elapsed`; keep that as a latency sample."""
+        self.latencies.append(elapsed)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.last_failure_at = time.monotonic()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def p50(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 95)
+
+    @property
+    def healthy(self) -> bool:
+        if len(self.outcomes) < self.min_samples or self.error_rate <= self.max_error_rate:
+            return True
+        # Let an unhealthy provider be probed again once it has been quiet for a while
+        return self.last_failure_at is not None and time.monotonic() - self.last_failure_at > self.cooldown
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self.latencies),
+            "p50_ms": None if self.p50 is None else round(self.p50 * 1000, 1),
+            "p95_ms": None if self.p95 is None else round(self.p95 * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.healthy,
+        }
+
+
+class RoutingLLMEngine(BaseLLMEngine):
+    """
+    The "auto" provider: routes each request to the fastest healthy engine.
+
+    Engines are ranked by rolling p50 latency (providers without samples first, so each gets
+    measured), with unhealthy ones last. If `hedge_delay` is set and the first engine hasn't
+    answered by then, the next one is started as well and whichever finishes first wins; the
+    other is cancelled. Failures fall through to the next engine in the ranking.
+    """
+
+    def __init__(self, engines: Dict[str, BaseLLMEngine], hedge_delay: Optional[float] = None, window: int = 100):
+        super().__init__("auto")
+        if not engines:
+            raise ValueError("The auto provider needs at least one configured LLM provider")
+        self.engines = engines
+        self.hedge_delay = hedge_delay if hedge_delay and hedge_delay > 0 else None
+        self.stats = {
+            name: ProviderStats(window=window, max_error_rate=settings.LLM_AUTO_MAX_ERROR_RATE)
+            for name in engines
+        }
+
+    def ranked_providers(self) -> List[str]:
+        def rank(name: str) -> Tuple[int, float]:
+            stats = self.stats[name]
+            if not stats.healthy:
+                return (2, stats.error_rate)
+            if stats.p50 is None:
+                return (0, 0.0)
+            return (1, stats.p50)
+
+        return sorted(self.engines, key=rank)
+
+    async def _call(self, name: str, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        started = time.perf_counter()
+        try:
+            sql = await self.engines[name].generate_sql(natural_language_query, db_schema)
+        except asyncio.CancelledError:
+            # Lost a hedged race: not an error, but without a sample it would be re-tried first forever
+            self.stats[name].record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception:
+            self.stats[name].record_failure()
+            raise
+        self.stats[name].record_success(time.perf_counter() - started)
+        return sql
+
+    async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        remaining = self.ranked_providers()
+        running: Dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+
+        def launch():
+            name = remaining.pop(0)
+            task = asyncio.create_task(self._call(name, natural_language_query, db_schema))
+            running[task] = name
+
+        launch()
+        try:
+            while running:
+                hedge = self.hedge_delay if remaining and len(running) == 1 else None
+                done, _ = await asyncio.wait(running, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Hedging LLM request to {remaining[0]} after {self.hedge_delay}s")
+                    launch()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        logger.info(f"Auto provider served by {name}")
+                        return task.result()
+                    logger.warning(f"LLM provider {name} failed: {task.exception()}")
+                    errors.append(f"{name}: {task.exception()}")
+                if not running and remaining:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+        raise HTTPException(status_code=502, detail=f"All LLM providers failed: {'; '.join(errors)}")
+
+    def stats_report(self) -> Dict[str, Any]:
+        return {
+            "ranking": self.ranked_providers(),
+            "hedge_delay": self.hedge_delay,
+            "providers": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
@@ -0,0 +1,206 @@
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import math
+import re
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER_PARTS = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+# Table names count more than column names when scoring a table against a question
+TABLE_NAME_WEIGHT = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text and identifiers (snake_case, camelCase) into lower-case, crudely singularized terms."""
+    tokens = []
+    for part in _IDENTIFIER_PARTS.findall(text):
+        token = part.lower()
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+_encoding = None
+_encoding_resolved = False
+
+
+def token_encoding():
+    """
+    The tiktoken encoding used by `count_tokens`, or None when it is unavailable.
+
+    Resolved once per process (see `warm_up`): loading may download the BPE file, and a
+    failure is remembered instead of retrying the download on every request.
+    """
+    global _encoding, _encoding_resolved
+    if not _encoding_resolved:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # Not installed, or the encoding file can't be downloaded
+            logger.info(f"tiktoken unavailable, estimating prompt tokens from length: {e}")
+        _encoding_resolved = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Prompt token count with tiktoken when available, otherwise the usual ~4 chars/token estimate."""
+    encoding = token_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+class SchemaIndex:
+    """
+    BM25 index over the tables of one schema.
+
+    Each table is a document made of its name (weighted), column names, comment and the
+    names of the tables it references. The index is built once per schema fingerprint.
+    """
+
+    def __init__(
+        self,
+        schema: Dict[str, List[str]],
+        relations: Optional[Dict[str, List[str]]] = None,
+        comments: Optional[Dict[str, str]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.tables = list(schema)
+        self.schema_tokens = count_tokens(str(schema))
+        self.neighbours = self._build_neighbours(schema, relations or {})
+        self.term_frequencies: Dict[str, Counter] = {}
+        document_frequencies: Counter = Counter()
+        for table, columns in schema.items():
+            terms = tokenize(table) * TABLE_NAME_WEIGHT
+            for column in columns:
+                terms.extend(tokenize(column))
+            terms.extend(tokenize((comments or {}).get(table, "")))
+            for referenced in (relations or {}).get(table, []):
+                terms.extend(tokenize(referenced))
+            frequencies = Counter(terms)
+            self.term_frequencies[table] = frequencies
+            document_frequencies.update(frequencies.keys())
+        self.document_lengths = {table: sum(tf.values()) for table, tf in self.term_frequencies.items()}
+        self.average_length = (sum(self.document_lengths.values()) / len(schema)) if schema else 0.0
+        document_count = len(schema)
+        self.idf = {
+            term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    @staticmethod
+    def _build_neighbours(schema: Dict[str, List[str]], relations: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+        neighbours: Dict[str, Set[str]] = {table: set() for table in schema}
+        for table, referenced_tables in relations.items():
+            for referenced in referenced_tables:
+                if table in neighbours and referenced in neighbours:
+                    neighbours[table].add(referenced)
+                    neighbours[referenced].add(table)
+        # Databases without declared foreign keys: infer joins from `<table>_id` columns
+        singular = {}
+        for table in schema:
+            terms = tokenize(table)
+            if terms:
+                singular["_".join(terms)] = table
+        for table, columns in schema.items():
+            for column in columns:
+                lowered = column.lower()
+                if not lowered.endswith("_id"):
+                    continue
+                referenced = singular.get("_".join(tokenize(lowered[:-3])))
+                if referenced and referenced != table:
+                    neighbours[table].add(referenced)
+                    neighbours[referenced].add(table)
+        return neighbours
+
+    def score(self, question: str) -> Dict[str, float]:
+        terms = set(tokenize(question))
+        scores = {}
+        for table, frequencies in self.term_frequencies.items():
+            length_norm = self.k1 * (1 - self.b + self.b * self.document_lengths[table] / (self.average_length or 1))
+            total = 0.0
+            for term in terms:
+                frequency = frequencies.get(term)
+                if frequency:
+                    total += self.idf[term] * frequency * (self.k1 + 1) / (frequency + length_norm)
+            if total > 0:
+                scores[table] = total
+        return scores
+
+    def select(self, question: str, top_k: int) -> List[str]:
+        """Top-k tables for the question plus their direct join neighbours, in schema order."""
+        scores = self.score(question)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        selected = set(ranked)
+        for table in ranked:
+            selected.update(self.neighbours.get(table, ()))
+        return [table for table in self.tables if table in selected]
+
+
+_indexes: "OrderedDict[str, SchemaIndex]" = OrderedDict()
+_MAX_INDEXES = 32
+
+
+def get_schema_index(
+    schema: Dict[str, List[str]],
+    fingerprint: Optional[str],
+    relations: Optional[Dict[str, List[str]]] = None,
+    comments: Optional[Dict[str, str]] = None,
+) -> SchemaIndex:
+    if fingerprint is None:
+        return SchemaIndex(schema, relations, comments)
+    index = _indexes.get(fingerprint)
+    if index is None:
+        index = SchemaIndex(schema, relations, comments)
+        _indexes[fingerprint] = index
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(fingerprint)
+    return index
+
+
+def prune_schema(
+    question: str,
+    schema: Dict[str, List[str]],
+    fingerprint: Optional[str] = None,
+    relations: Optional[Dict[str, List[str]]] = None,
+    comments: Optional[Dict[str, str]] = None,
+) -> Tuple[Dict[str, List[str]], dict]:
+    """
+    Reduce `schema` to the tables relevant to `question`.
+
+    Small schemas, and questions that match no table at all, keep the full schema. Returns the
+    (possibly) pruned schema and a report with table and prompt token counts before and after.
+    """
+    report = {"tables_total": len(schema), "tables_selected": len(schema), "pruned": False}
+    if not settings.SCHEMA_PRUNING_ENABLED or len(schema) <= settings.SCHEMA_PRUNING_MIN_TABLES:
+        return schema, report
+
+    index = get_schema_index(schema, fingerprint, relations, comments)
+    selected = index.select(question, settings.SCHEMA_PRUNING_TOP_K)
+    if not selected:
+        logger.info("Schema pruning matched no tables; sending the full schema")
+        return schema, report
+
+    pruned = {table: schema[table] for table in selected}
+    report.update(
+        tables_selected=len(pruned),
+        pruned=True,
+        schema_tokens_before=index.schema_tokens,
+        schema_tokens_after=count_tokens(str(pruned)),
+    )
+    logger.info(
+        f"Schema pruned to {len(pruned)}/{len(schema)} tables "
+        f"({report['schema_tokens_before']} -> {report['schema_tokens_after']} tokens)"
+    )
+    return pruned, report
@@ -1,45 +1,88 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import HTTPException as FastAPIHTTPException
 from starlette.middleware.cors import CORSMiddleware
 from app.api.v1.routes import api_router
+from app.core.admission import AdmissionMiddleware
+from app.core.config import settings
+from app.core.metrics import PROMETHEUS_MEDIA_TYPE
+from app.core.tracing import TimingMiddleware
+from app.llm.engine import close_llm_engines
+from app.services.query_service import connection_registry, render_metrics
+from app.services.result_handles import result_handles
+from app.services.warmup import warm_up
+import asyncio
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="EasyQuery API", version="1.0.0")
 
-# Allow CORS for frontend communication
-origins = [
-    "*",
-    "http://127.0.0.1:8080",
-]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    reaper = asyncio.create_task(connection_registry.run_reaper(settings.SESSION_REAPER_INTERVAL_SECONDS))
+    result_reaper = asyncio.create_task(result_handles.run_reaper(settings.SESSION_REAPER_INTERVAL_SECONDS))
+    yield
+    reaper.cancel()
+    result_reaper.cancel()
+    result_handles.close_all()
+    await connection_registry.close_all()
+    await close_llm_engines()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-)
 
-app.include_router(api_router, prefix="/api/v1")
+def create_app() -> FastAPI:
+    """
+    Build the API application. LLM providers and speech recognition are not imported here;
+    they load on first use, or at startup when configured for preloading (see `warm_up`).
+    """
+    app = FastAPI(title="EasyQuery API", version="1.0.0", lifespan=lifespan)
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to EasyQuery Backend!"}
+    # Caps in-flight work on the expensive endpoints; inside CORS so refusals still carry CORS headers
+    app.add_middleware(AdmissionMiddleware)
 
+    # Allow CORS for frontend communication
+    origins = [
+        "*",
+        "http://127.0.0.1:8080",
+    ]
 
-@app.exception_handler(FastAPIHTTPException)
-async def http_exception_handler(request: Request, exc: FastAPIHTTPException):
-    # Ensure HTTPExceptions return JSON with a consistent shape
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+    )
 
+    # Per-request stage timings: Server-Timing header and latency histograms
+    app.add_middleware(TimingMiddleware)
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    # Log full traceback server-side and return a safe JSON error to the client
-    logger.exception(f"Unhandled error: {exc}")
-    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+    app.include_router(api_router, prefix="/api/v1")
+
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to EasyQuery Backend!"}
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+    @app.exception_handler(FastAPIHTTPException)
+    async def http_exception_handler(request: Request, exc: FastAPIHTTPException):
+        # Ensure HTTPExceptions return JSON with a consistent shape
+        return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        # Log full traceback server-side and return a safe JSON error to the client
+        logger.exception(f"Unhandled error: {exc}")
+        return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+    return app
+
+
+# `uvicorn app.main:app`; `uvicorn --factory app.main:create_app` builds a fresh instance
+app = create_app()
@@ -1,11 +1,33 @@
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 class ConnectRequest(BaseModel):
     db_url: str
+    # How long query results on this database may be served from cache; 0 disables caching.
+    # Only applies when this request opens the connection pool for the database.
+    result_cache_ttl_seconds: Optional[float] = None
 
 
 class QueryRequest(BaseModel):
     query_text: str
-    llm_provider: Literal["openai", "gemini", "anthropic", "groq"]
+    # "auto" routes to the fastest healthy configured provider
+    llm_provider: Literal["openai", "gemini", "anthropic", "groq", "auto"]
+    # "json" returns one capped response; "ndjson" and "arrow" stream the full result
+    response_format: Literal["json", "ndjson", "arrow"] = "json"
+    # "records" is a list of {column: value} objects; "compact" is {"columns": [...], "rows": [[...]]}
+    row_format: Literal["records", "compact"] = "records"
+    # Keep the result on the server and return only its first `page_size` rows, with a
+    # handle for fetching the rest from /query/results/{id}; applies to "json" and /query/stream
+    page_size: Optional[int] = Field(None, ge=1)
+
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    llm_provider: Literal["openai", "gemini", "anthropic", "groq", "auto"]
+    row_format: Literal["records", "compact"] = "records"
+
+
+class CacheInvalidateRequest(BaseModel):
+    # Tables whose cached results should be dropped; all of the session's results if omitted
+    tables: Optional[List[str]] = None
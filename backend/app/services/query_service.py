@@ -1,86 +1,368 @@
-import speech_recognition as sr
-import tempfile
-import os
+import asyncio
 import logging
-from fastapi import HTTPException, UploadFile
-from app.api.v1.db import DatabaseManager
-from app.llm.engine import get_llm_engine
-from pydub import AudioSegment
+import time
+from typing import Dict, List, Optional
+from fastapi import HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.api.v1.db import DatabaseManager, ConnectionRegistry
+from app.api.v1.db.result_cache import result_cache, analyze_sql
+from app.core.config import settings
+from app.core.metrics import Gauge, registry
+from app.core.state import state_store
+from app.core.tracing import span
+from app.llm.engine import get_llm_engine, registered_llm_engines
+from app.llm.router import RoutingLLMEngine
+from app.llm.cache import generate_sql_cached, stream_sql_cached, sql_cache
+from app.llm.schema_retrieval import prune_schema
+from app.services.result_handles import result_handles, decode_cursor
+from app.services.result_stream import ndjson_stream, arrow_stream, NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE
+from app.services.sql_repair import Cached, Execute, RepairOutcome, run_with_repair
+from app.utils.json_response import dumps
 
 logger = logging.getLogger(__name__)
 
-# In-memory store for database connections.
-db_connections: dict[str, DatabaseManager] = {}
+# Database connections per session token; sessions on the same database share a pool, and
+# session metadata lives in the shared state store so any worker can serve any session.
+connection_registry = ConnectionRegistry(
+    max_sessions=settings.MAX_SESSIONS,
+    idle_timeout=settings.SESSION_IDLE_TIMEOUT_SECONDS,
+    store=state_store,
+    sync_interval=settings.STATE_SYNC_INTERVAL_SECONDS,
+)
 
-async def process_text_query(session_id: str, query_text: str, llm_provider: str):
-    db_manager = db_connections.get(session_id)
+# Point-in-time values, refreshed on every scrape of /metrics
+SESSIONS = registry.register(Gauge("easyquery_sessions", "Open sessions."))
+OPEN_POOLS = registry.register(Gauge("easyquery_open_pools", "Open database connection pools."))
+CHECKED_OUT = registry.register(Gauge("easyquery_checked_out_connections", "Database connections in use."))
+RESULT_CACHE_BYTES = registry.register(Gauge("easyquery_result_cache_bytes", "Bytes held by the result cache."))
+
+
+def _prune_schema(db_manager: DatabaseManager, query_text: str, db_schema: dict):
+    """
+    The schema to put in the prompt: the tables relevant to the question, as the connection's
+    pre-rendered profile fragment when it is current, otherwise as `{table: [columns]}`.
+    """
+    with span("prune") as stage:
+        pruned_schema, pruning_report = prune_schema(
+            query_text,
+            db_schema,
+            db_manager.schema_fingerprint,
+            db_manager.schema_relations,
+            db_manager.schema_comments,
+        )
+        stage.set("tables", len(pruned_schema))
+        schema_prompt = db_manager.schema_prompt(pruned_schema)
+        profile = db_manager.schema_profile
+        pruning_report["profile_version"] = profile.version if schema_prompt is not None else None
+    return schema_prompt or pruned_schema, pruning_report
+
+
+async def _generate_sql(
+    db_manager: DatabaseManager,
+    llm_provider: str,
+    query_text: str,
+    max_rows: int,
+    db_schema: Optional[dict] = None,
+    execute: Optional[Execute] = None,
+    cached: Optional[Cached] = None,
+):
+    """
+    Schema lookup (unless `db_schema` is given), pruning to the relevant tables, (cached) SQL
+    generation and the pre-execution guard, which caps the query at `max_rows`. With `execute`
+    the guarded SQL is run as well; `cached` lets SQL the result cache will serve skip the
+    EXPLAIN. SQL that fails validation or execution goes through the repair loop. Returns the SQL, a dict of pipeline details to include in the response and
+    the execution result (None without `execute`).
+    """
+    llm_engine = get_llm_engine(llm_provider)
+    if db_schema is None:
+        db_schema = await db_manager.fetch_schema()
+    pruned_schema, pruning_report = _prune_schema(db_manager, query_text, db_schema)
+    with span("llm", provider=llm_provider) as stage:
+        generated_sql_query, cache_info = await generate_sql_cached(
+            llm_engine, llm_provider, query_text, pruned_schema, db_manager.schema_fingerprint
+        )
+        stage.set("cache_hit", cache_info["hit"])
+    outcome = await run_with_repair(
+        db_manager, llm_engine, query_text, pruned_schema, generated_sql_query, max_rows, execute, cached
+    )
+    await _cache_sql(db_manager, llm_engine, llm_provider, query_text, outcome, cache_info)
+    details = {
+        "llm_cache": cache_info, "schema_pruning": pruning_report,
+        "sql_guard": outcome.guard_report, "sql_repair": outcome.report,
+    }
+    return outcome.sql, details, outcome.result
+
+
+async def _cache_sql(
+    db_manager: DatabaseManager, llm_engine, llm_provider: str, query_text: str, outcome: RepairOutcome, cache_info: dict
+):
+    """
+    Cache the SQL that answered a question, now that it has passed the guard (and run). A
+    repaired query replaces the cached one, so the fix isn't paid for again.
+    """
+    if cache_info["hit"] and not outcome.report["repaired"]:
+        return
+    if settings.LLM_CACHE_ENABLED and db_manager.schema_fingerprint:
+        model = getattr(llm_engine, "model_name", "")
+        await sql_cache.put(query_text, db_manager.schema_fingerprint, llm_provider, model, outcome.candidate)
+
+def _executor(session_id: str, db_manager: DatabaseManager, row_format: str, page_size: Optional[int]):
+    """
+    The row cap, `execute` callback and result-cache check for a question: the capped result
+    in one response, or with `page_size` a new result handle (capped at `RESULT_HANDLE_MAX_ROWS`,
+    never cached) once its first page has been read, so failing SQL still reaches the repair loop.
+    """
+    if not page_size:
+        # One row over the cap so `execute_query` can still tell the result was truncated
+        return (
+            settings.QUERY_MAX_ROWS + 1,
+            lambda sql: db_manager.execute_query(sql, row_format=row_format),
+            db_manager.has_cached_result,
+        )
+
+    async def open_handle(sql: str):
+        handle = result_handles.open(session_id, db_manager, sql)
+        try:
+            await handle.ready(min(page_size, settings.RESULT_PAGE_MAX_ROWS) + 1)
+        except Exception:
+            result_handles.close(handle.id)
+            raise
+        return handle
+
+    return settings.RESULT_HANDLE_MAX_ROWS + 1, open_handle, None
+
+
+async def _first_page(result, guard_report: dict, page_size: Optional[int], row_format: str) -> dict:
+    """The response body for an executed query: as is, or the first page of its result handle."""
+    if not page_size:
+        return result
+    # Whether the guard added the LIMIT decides if rows past the snapshot can be reached by keyset
+    result_handles.record_guard(result.id, guard_report)
+    return await result.page(0, min(page_size, settings.RESULT_PAGE_MAX_ROWS), row_format)
+
+
+async def process_text_query(
+    session_id: str, query_text: str, llm_provider: str, row_format: str = "records", page_size: Optional[int] = None
+):
+    db_manager = await connection_registry.get(session_id)
     if not db_manager:
         raise HTTPException(status_code=400, detail="No database connected for this session.")
 
-    llm_engine = get_llm_engine(llm_provider)
-    db_schema = await db_manager.fetch_schema()
-    generated_sql_query = await llm_engine.generate_sql(query_text, db_schema)
-    
     try:
-        result = await db_manager.execute_query(generated_sql_query)
-        return {"message": "Query executed", "results": result, "sql_query": generated_sql_query}
+        max_rows, execute, cached = _executor(session_id, db_manager, row_format, page_size)
+        generated_sql_query, details, result = await _generate_sql(
+            db_manager, llm_provider, query_text, max_rows, execute=execute, cached=cached
+        )
+        result = await _first_page(result, details["sql_guard"], page_size, row_format)
+        return {"message": "Query executed", **result, "sql_query": generated_sql_query, **details}
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error during query: {e}")
 
-async def process_speech_query_service(session_id: str, audio_file: UploadFile, llm_provider: str):
-    db_manager = db_connections.get(session_id)
+async def stream_text_query(session_id: str, query_text: str, llm_provider: str, response_format: str):
+    """
+    Like `process_text_query`, but streams the full result (up to `STREAM_MAX_ROWS`)
+    as NDJSON or an Arrow IPC stream instead of materializing it.
+    """
+    db_manager = await connection_registry.get(session_id)
     if not db_manager:
         raise HTTPException(status_code=400, detail="No database connected for this session.")
 
-    r = sr.Recognizer()
-    try:
-        # Get the file extension from the content type
-        content_type = audio_file.content_type or "audio/webm"
-        file_extension = content_type.split('/')[-1]
-        
-        # Create a temporary file with the appropriate extension
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as temp_audio:
-            temp_audio.write(await audio_file.read())
-            temp_audio_path = temp_audio.name
-        
-        # Convert to WAV format if needed
-        wav_path = None
+    max_rows = settings.STREAM_MAX_ROWS
+    generated_sql_query, details, _ = await _generate_sql(db_manager, llm_provider, query_text, max_rows + 1)
+    headers = {"X-Row-Limit": str(max_rows), "X-LLM-Cache": "hit" if details["llm_cache"]["hit"] else "miss"}
+
+    if response_format == "arrow":
         try:
-            if file_extension.lower() != 'wav':
-                # Convert to WAV using pydub
-                audio = AudioSegment.from_file(temp_audio_path, format=file_extension)
-                wav_path = temp_audio_path.replace(f".{file_extension}", ".wav")
-                audio.export(wav_path, format="wav")
-                audio_file_path = wav_path
-            else:
-                audio_file_path = temp_audio_path
-            
-            # Use the audio file for speech recognition
-            with sr.AudioFile(audio_file_path) as source:
-                audio_data = r.record(source)
-        
-        except Exception as conversion_error:
-            logger.error(f"Audio conversion failed: {conversion_error}")
-            raise HTTPException(status_code=500, detail=f"Audio format conversion failed: {content_type}")
-        
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Arrow output requires pyarrow to be installed.")
+        if db_manager.native_arrow:
+            batches = db_manager.stream_record_batches(generated_sql_query, max_rows=max_rows)
+        else:
+            batches = db_manager.stream_query(generated_sql_query, max_rows=max_rows, convert=False)
+        # Header values must be latin-1; the SQL is only informational here
+        headers["X-SQL-Query"] = " ".join(generated_sql_query.split()).encode("latin-1", "replace").decode("latin-1")
+        return StreamingResponse(arrow_stream(batches), media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+    # Over-fetch by one row so the NDJSON trailer can report truncation
+    batches = db_manager.stream_query(generated_sql_query, max_rows=max_rows + 1)
+    return StreamingResponse(
+        ndjson_stream(batches, generated_sql_query, max_rows), media_type=NDJSON_MEDIA_TYPE, headers=headers
+    )
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def stream_query_events(
+    session_id: str, query_text: str, llm_provider: str, row_format: str = "records", page_size: Optional[int] = None
+):
+    """
+    Answer a question as Server-Sent Events: `token` events with the LLM output as it is
+    generated, `sql` once a complete statement has been extracted (generation stops there),
+    then `result` with the same body as `process_text_query`, or `error`.
+    """
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    llm_engine = get_llm_engine(llm_provider)
+    db_schema = await db_manager.fetch_schema()
+
+    async def events():
+        try:
+            pruned_schema, pruning_report = _prune_schema(db_manager, query_text, db_schema)
+            with span("llm", provider=llm_provider, streamed=True) as stage:
+                generation = stream_sql_cached(
+                    llm_engine, llm_provider, query_text, pruned_schema, db_manager.schema_fingerprint
+                )
+                try:
+                    async for kind, value in generation:
+                        if kind == "token":
+                            yield _sse("token", {"text": value})
+                        else:
+                            generated_sql_query, cache_info = value
+                finally:
+                    # Also stops the provider request if the client disconnects mid-generation
+                    await generation.aclose()
+                stage.set("cache_hit", cache_info["hit"])
+            yield _sse("sql", {"sql_query": generated_sql_query, "llm_cache": cache_info})
+
+            max_rows, execute, cached = _executor(session_id, db_manager, row_format, page_size)
+            outcome = await run_with_repair(
+                db_manager, llm_engine, query_text, pruned_schema, generated_sql_query, max_rows,
+                execute=execute, cached=cached,
+            )
+            await _cache_sql(db_manager, llm_engine, llm_provider, query_text, outcome, cache_info)
+            result = await _first_page(outcome.result, outcome.guard_report, page_size, row_format)
+            yield _sse("result", {
+                "message": "Query executed", **result, "sql_query": outcome.sql,
+                "llm_cache": cache_info, "schema_pruning": pruning_report,
+                "sql_guard": outcome.guard_report, "sql_repair": outcome.report,
+            })
+        except HTTPException as e:
+            yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            yield _sse("error", {"status_code": 500, "detail": f"Internal server error during query: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _batch_error(index: int, question: str, error: Exception) -> dict:
+    if isinstance(error, HTTPException):
+        status_code, detail = error.status_code, error.detail
+    else:
+        logger.error(f"Batch question {index} failed: {error}")
+        status_code, detail = 500, f"Internal server error during query: {error}"
+    return {"type": "error", "index": index, "question": question, "status_code": status_code, "detail": detail}
+
+
+async def stream_batch_query(session_id: str, questions: List[str], llm_provider: str, row_format: str = "records"):
+    """
+    Answer several questions in one request, streamed back as NDJSON.
+
+    The schema is fetched once for the whole batch. SQL generation runs for at most
+    `BATCH_LLM_CONCURRENCY` questions at a time and execution for at most
+    `BATCH_QUERY_CONCURRENCY` queries on the session's connection pool; questions that
+    generate the same SQL share one execution. Each question gets a `result` or `error` line
+    as soon as it finishes (in completion order, matched up by `index`), then a `summary` line.
+    """
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions given.")
+    if len(questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400, detail=f"Too many questions; a batch is limited to {settings.BATCH_MAX_QUESTIONS}."
+        )
+    # Surface an unconfigured provider or unreachable database once, before streaming starts
+    get_llm_engine(llm_provider)
+    db_schema = await db_manager.fetch_schema()
+
+    llm_slots = asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY)
+    query_slots = asyncio.Semaphore(settings.BATCH_QUERY_CONCURRENCY)
+    executions: Dict[str, asyncio.Task] = {}
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def execute(sql: str):
+        async with query_slots:
+            return await db_manager.execute_query(sql, row_format=row_format)
+
+    async def answer(index: int, question: str):
+        try:
+            async with llm_slots:
+                sql, details, _ = await _generate_sql(
+                    db_manager, llm_provider, question, settings.QUERY_MAX_ROWS + 1, db_schema,
+                    cached=db_manager.has_cached_result,
+                )
+            key = analyze_sql(sql, db_manager.dialect_name)[0]
+            deduplicated = key in executions
+            if not deduplicated:
+                executions[key] = asyncio.create_task(execute(sql))
+            # Shielded so one waiter being cancelled doesn't cancel the execution others share
+            result = await asyncio.shield(executions[key])
+            item = {
+                "type": "result", "index": index, "question": question, **result,
+                "sql_query": sql, "deduplicated": deduplicated, **details,
+            }
+        except Exception as e:
+            item = _batch_error(index, question, e)
+        await completed.put(item)
+
+    async def lines():
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(answer(index, question)) for index, question in enumerate(questions)]
+        failed = 0
+        try:
+            for _ in tasks:
+                item = await completed.get()
+                failed += item["type"] == "error"
+                yield dumps(item) + b"\n"
+            yield dumps({
+                "type": "summary", "questions": len(questions), "succeeded": len(questions) - failed,
+                "failed": failed, "executed_queries": len(executions),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }) + b"\n"
         finally:
-            # Clean up temporary files
-            os.remove(temp_audio_path)
-            if wav_path:
-                os.remove(wav_path)
+            # Client went away or the stream finished: stop anything still running
+            for task in tasks + list(executions.values()):
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+async def process_speech_query_service(session_id: str, audio_file: UploadFile, llm_provider: str):
+    # Speech support is imported on first use; most workers never need it
+    import speech_recognition as sr
+    from app.services.speech import transcribe_audio
 
-        text_query = r.recognize_google(audio_data)
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+
+    try:
+        text_query = await transcribe_audio(await audio_file.read(), audio_file.content_type)
         logger.info(f"Speech-to-text converted: {text_query}")
 
-        llm_engine = get_llm_engine(llm_provider)
-        db_schema = await db_manager.fetch_schema()
-        generated_sql_query = await llm_engine.generate_sql(text_query, db_schema)
+        generated_sql_query, details, result = await _generate_sql(
+            db_manager, llm_provider, text_query, settings.QUERY_MAX_ROWS + 1,
+            execute=db_manager.execute_query, cached=db_manager.has_cached_result,
+        )
 
-        result = await db_manager.execute_query(generated_sql_query)
-        return {"message": "Speech query processed", "text_query": text_query, "results": result, "sql_query": generated_sql_query}
+        return {
+            "message": "Speech query processed", "text_query": text_query, **result,
+            "sql_query": generated_sql_query, **details,
+        }
 
+    except HTTPException as e:
+        raise e
     except sr.UnknownValueError:
         raise HTTPException(status_code=400, detail="Could not understand audio")
     except sr.RequestError as e:
@@ -94,65 +376,80 @@ async def speech_to_text_only(session_id: str, audio_file: UploadFile):
     Convert speech to text without executing any query.
     Returns only the converted text.
     """
-    r = sr.Recognizer()
-    try:
-        # Get the file extension from the content type
-        content_type = audio_file.content_type or "audio/webm"
-        file_extension = content_type.split('/')[-1]
-        
-        # Create a temporary file with the appropriate extension
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as temp_audio:
-            temp_audio.write(await audio_file.read())
-            temp_audio_path = temp_audio.name
-        
-        # Convert to WAV format if needed
-        wav_path = None
-        try:
-            if file_extension.lower() != 'wav':
-                # Convert to WAV using pydub
-                audio = AudioSegment.from_file(temp_audio_path, format=file_extension)
-                wav_path = temp_audio_path.replace(f".{file_extension}", ".wav")
-                audio.export(wav_path, format="wav")
-                audio_file_path = wav_path
-            else:
-                audio_file_path = temp_audio_path
-            
-            # Use the audio file for speech recognition
-            with sr.AudioFile(audio_file_path) as source:
-                audio_data = r.record(source)
-        
-        except Exception as conversion_error:
-            logger.error(f"Audio conversion failed: {conversion_error}")
-            raise HTTPException(status_code=500, detail=f"Audio format conversion failed: {content_type}")
-        
-        finally:
-            # Clean up temporary files
-            os.remove(temp_audio_path)
-            if wav_path:
-                os.remove(wav_path)
+    import speech_recognition as sr
+    from app.services.speech import transcribe_audio
 
-        # Try to recognize the speech using Google's service
-        try:
-            text_query = r.recognize_google(audio_data)
-        except sr.RequestError as e:
-            logger.error(f"Google speech recognition service error: {e}")
-            raise HTTPException(status_code=500, detail="Speech recognition service unavailable")
-        
+    try:
+        text_query = await transcribe_audio(await audio_file.read(), audio_file.content_type)
         logger.info(f"Speech-to-text converted: {text_query}")
         
         return {"text_query": text_query}
 
+    except HTTPException as e:
+        raise e
     except sr.UnknownValueError:
         raise HTTPException(status_code=400, detail="Could not understand audio")
     except sr.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Speech service error: {e}")
+        logger.error(f"Speech recognition service error: {e}")
+        raise HTTPException(status_code=500, detail="Speech recognition service unavailable")
     except Exception as e:
         logger.error(f"Error converting speech to text: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error processing speech: {e}")
 
 
+async def stream_speech_to_text(websocket: WebSocket, input_format: str):
+    """
+    Transcribe audio sent as binary WebSocket messages, replying with JSON events as text
+    is recognized (`partial`, `final`, then `done` with the full text). The client sends the
+    text message "end" once it has finished recording.
+    """
+    import speech_recognition as sr
+    from app.services.speech import StreamingTranscription, get_recognizer
+
+    await websocket.accept()
+    transcription = None
+    sender = None
+    try:
+        transcription = StreamingTranscription(get_recognizer(), settings.SPEECH_SAMPLE_RATE, input_format)
+        await transcription.start()
+
+        async def send_events():
+            while (event := await transcription.events.get()) is not None:
+                await websocket.send_json(event)
+
+        sender = asyncio.create_task(send_events())
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await transcription.feed(message["bytes"])
+            elif message.get("text") == "end":
+                break
+        await transcription.finish()
+        await sender
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Speech stream client disconnected")
+    except Exception as e:
+        if isinstance(e, sr.UnknownValueError):
+            detail = "Could not understand audio"
+        elif isinstance(e, HTTPException):
+            detail = e.detail
+        else:
+            logger.error(f"Error streaming speech to text: {e}")
+            detail = f"Speech stream failed: {e}"
+        await websocket.send_json({"type": "error", "detail": detail})
+        await websocket.close(code=1011)
+    finally:
+        if sender is not None and not sender.done():
+            sender.cancel()
+        if transcription is not None:
+            await transcription.close()
+
+
 async def get_schema(session_id: str):
-    db_manager = db_connections.get(session_id)
+    db_manager = await connection_registry.get(session_id)
     if not db_manager:
         raise HTTPException(status_code=400, detail="No database connected for this session.")
     try:
@@ -161,4 +458,86 @@ async def get_schema(session_id: str):
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error fetching schema: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error fetching schema: {e}")
+
+
+async def refresh_schema(session_id: str):
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    try:
+        schema = await db_manager.fetch_schema(force_refresh=True)
+        return {"message": "Schema refreshed", "schema": schema, "fingerprint": db_manager.schema_fingerprint}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error refreshing schema: {e}")
+
+
+async def get_schema_profile(session_id: str):
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    profile = db_manager.schema_profile
+    if profile is None:
+        return {"profile": None, "prompt": None}
+    return {
+        "profile": {**profile.summary(), "current": profile.fingerprint == db_manager.schema_fingerprint},
+        "prompt": profile.render(),
+    }
+
+
+async def cache_stats():
+    return {"result_cache": result_cache.stats(), "sql_cache": sql_cache.stats(), "result_handles": result_handles.stats()}
+
+
+async def get_result_page(
+    session_id: str, handle_id: str, offset: int, limit: int, cursor: Optional[str], row_format: str
+):
+    """
+    A page of a result handle: rows `offset` to `offset + limit`, or the page a `next_cursor`
+    from an earlier page points at.
+    """
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    handle = await result_handles.get(handle_id, session_id, db_manager)
+    after = None
+    if cursor:
+        offset, after = decode_cursor(cursor)
+    return await handle.page(offset, min(limit, settings.RESULT_PAGE_MAX_ROWS), row_format, after)
+
+
+async def close_result(session_id: str, handle_id: str):
+    if not await result_handles.discard(handle_id, session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired result handle.")
+    return {"message": "Result handle closed."}
+
+
+async def invalidate_result_cache(session_id: str, tables: Optional[List[str]] = None):
+    db_manager = await connection_registry.get(session_id)
+    if not db_manager:
+        raise HTTPException(status_code=400, detail="No database connected for this session.")
+    if tables:
+        invalidated = result_cache.invalidate_tables(db_manager.cache_key, tables)
+    else:
+        invalidated = result_cache.invalidate_connection(db_manager.cache_key)
+    return {"message": "Result cache invalidated", "invalidated": invalidated}
+
+
+def render_metrics() -> str:
+    """Prometheus exposition of every registered metric."""
+    connections = connection_registry.metrics()
+    SESSIONS.set(connections["sessions"])
+    OPEN_POOLS.set(connections["open_pools"])
+    CHECKED_OUT.set(connections["checked_out_connections"])
+    RESULT_CACHE_BYTES.set(result_cache.bytes)
+    return registry.render()
+
+
+async def provider_stats():
+    """Rolling latency/error stats of the "auto" provider, if it has been used."""
+    llm_engine = registered_llm_engines().get("auto")
+    if not isinstance(llm_engine, RoutingLLMEngine):
+        return {"providers": {}}
+    return llm_engine.stats_report()
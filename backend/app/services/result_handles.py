@@ -0,0 +1,646 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import secrets
+import time
+
+import orjson
+import sqlglot
+from sqlglot import exp
+from fastapi import HTTPException
+
+from app.api.v1.db import DatabaseManager, QueryError
+from app.api.v1.db.dialects import SQLGLOT_DIALECTS
+from app.api.v1.db.serialization import tag_value, untag_value
+from app.core.config import settings
+from app.core.metrics import Gauge, registry
+from app.core.state import StateStoreError, state_store
+from app.utils.json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+OPEN_HANDLES = registry.register(Gauge("easyquery_result_handles", "Open result handles."))
+HANDLE_BYTES = registry.register(Gauge("easyquery_result_handle_bytes", "Encoded rows held by result handles."))
+
+# State store namespace for handle metadata, so other workers can reopen a handle
+RESULT_HANDLES = "result"
+# Rows per encoded chunk of a snapshot; a page decodes only the chunks it overlaps
+_CHUNK_ROWS = 1000
+# How long a page waits for a connection's first schema profile, whose primary keys decide keyset pagination
+_PROFILE_WAIT_SECONDS = 2.0
+
+
+def ordering_key(
+    sql: str, dialect: Optional[str], columns: List[str], primary_keys: Optional[Dict[str, Set[str]]] = None
+) -> Optional[List[Tuple[str, bool]]]:
+    """
+    The output columns `sql` is ordered by, as `(column, descending)` pairs, or None unless the
+    order is a list of output columns in one direction that identifies each row (keyset
+    pagination needs all three; with ties it would skip rows). `primary_keys` maps table names
+    to their key columns, as in the schema profile.
+    """
+    try:
+        statement = sqlglot.parse_one(sql, read=dialect)
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError):
+        return None
+    order = statement.args.get("order") if isinstance(statement, exp.Query) else None
+    if order is None or not order.expressions:
+        return None
+    by_name = {column.lower(): column for column in columns}
+    key = []
+    for ordered in order.expressions:
+        target = ordered.this
+        if isinstance(target, exp.Column):
+            column = by_name.get(target.name.lower())
+        elif isinstance(target, exp.Literal) and target.is_int and 0 < int(target.this) <= len(columns):
+            column = columns[int(target.this) - 1]
+        else:
+            column = None
+        if column is None:
+            return None
+        key.append((column, bool(ordered.args.get("desc"))))
+    if len({descending for _, descending in key}) > 1:
+        return None
+    if not _is_unique(statement, {column.lower() for column, _ in key}, columns, primary_keys or {}):
+        return None
+    return key
+
+
+def primary_keys(db_manager: DatabaseManager) -> Dict[str, Set[str]]:
+    """Lower-cased table name -> its lower-cased primary key columns, from the schema profile."""
+    profile = db_manager.schema_profile
+    if profile is None:
+        return {}
+    keys = {}
+    for name, table in profile.tables.items():
+        columns = {column.name.lower() for column in table.columns if column.primary_key}
+        if columns:
+            keys[name.lower()] = columns
+    return keys
+
+
+def _source_columns(statement: exp.Select, columns: List[str]) -> Dict[str, str]:
+    """Output column -> the source column it passes through unchanged (lower-cased)."""
+    sources: Dict[str, str] = {}
+    for projection in statement.expressions:
+        if isinstance(projection, exp.Star) or (isinstance(projection, exp.Column) and projection.is_star):
+            sources.update({column.lower(): column.lower() for column in columns if column.lower() not in sources})
+            continue
+        inner = projection.this if isinstance(projection, exp.Alias) else projection
+        if isinstance(inner, exp.Column):
+            sources[projection.alias_or_name.lower()] = inner.name.lower()
+    return sources
+
+
+def _is_unique(statement: exp.Query, key: Set[str], columns: List[str], keys: Dict[str, Set[str]]) -> bool:
+    """Whether no two rows of `statement` share the values of the output columns in `key`."""
+    if not isinstance(statement, exp.Select):
+        return False
+    if statement.args.get("distinct") is not None:
+        # DISTINCT over exactly the ordered columns
+        if {column.lower() for column in columns} <= key:
+            return True
+    sources = _source_columns(statement, columns)
+    group = statement.args.get("group")
+    if group is not None:
+        # One row per group: unique if every grouping column is ordered on
+        grouped = set()
+        for expression in group.expressions:
+            if isinstance(expression, exp.Literal) and expression.is_int and 0 < int(expression.this) <= len(columns):
+                grouped.add(columns[int(expression.this) - 1].lower())
+            elif isinstance(expression, exp.Column):
+                outputs = [output for output, source in sources.items() if source == expression.name.lower()]
+                if not outputs:
+                    return False
+                grouped.add(outputs[0])
+            else:
+                return False
+        return grouped <= key
+    # Otherwise only a single table without joins, ordered on all of its primary key
+    # The arg is "from_" in newer sqlglot releases
+    source = statement.args.get("from_") or statement.args.get("from")
+    if statement.args.get("joins") or source is None or not isinstance(source.this, exp.Table):
+        return False
+    table = source.this
+    qualified = ".".join(part.name for part in table.parts).lower()
+    table_key = keys.get(qualified) or keys.get(table.name.lower())
+    if not table_key:
+        return False
+    ordered_sources = {sources[column] for column in key if column in sources}
+    return table_key <= ordered_sources
+
+
+def keyset_sql(sql: str, dialect: Optional[str], key: List[Tuple[str, bool]], after: List[Any], limit: int) -> str:
+    """
+    `sql` (without LIMIT) restricted to the rows after `after` in `key` order, as
+    `(a > x) OR (a = x AND b > y) ...` so it works without row-value comparisons.
+    """
+    statement = sqlglot.parse_one(sql, read=dialect)
+    statement.set("order", None)
+    statement.set("limit", None)
+    statement.set("offset", None)
+    descending = key[0][1]
+    conditions = []
+    for index, (column, _) in enumerate(key):
+        terms = [exp.EQ(this=exp.column(name, quoted=True), expression=exp.convert(value))
+                 for (name, _), value in zip(key[:index], after[:index])]
+        beyond = exp.LT if descending else exp.GT
+        terms.append(beyond(this=exp.column(column, quoted=True), expression=exp.convert(after[index])))
+        conditions.append(exp.and_(*terms))
+    query = (
+        exp.select("*")
+        .from_(statement.subquery("_page"))
+        .where(exp.or_(*conditions))
+        .order_by(*(exp.Ordered(this=exp.column(column, quoted=True), desc=desc) for column, desc in key))
+        .limit(limit)
+    )
+    return query.sql(dialect=dialect)
+
+
+def _has_limit(sql: str, dialect: Optional[str]) -> bool:
+    try:
+        return sqlglot.parse_one(sql, read=dialect).args.get("limit") is not None
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError):
+        return True
+
+
+def encode_cursor(offset: int, key: Optional[List[Any]]) -> str:
+    """
+    A page cursor. Key values are type-tagged, so a Decimal or datetime position comes back
+    as one and the next page compares it against the column as the same type.
+    """
+    if key is not None:
+        key = [tag_value(value) for value in key]
+    return base64.urlsafe_b64encode(dumps({"o": offset, "k": key})).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, Optional[List[Any]]]:
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset, key = int(data["o"]), data.get("k")
+        if isinstance(key, list):
+            key = [untag_value(value) for value in key]
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeEncodeError):
+        raise HTTPException(status_code=400, detail="Invalid page cursor.")
+    if offset < 0 or (key is not None and not isinstance(key, list)):
+        raise HTTPException(status_code=400, detail="Invalid page cursor.")
+    return offset, key
+
+
+class ResultHandle:
+    """
+    A query result kept on the server for paging.
+
+    The rows are read once, in the background, into a snapshot of orjson-encoded chunks, so
+    the first page is available as soon as the first chunk arrives and the database connection
+    is released when the read finishes, not when the client stops paging. The snapshot holds
+    at most `max_rows` rows and `max_bytes` bytes; rows past it are reached by keyset
+    pagination when the query is ordered by output columns (re-querying with
+    `WHERE key > last` instead of re-running the whole query).
+    """
+
+    def __init__(
+        self,
+        handle_id: str,
+        session_id: str,
+        db_manager: DatabaseManager,
+        sql: str,
+        max_rows: int,
+        max_bytes: int,
+        limit_added: bool = False,
+        estimated_rows: Optional[int] = None,
+        on_chunk: Optional[Callable[["ResultHandle"], None]] = None,
+    ):
+        self.id = handle_id
+        self.session_id = session_id
+        self.db_manager = db_manager
+        self.sql = sql
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.limit_added = limit_added
+        self.estimated_rows = estimated_rows
+        self.columns: List[str] = []
+        self.row_count = 0
+        self.bytes = 0
+        # The read finished (`done`) and whether it stopped at the row/byte cap (`truncated`)
+        self.done = False
+        self.truncated = False
+        self.error: Optional[HTTPException] = None
+        # Rows reached so far by keyset past the snapshot, and the row count once a page hit the end
+        self.rows_seen = 0
+        self.end: Optional[int] = None
+        self.last_used = time.monotonic()
+        self.on_chunk = on_chunk
+        self._chunks: List[bytes] = []
+        self._starts: List[int] = []
+        # The snapshot's last row with the driver's values, where keyset pages continue from
+        self._last_row: Optional[Sequence[Any]] = None
+        self._key: Optional[List[Tuple[str, bool]]] = None
+        # The schema profile `_key` was worked out with; keys may become known once it is built
+        self._key_profile: Any = None
+        # A LIMIT written into the query itself bounds the result, so paging can't go past the snapshot
+        self._own_limit = not limit_added and _has_limit(sql, self.dialect)
+        self._progress = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        # Estimates started outside `_task`, referenced until done and cancelled on close
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def dialect(self) -> Optional[str]:
+        return SQLGLOT_DIALECTS.get(self.db_manager.dialect_name)
+
+    def record_guard(self, guard_report: dict):
+        """Take what the SQL guard learned: whether it added the LIMIT, and the planner's row estimate."""
+        self.limit_added = bool(guard_report.get("limit_added"))
+        self._own_limit = not self.limit_added and _has_limit(self.sql, self.dialect)
+        if self.limit_added:
+            # The guard's estimate is for the capped query; the first page usually returns
+            # before the snapshot is complete, so the whole result is estimated once it is
+            if self.done and self.truncated:
+                task = asyncio.create_task(self._estimate())
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+        elif guard_report.get("estimated_rows") is not None:
+            self.estimated_rows = guard_report["estimated_rows"]
+
+    def metadata(self) -> dict:
+        return {
+            "session_id": self.session_id, "sql": self.sql, "limit_added": self.limit_added,
+            "estimated_rows": self.estimated_rows,
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._fill())
+
+    def close(self):
+        if self._task is not None and not self._task.done():
+            # Its `finally` closes the database cursor
+            self._task.cancel()
+        for task in list(self._background):
+            task.cancel()
+        self._chunks = []
+        self._starts = []
+        self.bytes = 0
+
+    async def _notify(self):
+        async with self._progress:
+            self._progress.notify_all()
+
+    async def _fill(self):
+        # Native values, so the last row keeps exact keyset positions; chunks encode them as responses do
+        stream = self.db_manager.stream_query(
+            self.sql, batch_size=_CHUNK_ROWS, max_rows=self.max_rows + 1, convert=False
+        )
+        try:
+            async for columns, rows in stream:
+                if not self.columns:
+                    self.columns = columns
+                if self.row_count + len(rows) > self.max_rows:
+                    rows = rows[:self.max_rows - self.row_count]
+                    self.truncated = True
+                if rows:
+                    chunk = dumps(rows)
+                    self._starts.append(self.row_count)
+                    self._chunks.append(chunk)
+                    self._last_row = rows[-1]
+                    self.row_count += len(rows)
+                    self.bytes += len(chunk)
+                    if self.on_chunk is not None:
+                        self.on_chunk(self)
+                if self.bytes >= self.max_bytes:
+                    self.truncated = True
+                await self._notify()
+                if self.truncated:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            self.error = e
+        except Exception as e:
+            logger.error(f"Failed to read result {self.id[:8]}: {e}")
+            self.error = QueryError(f"Query execution failed: {e}", str(getattr(e, "orig", None) or e))
+        finally:
+            await stream.aclose()
+            self.done = True
+            await self._notify()
+        if self.truncated and self.limit_added:
+            await self._estimate()
+
+    async def _estimate(self):
+        """Ask the planner for the size of the whole result, past the snapshot."""
+        try:
+            plan = await self.db_manager.explain(self.unbounded_sql)
+            self.estimated_rows = plan.get("estimated_rows") or self.estimated_rows
+        except Exception as e:
+            logger.debug(f"Could not estimate the size of result {self.id[:8]}: {e}")
+
+    @property
+    def unbounded_sql(self) -> str:
+        """The query without the LIMIT the SQL guard added, for paging past the snapshot."""
+        if not self.limit_added:
+            return self.sql
+        statement = sqlglot.parse_one(self.sql, read=self.dialect)
+        statement.set("limit", None)
+        return statement.sql(dialect=self.dialect)
+
+    @property
+    def keyset(self) -> Optional[List[Tuple[str, bool]]]:
+        """The ordering key, once known, if rows past the snapshot can be reached by keyset."""
+        if self._own_limit or not self.columns:
+            return None
+        profile = self.db_manager.schema_profile
+        if self._key is None and self._key_profile is not profile:
+            self._key_profile = profile
+            self._key = ordering_key(self.sql, self.dialect, self.columns, primary_keys(self.db_manager))
+        return self._key
+
+    async def _keyset_rows(self, sql: str, max_rows: int) -> List[list]:
+        """Rows of a keyset page with the driver's values, so the next cursor keeps their types."""
+        rows: List[list] = []
+        stream = self.db_manager.stream_query(sql, batch_size=max_rows, max_rows=max_rows, convert=False)
+        try:
+            async for _, batch in stream:
+                rows.extend(map(list, batch))
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to read a keyset page of result {self.id[:8]}: {e}")
+            raise QueryError(f"Query execution failed: {e}", str(getattr(e, "orig", None) or e))
+        finally:
+            await stream.aclose()
+        return rows
+
+    async def ready(self, rows: int):
+        """Wait until `rows` rows are buffered or the result ended; raises if it failed before any."""
+        async with self._progress:
+            await self._progress.wait_for(lambda: self.done or self.row_count >= rows)
+        if self.error is not None and self.row_count == 0:
+            raise self.error
+
+    def _rows(self, start: int, end: int) -> List[list]:
+        rows: List[list] = []
+        index = max(0, bisect_right(self._starts, start) - 1)
+        while index < len(self._chunks) and self._starts[index] < end:
+            chunk_rows = orjson.loads(self._chunks[index])
+            first = self._starts[index]
+            rows.extend(chunk_rows[max(start - first, 0):max(end - first, 0)])
+            index += 1
+        return rows
+
+    def total(self) -> dict:
+        """Row count of the whole result: exact once read to the end, otherwise an estimate."""
+        if self.done and not self.truncated and self.error is None:
+            return {"rows": self.row_count, "exact": True, "source": "result"}
+        if self.end is not None:
+            return {"rows": self.end, "exact": True, "source": "keyset"}
+        seen = max(self.row_count, self.rows_seen)
+        if self.estimated_rows is not None and self.estimated_rows >= seen:
+            return {"rows": int(self.estimated_rows), "exact": False, "source": "planner"}
+        # Nothing better than what has been read so far
+        return {"rows": seen, "exact": False, "source": "lower_bound"}
+
+    async def page(
+        self, offset: int = 0, limit: int = 100, row_format: str = "records", after: Optional[List[Any]] = None
+    ) -> dict:
+        """
+        Rows `offset` to `offset + limit`, from the snapshot or, past its end, by keyset from
+        `after` (the ordering key of the row before `offset`, as carried in cursors).
+        """
+        self.last_used = time.monotonic()
+        await self.ready(offset + limit + 1)
+        if self._key is None and (self.truncated or not self.done):
+            await self.db_manager.wait_for_profile(_PROFILE_WAIT_SECONDS)
+        if offset < self.row_count or not self.truncated:
+            rows = self._rows(offset, offset + limit)
+            has_more = offset + len(rows) < self.row_count or (self.truncated and self.keyset is not None)
+            source = "snapshot"
+        else:
+            key = self.keyset
+            if key is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Only the first {self.row_count} rows of this result are kept; "
+                           f"order the query by output columns that identify each row (such as its primary key) to page further.",
+                )
+            if after is None:
+                if offset != self.row_count:
+                    raise HTTPException(
+                        status_code=400, detail="Rows past the kept snapshot are reached by following next_cursor.",
+                    )
+                after = self._key_of(self._last_row)
+            if len(after) != len(key):
+                raise HTTPException(status_code=400, detail="Invalid page cursor.")
+            if any(value is None for value in after):
+                raise HTTPException(status_code=400, detail="Can't page past a row whose ordering key is NULL.")
+            sql = keyset_sql(self.unbounded_sql, self.dialect, key, after, limit + 1)
+            rows = await self._keyset_rows(sql, limit + 1)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            source = "keyset"
+            self.rows_seen = max(self.rows_seen, offset + len(rows))
+            if not has_more:
+                self.end = offset + len(rows)
+
+        next_cursor = None
+        if has_more and rows:
+            next_key = None
+            if self.keyset is not None and source == "keyset":
+                next_key = self._key_of(rows[-1])
+            elif self.keyset is not None and offset + len(rows) == self.row_count:
+                # Snapshot rows are decoded JSON; the next page starts from the native last row
+                next_key = self._key_of(self._last_row)
+            next_cursor = encode_cursor(offset + len(rows), next_key)
+        if row_format == "compact":
+            results: Any = {"columns": self.columns, "rows": rows}
+        else:
+            results = [dict(zip(self.columns, row)) for row in rows]
+        return {
+            "results": results,
+            "page": {
+                "handle_id": self.id,
+                "offset": offset,
+                "limit": limit,
+                "rows": len(rows),
+                "source": source,
+                "next_cursor": next_cursor,
+                "total": self.total(),
+                "buffered_rows": self.row_count,
+                "complete": self.done and not self.truncated,
+                "keyset": [column for column, _ in self.keyset] if self.keyset else None,
+                "error": self.error.detail if self.error is not None else None,
+            },
+        }
+
+    def _key_of(self, row: Sequence[Any]) -> List[Any]:
+        positions = {column: index for index, column in enumerate(self.columns)}
+        return [row[positions[column]] for column, _ in self.keyset]
+
+
+class ResultHandleStore:
+    """
+    Open result handles, closed after `idle_ttl` seconds without a page request.
+
+    At most `max_per_session` handles per session are kept (opening another closes the
+    session's least recently used one), and snapshots together hold at most `max_bytes`:
+    the least recently used handles are closed to make room, and one snapshot may take at
+    most a quarter of it. With a shared state store the handle's query is recorded there, so
+    a worker asked for a handle it doesn't hold re-runs the query into a new snapshot.
+    """
+
+    def __init__(self, max_rows: int, max_bytes: int, idle_ttl: float, max_per_session: int):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_per_session = max(1, max_per_session)
+        self._handles: "OrderedDict[str, ResultHandle]" = OrderedDict()
+
+    @property
+    def bytes(self) -> int:
+        return sum(handle.bytes for handle in self._handles.values())
+
+    def _update_metrics(self):
+        OPEN_HANDLES.set(len(self._handles))
+        HANDLE_BYTES.set(self.bytes)
+
+    def open(
+        self,
+        session_id: str,
+        db_manager: DatabaseManager,
+        sql: str,
+        limit_added: bool = False,
+        estimated_rows: Optional[int] = None,
+        handle_id: Optional[str] = None,
+    ) -> ResultHandle:
+        owned = [handle for handle in self._handles.values() if handle.session_id == session_id]
+        for handle in owned[:max(0, len(owned) - self.max_per_session + 1)]:
+            self.close(handle.id)
+        handle = ResultHandle(
+            handle_id or secrets.token_urlsafe(16), session_id, db_manager, sql,
+            max_rows=self.max_rows, max_bytes=self.max_bytes // 4,
+            limit_added=limit_added, estimated_rows=estimated_rows, on_chunk=self._enforce_budget,
+        )
+        self._handles[handle.id] = handle
+        handle.start()
+        if handle_id is None:
+            self._share(handle)
+        self._update_metrics()
+        return handle
+
+    def _enforce_budget(self, growing: ResultHandle):
+        """Close the least recently used other handles while snapshots exceed `max_bytes`."""
+        while self.bytes > self.max_bytes:
+            victim = next((handle for handle in self._handles.values() if handle is not growing), None)
+            if victim is None:
+                return
+            logger.info(f"Result handle memory limit reached; closing handle {victim.id[:8]}")
+            self.close(victim.id)
+        HANDLE_BYTES.set(self.bytes)
+
+    async def get(self, handle_id: str, session_id: str, db_manager: DatabaseManager) -> ResultHandle:
+        handle = self._handles.get(handle_id)
+        if handle is None:
+            handle = await self._reopen(handle_id, session_id, db_manager)
+        if handle is None or handle.session_id != session_id:
+            raise HTTPException(status_code=404, detail="Unknown or expired result handle.")
+        self._handles.move_to_end(handle_id)
+        if state_store.shared:
+            try:
+                await state_store.run(state_store.touch, RESULT_HANDLES, handle_id, self.idle_ttl)
+            except StateStoreError as e:
+                logger.warning(f"Failed to refresh shared result handle: {e}")
+        return handle
+
+    async def _reopen(self, handle_id: str, session_id: str, db_manager: DatabaseManager) -> Optional[ResultHandle]:
+        if not state_store.shared:
+            return None
+        try:
+            value = await state_store.run(state_store.get, RESULT_HANDLES, handle_id)
+        except StateStoreError as e:
+            logger.warning(f"Failed to read shared result handle: {e}")
+            return None
+        if value is None:
+            return None
+        metadata = json.loads(value)
+        if metadata["session_id"] != session_id:
+            return None
+        logger.info(f"Re-running query for result handle {handle_id[:8]} opened by another worker")
+        return self.open(
+            session_id, db_manager, metadata["sql"], metadata["limit_added"], metadata["estimated_rows"],
+            handle_id=handle_id,
+        )
+
+    def record_guard(self, handle_id: str, guard_report: dict):
+        handle = self._handles.get(handle_id)
+        if handle is None:
+            return
+        handle.record_guard(guard_report)
+        self._share(handle)
+
+    def _share(self, handle: ResultHandle):
+        if not state_store.shared:
+            return
+        state_store.submit(
+            state_store.set, RESULT_HANDLES, handle.id, json.dumps(handle.metadata()), self.idle_ttl,
+            action="share result handle",
+        )
+
+    def close(self, handle_id: str) -> bool:
+        """Drop a handle from this worker."""
+        handle = self._handles.pop(handle_id, None)
+        if handle is not None:
+            handle.close()
+        self._update_metrics()
+        return handle is not None
+
+    async def discard(self, handle_id: str, session_id: str) -> bool:
+        """Close a session's handle on every worker; False if the session has no such handle."""
+        handle = self._handles.get(handle_id)
+        if handle is not None and handle.session_id != session_id:
+            return False
+        shared = False
+        if state_store.shared:
+            try:
+                value = await state_store.run(state_store.get, RESULT_HANDLES, handle_id)
+                if value is not None and json.loads(value)["session_id"] == session_id:
+                    shared = await state_store.run(state_store.delete, RESULT_HANDLES, handle_id)
+            except StateStoreError as e:
+                logger.warning(f"Failed to delete shared result handle: {e}")
+        return self.close(handle_id) or shared
+
+    def reap(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [handle.id for handle in self._handles.values() if handle.last_used < cutoff]
+        for handle_id in idle:
+            self.close(handle_id)
+        if idle:
+            logger.info(f"Closed {len(idle)} idle result handles")
+        return len(idle)
+
+    async def run_reaper(self, interval: float = 60.0):
+        """Background task: periodically close idle handles until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Result handle reaper failed: {e}")
+
+    def close_all(self):
+        for handle_id in list(self._handles):
+            self.close(handle_id)
+
+    def stats(self) -> dict:
+        return {"handles": len(self._handles), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+result_handles = ResultHandleStore(
+    max_rows=settings.RESULT_HANDLE_MAX_ROWS,
+    max_bytes=settings.RESULT_HANDLE_MAX_BYTES,
+    idle_ttl=settings.RESULT_HANDLE_IDLE_TTL_SECONDS,
+    max_per_session=settings.RESULT_HANDLE_MAX_PER_SESSION,
+)
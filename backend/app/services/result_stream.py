@@ -0,0 +1,168 @@
+import io
+import logging
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+from app.utils.json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+Batches = AsyncIterator[Tuple[List[str], List[Sequence[Any]]]]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _line(payload: dict) -> bytes:
+    return dumps(payload) + b"\n"
+
+
+async def ndjson_stream(batches: Batches, sql_query: str, max_rows: int) -> AsyncIterator[bytes]:
+    """
+    Encode result batches as newline-delimited JSON.
+
+    The stream is a `meta` line with the columns, one `rows` line per batch (rows as arrays),
+    and an `end` line carrying the row count and whether the row cap was hit. Errors raised
+    after the response has started are reported as an `error` line.
+    """
+    row_count = 0
+    truncated = False
+    columns: Optional[List[str]] = None
+    try:
+        async for batch_columns, rows in batches:
+            if columns is None:
+                columns = batch_columns
+                yield _line({"type": "meta", "sql_query": sql_query, "columns": columns})
+            # `batches` is expected to over-fetch by one row so hitting the cap is detectable
+            if row_count + len(rows) > max_rows:
+                rows = rows[:max_rows - row_count]
+                truncated = True
+            row_count += len(rows)
+            if rows:
+                yield _line({"type": "rows", "rows": rows})
+            if truncated:
+                break
+    except Exception as e:
+        logger.error(f"Streaming query failed after {row_count} rows: {e}")
+        yield _line({"type": "error", "detail": f"Query execution failed: {e}"})
+        return
+    if columns is None:
+        yield _line({"type": "meta", "sql_query": sql_query, "columns": []})
+    yield _line({"type": "end", "row_count": row_count, "truncated": truncated})
+
+
+# Rows sampled before the Arrow schema is fixed, so a column that starts out NULL or as
+# integers and later holds floats/decimals gets a type that fits the whole sample
+_SCHEMA_SAMPLE_ROWS = 10_000
+
+
+def _column_values(columns: List[str], rows: List[Sequence[Any]]) -> List[List[Any]]:
+    return [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+
+
+def _infer_type(pa, values: List[Any]):
+    try:
+        return pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python types in one column (e.g. SQLite's dynamic typing)
+        return pa.string()
+
+
+def _stream_schema(pa, columns: List[str], samples: List[List[List[Any]]]):
+    """Unify the types inferred for each sampled batch, widening numeric types."""
+    fields = []
+    for index, name in enumerate(columns):
+        types = [_infer_type(pa, column_values[index]) for column_values in samples]
+        try:
+            field = pa.unify_schemas(
+                [pa.schema([pa.field(name, type_)]) for type_ in types], promote_options="permissive"
+            ).field(0)
+            type_ = field.type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            type_ = pa.string()
+        if pa.types.is_null(type_):
+            # No value in the sample to take a type from
+            type_ = pa.string()
+        elif pa.types.is_decimal128(type_):
+            # Later batches may carry more digits than the sample did
+            type_ = pa.decimal128(38, type_.scale)
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def _arrow_batch(pa, schema, column_values: List[List[Any]]):
+    arrays = []
+    for field, values in zip(schema, column_values):
+        if pa.types.is_string(field.type):
+            arrays.append(pa.array([None if value is None else str(value) for value in values], type=pa.string()))
+        else:
+            # A safe cast raises on values that don't fit instead of truncating them
+            arrays.append(pa.array(values).cast(field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def arrow_stream(batches: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """
+    Encode result batches as an Arrow IPC stream.
+
+    Expects native driver values (`DatabaseManager.stream_query(..., convert=False)`); the
+    schema is unified from the first `_SCHEMA_SAMPLE_ROWS` rows. `pyarrow.RecordBatch` items
+    (from `DatabaseManager.stream_record_batches` on engines with `native_arrow`) are written
+    as-is. Errors raised after the response has started end the stream with an empty batch
+    whose custom metadata carries an `error` key.
+    """
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    writer = None
+    schema = None
+    columns: Optional[List[str]] = None
+    samples: List[List[List[Any]]] = []
+    sampled_rows = 0
+    row_count = 0
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    def write(batch) -> None:
+        nonlocal writer, schema, row_count
+        if writer is None:
+            schema = batch.schema
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_batch(batch)
+        row_count += batch.num_rows
+
+    def flush_samples() -> None:
+        nonlocal samples
+        stream_schema = _stream_schema(pa, columns, samples)
+        for column_values in samples:
+            write(_arrow_batch(pa, stream_schema, column_values))
+        samples = []
+
+    try:
+        async for item in batches:
+            if isinstance(item, pa.RecordBatch):
+                write(item)
+            elif schema is None:
+                columns, rows = item
+                samples.append(_column_values(columns, rows))
+                sampled_rows += len(rows)
+                if sampled_rows < _SCHEMA_SAMPLE_ROWS:
+                    continue
+                flush_samples()
+            else:
+                write(_arrow_batch(pa, schema, _column_values(*item)))
+            yield drain()
+        if samples:
+            flush_samples()
+    except Exception as e:
+        logger.error(f"Arrow stream failed after {row_count} rows: {e}")
+        if writer is None:
+            schema = pa.schema([])
+            writer = pa.ipc.new_stream(sink, schema)
+        trailer = pa.RecordBatch.from_pylist([], schema=schema)
+        writer.write_batch(trailer, custom_metadata={"error": f"Query execution failed: {e}"})
+    if writer is not None:
+        writer.close()
+        yield drain()
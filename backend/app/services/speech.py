@@ -0,0 +1,326 @@
+from abc import ABC, abstractmethod
+import asyncio
+import io
+import json
+import logging
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Formats `sr.AudioFile` reads straight from memory; everything else is piped through ffmpeg
+NATIVE_FORMATS = {"wav", "x-wav", "wave", "vnd.wave", "aiff", "x-aiff", "flac", "x-flac"}
+
+SAMPLE_WIDTH = 2  # 16-bit signed little-endian PCM throughout
+
+_speech_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_speech_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool for decoding and recognition, so neither runs on the event loop."""
+    global _speech_executor
+    if _speech_executor is None:
+        _speech_executor = ThreadPoolExecutor(max_workers=settings.SPEECH_WORKERS, thread_name_prefix="speech")
+    return _speech_executor
+
+
+def _ffmpeg_command(sample_rate: int) -> List[str]:
+    """ffmpeg reading any container on stdin and writing mono s16le PCM on stdout."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise HTTPException(status_code=500, detail="Audio decoding requires ffmpeg to be installed.")
+    return [
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+    ]
+
+
+def decode_audio(data: bytes, content_type: Optional[str], sample_rate: int) -> bytes:
+    """
+    Decode an uploaded clip to mono 16-bit PCM at `sample_rate`, entirely in memory.
+
+    WAV/AIFF/FLAC are read from a BytesIO; other containers (webm, ogg, mp3, ...) go through a
+    single ffmpeg process over stdin/stdout pipes, killed (422) after `SPEECH_MAX_SECONDS`.
+    """
+    audio_format = (content_type or "audio/webm").split("/")[-1].split(";")[0].strip().lower()
+    if audio_format in NATIVE_FORMATS:
+        import speech_recognition as sr
+
+        with sr.AudioFile(io.BytesIO(data)) as source:
+            audio = sr.Recognizer().record(source)
+        return audio.get_raw_data(convert_rate=sample_rate, convert_width=SAMPLE_WIDTH)
+
+    # ffmpeg decodes far faster than real time, so no clip within the length limit takes as long as the limit
+    timeout = settings.SPEECH_MAX_SECONDS
+    try:
+        process = subprocess.run(_ffmpeg_command(sample_rate), input=data, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.error(f"Audio conversion of a {len(data)} byte {content_type} upload timed out after {timeout:.0f}s")
+        raise HTTPException(status_code=422, detail=f"Audio could not be decoded within {timeout:.0f} seconds.")
+    if process.returncode != 0 or not process.stdout:
+        logger.error(f"Audio conversion failed: {process.stderr.decode(errors='replace').strip()}")
+        raise HTTPException(status_code=500, detail=f"Audio format conversion failed: {content_type}")
+    return process.stdout
+
+
+class RecognizerStream(ABC):
+    """Incremental recognition of one utterance stream. Not thread-safe; feed it sequentially."""
+
+    @abstractmethod
+    def accept(self, pcm: bytes) -> Optional[Dict[str, str]]:
+        """Feed PCM; return a `partial` or `final` event when there is new text."""
+        pass
+
+    @abstractmethod
+    def finish(self) -> Optional[Dict[str, str]]:
+        """Flush buffered audio and return the last `final` event, if any."""
+        pass
+
+
+class BaseRecognizer(ABC):
+    """Speech recognizer backend working on mono 16-bit PCM."""
+
+    name = "base"
+
+    @abstractmethod
+    def stream(self, sample_rate: int) -> RecognizerStream:
+        pass
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        stream = self.stream(sample_rate)
+        texts = []
+        chunk_size = sample_rate * SAMPLE_WIDTH  # one second per chunk
+        for offset in range(0, len(pcm), chunk_size):
+            event = stream.accept(pcm[offset:offset + chunk_size])
+            if event and event["type"] == "final":
+                texts.append(event["text"])
+        event = stream.finish()
+        if event:
+            texts.append(event["text"])
+        text = " ".join(texts).strip()
+        if not text:
+            import speech_recognition as sr
+
+            raise sr.UnknownValueError()
+        return text
+
+
+class _BufferedStream(RecognizerStream):
+    """For backends without incremental recognition: buffer everything, recognize on finish."""
+
+    def __init__(self, recognizer: BaseRecognizer, sample_rate: int, max_bytes: int):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+
+    def accept(self, pcm: bytes) -> Optional[Dict[str, str]]:
+        if len(self.buffer) + len(pcm) > self.max_bytes:
+            raise HTTPException(status_code=413, detail="Audio stream exceeds the maximum utterance length.")
+        self.buffer.extend(pcm)
+        return None
+
+    def finish(self) -> Optional[Dict[str, str]]:
+        if not self.buffer:
+            return None
+        return {"type": "final", "text": self.recognizer.transcribe(bytes(self.buffer), self.sample_rate)}
+
+
+class GoogleRecognizer(BaseRecognizer):
+    """The free Google Web Speech API via `speech_recognition` (network round trip per utterance)."""
+
+    name = "google"
+
+    def __init__(self, language: str):
+        self.language = language
+
+    def stream(self, sample_rate: int) -> RecognizerStream:
+        max_bytes = int(settings.SPEECH_MAX_SECONDS * sample_rate * SAMPLE_WIDTH)
+        return _BufferedStream(self, sample_rate, max_bytes)
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        import speech_recognition as sr
+
+        return sr.Recognizer().recognize_google(sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH), language=self.language)
+
+
+class _VoskStream(RecognizerStream):
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.last_partial = ""
+
+    def accept(self, pcm: bytes) -> Optional[Dict[str, str]]:
+        if self.recognizer.AcceptWaveform(pcm):
+            self.last_partial = ""
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            return {"type": "final", "text": text} if text else None
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        if partial and partial != self.last_partial:
+            self.last_partial = partial
+            return {"type": "partial", "text": partial}
+        return None
+
+    def finish(self) -> Optional[Dict[str, str]]:
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        return {"type": "final", "text": text} if text else None
+
+
+class VoskRecognizer(BaseRecognizer):
+    """Offline recognition on CPU with Vosk (Kaldi); emits partial results while audio streams in."""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str):
+        try:
+            import vosk
+        except ImportError:
+            raise HTTPException(status_code=500, detail="The vosk speech recognizer requires vosk to be installed.")
+        if not model_path:
+            raise HTTPException(status_code=500, detail="SPEECH_VOSK_MODEL_PATH must point to a Vosk model.")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+        logger.info(f"Loaded Vosk model from {model_path}")
+
+    def stream(self, sample_rate: int) -> RecognizerStream:
+        return _VoskStream(self._vosk.KaldiRecognizer(self.model, sample_rate))
+
+
+_recognizer: Optional[BaseRecognizer] = None
+
+
+def get_recognizer() -> BaseRecognizer:
+    """The configured recognizer; created once, since local models are expensive to load."""
+    global _recognizer
+    if _recognizer is None:
+        backend = settings.SPEECH_RECOGNIZER.lower()
+        if backend == "vosk":
+            _recognizer = VoskRecognizer(settings.SPEECH_VOSK_MODEL_PATH)
+        elif backend == "google":
+            _recognizer = GoogleRecognizer(settings.SPEECH_LANGUAGE)
+        else:
+            raise HTTPException(status_code=500, detail=f"Unsupported speech recognizer: {backend}")
+    return _recognizer
+
+
+def _decode_and_transcribe(data: bytes, content_type: Optional[str]) -> str:
+    recognizer = get_recognizer()
+    pcm = decode_audio(data, content_type, settings.SPEECH_SAMPLE_RATE)
+    return recognizer.transcribe(pcm, settings.SPEECH_SAMPLE_RATE)
+
+
+async def transcribe_audio(data: bytes, content_type: Optional[str]) -> str:
+    """Decode and transcribe an uploaded clip on the speech thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_speech_executor(), _decode_and_transcribe, data, content_type)
+
+
+class StreamingTranscription:
+    """
+    Incremental transcription of audio arriving in chunks (e.g. over a WebSocket).
+
+    With `input_format="pcm"` chunks must be mono 16-bit little-endian PCM at `sample_rate`.
+    Any other format (e.g. "webm" from a browser MediaRecorder) is decoded by one long-lived
+    ffmpeg process fed through its stdin pipe. Recognition events (`partial`/`final`, then a
+    `done` event with the whole text) are put on `events`, followed by None.
+    """
+
+    def __init__(self, recognizer: BaseRecognizer, sample_rate: int, input_format: str = "pcm"):
+        self.sample_rate = sample_rate
+        self.input_format = input_format
+        self.events: "asyncio.Queue[Optional[Dict[str, str]]]" = asyncio.Queue()
+        self._stream = recognizer.stream(sample_rate)
+        self._texts: List[str] = []
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.input_format == "pcm":
+            return
+        self._process = await asyncio.create_subprocess_exec(
+            *_ffmpeg_command(self.sample_rate),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read_decoded())
+
+    async def _recognize(self, pcm: bytes):
+        loop = asyncio.get_running_loop()
+        event = await loop.run_in_executor(get_speech_executor(), self._stream.accept, pcm)
+        await self._emit(event)
+
+    async def _emit(self, event: Optional[Dict[str, str]]):
+        if event is None:
+            return
+        if event["type"] == "final":
+            self._texts.append(event["text"])
+        await self.events.put(event)
+
+    async def _read_decoded(self):
+        # 100 ms of audio per read keeps partial results responsive
+        read_size = self.sample_rate * SAMPLE_WIDTH // 10
+        while True:
+            pcm = await self._process.stdout.read(read_size)
+            if not pcm:
+                break
+            await self._recognize(pcm)
+
+    async def feed(self, chunk: bytes):
+        if self._process is None:
+            await self._recognize(chunk)
+            return
+        await self._check_reader()
+        self._process.stdin.write(chunk)
+        # Nothing drains ffmpeg's stdout once the reader is gone, so don't wait on the pipe forever
+        drain = asyncio.ensure_future(self._process.stdin.drain())
+        await asyncio.wait({drain, self._reader}, return_when=asyncio.FIRST_COMPLETED)
+        if not drain.done():
+            drain.cancel()
+            await self._check_reader()
+        drain.result()
+
+    async def _check_reader(self):
+        """Stop ffmpeg and raise if the reader has stopped (e.g. recognition failed or hit its limit)."""
+        if not self._reader.done():
+            return
+        await self._stop_process()
+        error = None if self._reader.cancelled() else self._reader.exception()
+        if error is not None:
+            raise error
+        raise HTTPException(status_code=500, detail="Audio decoding stopped unexpectedly.")
+
+    async def finish(self):
+        """Flush the decoder and recognizer and emit the final events."""
+        if self._process is not None:
+            self._process.stdin.close()
+            await self._reader
+            await self._process.wait()
+            self._process = None
+        loop = asyncio.get_running_loop()
+        await self._emit(await loop.run_in_executor(get_speech_executor(), self._stream.finish))
+        await self.events.put({"type": "done", "text": " ".join(self._texts).strip()})
+        await self.events.put(None)
+
+    async def close(self):
+        """Abandon the transcription (e.g. the client went away)."""
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._process is not None:
+            await self._stop_process()
+        self._process = None
+
+    async def _stop_process(self):
+        if self._process.returncode is None:
+            self._process.kill()
+        # The pipe stays open (and `wait` pending) until its unread output is consumed
+        while await self._process.stdout.read(65536):
+            pass
+        await self._process.wait()
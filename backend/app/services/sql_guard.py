@@ -0,0 +1,104 @@
+import logging
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from fastapi import HTTPException
+
+from app.api.v1.db import DatabaseManager, QueryError
+from app.api.v1.db.dialects import SQLGLOT_DIALECTS
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Nodes that write or change the database; refused anywhere in the statement (e.g. inside a CTE)
+WRITE_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.TruncateTable, exp.Into, exp.Command, exp.Set, exp.Transaction,
+)
+
+# DuckDB table functions that read files from the server, and table names its replacement
+# scans would treat as a file (`FROM '/data/x.csv'`); the embedded engine only serves its own sources
+DUCKDB_FILE_FUNCTIONS = re.compile(r"(read_\w+|\w+_scan|glob|sniff_csv|parquet_\w+|iceberg_\w+|delta_\w+)", re.IGNORECASE)
+DUCKDB_FILE_TABLE = re.compile(r"[/\\]|\.(csv|tsv|txt|parquet|pq|json|ndjson|jsonl|gz|zst|xlsx)$", re.IGNORECASE)
+
+
+def parse_read_query(sql: str, dialect: Optional[str]) -> exp.Query:
+    """
+    Parse `sql` as exactly one read-only query. Malformed SQL raises a `QueryError`; anything
+    that would write raises a plain 400, since that is a refusal rather than a mistake to fix.
+    """
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read=dialect) if statement is not None]
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError) as e:
+        raise QueryError(f"Generated SQL could not be parsed: {e}", str(e))
+    if len(statements) != 1:
+        raise QueryError("Generated SQL must be a single statement.", "expected exactly one SQL statement")
+    statement = statements[0]
+    if not isinstance(statement, exp.Query) or statement.find(*WRITE_NODES) is not None:
+        raise HTTPException(status_code=400, detail="Only read-only SELECT queries are allowed.")
+    if dialect == "duckdb" and _reads_files(statement):
+        raise HTTPException(status_code=400, detail="Queries may only read the connected sources, not files.")
+    return statement
+
+
+def _reads_files(statement: exp.Query) -> bool:
+    for function in statement.find_all(exp.Func):
+        name = function.name if isinstance(function, exp.Anonymous) else function.sql_name()
+        if DUCKDB_FILE_FUNCTIONS.fullmatch(name):
+            return True
+    return any(
+        isinstance(table.this, exp.Identifier) and DUCKDB_FILE_TABLE.search(table.name)
+        for table in statement.find_all(exp.Table)
+    )
+
+
+async def guard_query(
+    db_manager: DatabaseManager, sql: str, max_rows: int, cached: Optional[Callable[[str], bool]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Check generated SQL before it runs.
+
+    The statement must parse as a single read-only query. A LIMIT of `max_rows` is added if it
+    has none, and the database's EXPLAIN estimate is compared against `SQL_GUARD_MAX_COST` and
+    `SQL_GUARD_MAX_ROWS_EXAMINED`. EXPLAIN is skipped when `cached(sql)` says the guarded SQL
+    will be served from the result cache, since it passed the guard when it first ran.
+    Returns the SQL to execute and a report for the response.
+    """
+    report: Dict[str, Any] = {"enabled": settings.SQL_GUARD_ENABLED, "limit_added": False}
+    if not settings.SQL_GUARD_ENABLED:
+        return sql, report
+
+    dialect = SQLGLOT_DIALECTS.get(db_manager.dialect_name)
+    statement = parse_read_query(sql, dialect)
+    if statement.args.get("limit") is None:
+        sql = statement.limit(max_rows).sql(dialect=dialect)
+        report["limit_added"] = True
+    if cached is not None and cached(sql):
+        report["cached"] = True
+        return sql, report
+
+    try:
+        plan = await db_manager.explain(sql)
+    except Exception as e:
+        # The database would reject the query anyway; fail before running anything
+        raise QueryError(f"Query validation failed: {e}", str(getattr(e, "orig", None) or e))
+    report.update(plan)
+
+    cost = plan.get("estimated_cost")
+    rows = plan.get("estimated_rows")
+    if settings.SQL_GUARD_MAX_COST and cost is not None and cost > settings.SQL_GUARD_MAX_COST:
+        logger.warning(f"Refusing query with estimated cost {cost}: {sql}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Query refused: estimated cost {cost:.0f} exceeds the limit of {settings.SQL_GUARD_MAX_COST:.0f}.",
+        )
+    if settings.SQL_GUARD_MAX_ROWS_EXAMINED and rows is not None and rows > settings.SQL_GUARD_MAX_ROWS_EXAMINED:
+        logger.warning(f"Refusing query examining an estimated {rows} rows: {sql}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Query refused: an estimated {rows} rows would be examined "
+                   f"(limit {settings.SQL_GUARD_MAX_ROWS_EXAMINED}).",
+        )
+    return sql, report
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.api.v1.db import DatabaseManager, QueryError
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
+from app.core.tracing import span
+from app.llm.base import BaseLLMEngine
+from app.services.sql_guard import guard_query
+
+logger = logging.getLogger(__name__)
+
+REPAIR_OUTCOMES = registry.register(Counter(
+    "easyquery_sql_repairs_total", "Queries that needed repair, by outcome.", ("outcome",),
+))
+REPAIR_ROUNDS = registry.register(Histogram(
+    "easyquery_sql_repair_rounds", "Repair rounds per query that needed repair.", ("outcome",),
+    buckets=(1, 2, 3, 5, 10),
+))
+
+Execute = Callable[[str], Awaitable[Any]]
+# Whether `execute` would serve the guarded SQL from the result cache
+Cached = Callable[[str], bool]
+
+
+@dataclass
+class RepairOutcome:
+    # Guarded SQL that ran (or passed validation), and the LLM output it came from
+    sql: str
+    candidate: str
+    guard_report: Dict[str, Any]
+    result: Any = None
+    report: Dict[str, Any] = field(default_factory=dict)
+
+
+async def _try_candidates(
+    db_manager: DatabaseManager,
+    candidates: List[str],
+    max_rows: int,
+    execute: Optional[Execute],
+    cached: Optional[Cached] = None,
+) -> Tuple[Optional[RepairOutcome], List[Tuple[str, QueryError]]]:
+    """
+    Validate every candidate concurrently and execute them one at a time in the order they
+    pass validation, stopping at the first that runs. Returns the outcome, or None and the
+    (candidate, error) failures.
+    """
+
+    async def check(candidate: str):
+        try:
+            with span("guard") as stage:
+                sql, guard_report = await guard_query(db_manager, candidate, max_rows, cached)
+                stage.set("limit_added", guard_report["limit_added"])
+        except QueryError as e:
+            return candidate, None, e
+        return candidate, (sql, guard_report), None
+
+    failures: List[Tuple[str, QueryError]] = []
+    checks = [asyncio.create_task(check(candidate)) for candidate in candidates]
+    try:
+        for next_check in asyncio.as_completed(checks):
+            candidate, guarded, error = await next_check
+            if error is not None:
+                failures.append((candidate, error))
+                continue
+            sql, guard_report = guarded
+            try:
+                result = await execute(sql) if execute is not None else None
+            except QueryError as e:
+                failures.append((candidate, e))
+                continue
+            return RepairOutcome(sql, candidate, guard_report, result), failures
+    finally:
+        for task in checks:
+            task.cancel()
+    return None, failures
+
+
+async def _repair_candidates(
+    llm_engine: BaseLLMEngine, question: str, db_schema: Any, failed_sql: str, error: str
+) -> List[str]:
+    count = max(1, settings.SQL_REPAIR_CANDIDATES)
+    answers = await asyncio.gather(
+        *(llm_engine.repair_sql(question, db_schema, failed_sql, error, variant) for variant in range(count)),
+        return_exceptions=True,
+    )
+    candidates = []
+    for answer in answers:
+        if isinstance(answer, BaseException):
+            logger.warning(f"SQL repair request failed: {answer}")
+        elif answer and answer not in candidates and answer != failed_sql:
+            candidates.append(answer)
+    return candidates
+
+
+async def run_with_repair(
+    db_manager: DatabaseManager,
+    llm_engine: BaseLLMEngine,
+    question: str,
+    db_schema: Any,
+    sql: str,
+    max_rows: int,
+    execute: Optional[Execute] = None,
+    cached: Optional[Cached] = None,
+) -> RepairOutcome:
+    """
+    Guard and (if `execute` is given) run generated SQL, repairing it when it fails.
+
+    A candidate that fails to parse, fails EXPLAIN or errors on execution is sent back to
+    `llm_engine` with the database error, for up to `SQL_REPAIR_MAX_ATTEMPTS` rounds of
+    `SQL_REPAIR_CANDIDATES` concurrent alternatives each. Refusals (writes, cost limits) are
+    not repaired. Candidates `cached` reports as result-cache hits skip the EXPLAIN. The
+    outcome's report records candidates tried, rounds and time spent repairing; if every round
+    fails the last error is raised.
+    """
+    started = time.perf_counter()
+    candidates = [sql]
+    attempts = 0
+    rounds = 0
+    errors: List[str] = []
+    while True:
+        attempts += len(candidates)
+        outcome, failures = await _try_candidates(db_manager, candidates, max_rows, execute, cached)
+        errors.extend(error.error for _, error in failures)
+        if outcome is not None:
+            outcome.report = {
+                "attempts": attempts,
+                "rounds": rounds,
+                "repaired": rounds > 0,
+                "errors": errors,
+                "repair_ms": round((time.perf_counter() - started) * 1000, 1) if rounds else 0.0,
+            }
+            if rounds:
+                REPAIR_OUTCOMES.inc("repaired")
+                REPAIR_ROUNDS.observe(rounds, "repaired")
+                logger.info(f"Repaired SQL after {rounds} round(s) and {attempts} candidates")
+            return outcome
+
+        failed_sql, failure = failures[-1]
+        if rounds >= settings.SQL_REPAIR_MAX_ATTEMPTS:
+            if rounds:
+                REPAIR_OUTCOMES.inc("failed")
+                REPAIR_ROUNDS.observe(rounds, "failed")
+            raise failure
+        rounds += 1
+        with span("repair", round=rounds) as stage:
+            candidates = await _repair_candidates(llm_engine, question, db_schema, failed_sql, failure.error)
+            stage.set("candidates", len(candidates))
+        if not candidates:
+            REPAIR_OUTCOMES.inc("failed")
+            REPAIR_ROUNDS.observe(rounds, "failed")
+            raise failure
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.llm.engine import get_llm_engine
+from app.llm.schema_retrieval import token_encoding
+
+logger = logging.getLogger(__name__)
+
+
+def preload_providers() -> list:
+    return [name.strip() for name in settings.LLM_PRELOAD_PROVIDERS.split(",") if name.strip()]
+
+
+async def warm_up():
+    """
+    Build the components configured for preloading (`LLM_PRELOAD_PROVIDERS`, `SPEECH_PRELOAD`)
+    so the first requests don't pay for their imports. Failures are logged, not raised: the
+    component is built again on first use. The tokenizer used for schema pruning is always
+    loaded, off the event loop, since that may download its encoding file.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(token_encoding)
+    for provider in preload_providers():
+        try:
+            get_llm_engine(provider)
+        except Exception as e:
+            logger.warning(f"Warm-up of LLM provider {provider} failed: {e}")
+    if settings.SPEECH_PRELOAD:
+        try:
+            import speech_recognition  # noqa: F401
+            from app.services.speech import get_recognizer
+
+            get_recognizer()
+        except Exception as e:
+            logger.warning(f"Warm-up of speech recognition failed: {e}")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -1,10 +1,140 @@
 import re
+from typing import Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+# Where SQL may start in unfenced output, e.g. after "Here is the query:"; prose can use the same
+# words ("Here I select..."), so each match is only a candidate
+_SQL_START = re.compile(r"\b(SELECT|WITH)\b", re.IGNORECASE)
+# Candidates at the start of a line or after a colon are the likelier statement
+_ANCHORED_START = re.compile(r"(^|\n|:)\s*$")
+_FENCE = "```"
+
+
+def _statement_end(sql: str) -> Optional[int]:
+    """Index of the first `;` outside string literals, quoted identifiers and comments."""
+    index = 0
+    quote = None
+    while index < len(sql):
+        char = sql[index]
+        if quote is not None:
+            if char == quote:
+                # A doubled quote is an escaped quote, not the end of the literal
+                if index + 1 < len(sql) and sql[index + 1] == quote:
+                    index += 1
+                else:
+                    quote = None
+        elif char in "'\"`":
+            quote = char
+        elif sql.startswith("--", index):
+            newline = sql.find("\n", index)
+            if newline == -1:
+                return None
+            index = newline
+        elif sql.startswith("/*", index):
+            close = sql.find("*/", index + 2)
+            if close == -1:
+                return None
+            index = close + 1
+        elif char == ";":
+            return index
+        index += 1
+    return None
+
+
+def _extract(text: str, final: bool = False) -> Tuple[str, bool]:
+    """
+    The SQL in `text` so far, and whether it is terminated: by the closing fence of a
+    fenced block or by a `;` at the top level. Unfenced output is taken from the first
+    keyword at a line start or after a colon that starts a statement which parses; with
+    `final` (the output is complete) an unterminated statement running to the end counts too,
+    and so do keywords mid-sentence if their statement has a FROM.
+    """
+    fence = text.find(_FENCE)
+    if fence != -1:
+        # Skip the language tag ("```sql") up to the end of the opening fence line
+        body_start = text.find("\n", fence + len(_FENCE))
+        if body_start == -1:
+            return "", False
+        close = text.find(_FENCE, body_start)
+        body = text[body_start + 1:] if close == -1 else text[body_start + 1:close]
+        terminated = close != -1
+    else:
+        return _extract_unfenced(text, final)
+    end = _statement_end(body)
+    if end is not None:
+        return body[:end].strip(), True
+    return body.strip(), terminated
+
+
+def _extract_unfenced(text: str, final: bool) -> Tuple[str, bool]:
+    starts = [match.start() for match in _SQL_START.finditer(text)]
+    anchored = [start for start in starts if _ANCHORED_START.search(text[:start])]
+    # A keyword mid-sentence is usually prose ("We select users; ..."): only fall back to those once
+    # the output is complete, and only if they read from something
+    candidates = [(start, False) for start in anchored]
+    if final:
+        candidates += [(start, True) for start in starts if start not in anchored]
+    for start, needs_from in candidates:
+        body = text[start:]
+        end = _statement_end(body)
+        if end is not None:
+            sql = body[:end].strip()
+            if _parses(sql, needs_from):
+                return sql, True
+        elif final and _parses(body.strip(), needs_from):
+            return body.strip(), False
+    if not starts:
+        return "", False
+    # Nothing parses (yet): the likeliest start
+    start = anchored[0] if anchored else starts[0]
+    body = text[start:]
+    end = _statement_end(body)
+    return (body[:end] if end is not None else body).strip(), False
+
+
+class SQLStreamExtractor:
+    """
+    Pulls the SQL statement out of LLM output as it streams in.
+
+    Handles fenced (```sql ... ```) and bare output, with or without surrounding prose. `feed`
+    returns True once the statement is complete, meaning it is terminated and parses, so the
+    caller can stop reading the completion early.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+
+    def feed(self, token: str) -> bool:
+        if self.complete:
+            return True
+        self.text += token
+        sql, terminated = _extract(self.text)
+        if terminated and sql and _parses(sql):
+            self.complete = True
+        return self.complete
+
+    @property
+    def sql(self) -> str:
+        return _extract(self.text, final=True)[0]
+
+    def finish(self) -> str:
+        """The extracted SQL once the stream has ended, falling back to the whole output."""
+        return self.sql or self.text.strip()
+
+
+def _parses(sql: str, needs_from: bool = False) -> bool:
+    try:
+        statement = sqlglot.parse_one(sql)
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError):
+        return False
+    return not needs_from or statement.find(exp.From) is not None
 
-# cleanup the ``` from the ai response
 
 def clean_ai_response(response: str) -> str:
-    # Remove any leading/trailing whitespace and newlines
-    response = response.strip()
-    # Remove code block markers
-    response = re.sub(r"```.*?```", "", response, flags=re.DOTALL)
-    return response
\ No newline at end of file
+    """The SQL statement in a complete LLM response, without code fences or surrounding prose."""
+    extractor = SQLStreamExtractor()
+    extractor.feed(response)
+    return extractor.finish()
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+import base64
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.core.tracing import span
+
+
+def iso_duration(value: timedelta) -> str:
+    """A timedelta as an ISO 8601 duration, e.g. `P1DT2H3M4.5S`."""
+    sign = "-" if value < timedelta(0) else ""
+    value = abs(value)
+    hours, rest = divmod(value.seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if value.microseconds:
+        seconds = f"{seconds}.{value.microseconds:06d}".rstrip("0")
+    time_part = "".join(f"{amount}{unit}" for amount, unit in ((hours, "H"), (minutes, "M"), (seconds, "S")) if amount)
+    days_part = f"{value.days}D" if value.days else ""
+    if not days_part and not time_part:
+        return "PT0S"
+    return f"{sign}P{days_part}{'T' + time_part if time_part else ''}"
+
+
+def _default(value: Any):
+    # orjson handles datetimes natively but not Decimal or these other driver types
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, timedelta):
+        return iso_duration(value)
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, which is several times faster on large result sets."""
+
+    def render(self, content: Any) -> bytes:
+        with span("render") as stage:
+            body = dumps(content)
+            stage.set("bytes", len(body))
+        return body
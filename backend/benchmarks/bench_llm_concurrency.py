@@ -0,0 +1,69 @@
+"""
+Benchmark: LLM provider calls under concurrent load.
+
+Starts a local OpenAI-compatible stub server with fixed latency and fires N concurrent
+`generate_sql` calls two ways:
+
+  before  a new OpenAIEngine per request calling the blocking `llm.invoke()` inside the
+          coroutine (the previous behaviour of `get_llm_engine` and the providers)
+  after   the shared engine from `get_llm_engine` awaiting `ainvoke()` through its
+          keep-alive HTTP pool and concurrency limit
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_concurrency --requests 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+SCHEMA = {"orders": ["id", "customer_id", "amount"], "customers": ["id", "name"]}
+
+
+async def before(count: int) -> float:
+    from app.core.config import settings
+    from app.llm.providers.openai import OpenAIEngine
+
+    async def one():
+        engine = OpenAIEngine(model_name=settings.OPENAI_MODEL_NAME, api_key="stub")
+        prompt = engine._create_prompt("how many orders?", SCHEMA)
+        return engine.llm.invoke(prompt).content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return time.perf_counter() - started
+
+
+async def after(count: int) -> float:
+    from app.llm.engine import get_llm_engine, close_llm_engines
+
+    engine = get_llm_engine("openai")
+    started = time.perf_counter()
+    await asyncio.gather(*(engine.generate_sql("how many orders?", SCHEMA) for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    await close_llm_engines()
+    return elapsed
+
+
+def main(count: int, latency: float):
+    with StubLLMServer(latency=latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ.setdefault("LLM_MAX_CONCURRENCY", str(count))
+
+        blocking = asyncio.run(before(count))
+        pooled = asyncio.run(after(count))
+
+    print(f"{count} concurrent requests, {latency * 1000:.0f} ms stub latency")
+    print(f"before (engine per request, blocking invoke): {blocking:6.2f}s  {count / blocking:7.1f} req/s")
+    print(f"after  (shared engine, ainvoke):              {pooled:6.2f}s  {count / pooled:7.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.requests, args.latency)
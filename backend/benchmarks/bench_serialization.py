@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: per-cell isinstance serialization vs. the column-oriented RowSerializer.
+
+Builds 100k rows x 50 mixed-type columns (ints, floats, strings, Decimals, datetimes, dates,
+times, booleans and NULLs) in memory and times converting them to JSON-safe values and then
+rendering them with the stdlib json module and with orjson, separately and end to end.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --rows 100000 --columns 50
+"""
+import argparse
+import json
+import random
+import time as timer
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+
+from app.api.v1.db.serialization import RowSerializer
+from app.utils.json_response import dumps
+
+
+def make_rows(row_count: int, column_count: int, seed: int = 42):
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    generators = [
+        lambda: rng.randint(0, 1_000_000),
+        lambda: rng.random() * 1000,
+        lambda: f"name-{rng.randint(0, 10_000)}",
+        lambda: Decimal(rng.randint(0, 10_000_000)) / 100,
+        lambda: base + timedelta(seconds=rng.randint(0, 10_000_000)),
+        lambda: (base + timedelta(days=rng.randint(0, 3650))).date(),
+        lambda: time(rng.randint(0, 23), rng.randint(0, 59)),
+        lambda: rng.random() < 0.5,
+    ]
+    column_generators = [generators[index % len(generators)] for index in range(column_count)]
+    columns = [f"col_{index}" for index in range(column_count)]
+    rows = [
+        tuple(None if rng.random() < 0.05 else generate() for generate in column_generators)
+        for _ in range(row_count)
+    ]
+    return columns, rows
+
+
+def legacy_records(columns, rows):
+    """The per-cell isinstance cascade `DatabaseManager.execute_query` used before RowSerializer."""
+    records = []
+    for row in rows:
+        row_dict = {}
+        for key, value in zip(columns, row):
+            if isinstance(value, Decimal):
+                row_dict[key] = float(value)
+            elif isinstance(value, (datetime, date, time)):
+                if isinstance(value, datetime):
+                    row_dict[key] = value.isoformat()
+                elif isinstance(value, date):
+                    row_dict[key] = value.isoformat()
+                elif isinstance(value, time):
+                    row_dict[key] = value.isoformat()
+            else:
+                row_dict[key] = value
+        records.append(row_dict)
+    return records
+
+
+def timed(label, fn, *args):
+    started = timer.perf_counter()
+    result = fn(*args)
+    print(f"{label:<44}{timer.perf_counter() - started:8.3f}s")
+    return result
+
+
+def main(row_count: int, column_count: int):
+    columns, rows = make_rows(row_count, column_count)
+    print(f"{row_count} rows x {column_count} columns\n")
+
+    print("conversion")
+    legacy = timed("  legacy isinstance cascade -> records", legacy_records, columns, rows)
+    records = timed("  RowSerializer -> records", RowSerializer(columns).to_records, rows)
+    compact = timed("  RowSerializer -> compact rows", RowSerializer(columns).to_rows, rows)
+    native = timed("  RowSerializer(native_temporal) -> records", RowSerializer(columns, True).to_records, rows)
+    native_compact = timed("  RowSerializer(native_temporal) -> compact", RowSerializer(columns, True).to_rows, rows)
+    assert legacy == records
+
+    print("rendering")
+    timed("  json.dumps(records)", json.dumps, legacy)
+    timed("  orjson dumps(records)", dumps, records)
+    timed("  orjson dumps(compact)", dumps, {"columns": columns, "rows": compact})
+    timed("  orjson dumps(native records)", dumps, native)
+    timed("  orjson dumps(native compact)", dumps, {"columns": columns, "rows": native_compact})
+    assert dumps(native) == dumps(records)
+
+    print("end to end")
+    timed("  before: cascade + json.dumps", lambda: json.dumps(legacy_records(columns, rows)))
+    timed("  after: native records + orjson", lambda: dumps(RowSerializer(columns, True).to_records(rows)))
+    timed("  after: native compact + orjson", lambda: dumps(
+        {"columns": columns, "rows": RowSerializer(columns, True).to_rows(rows)}
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=50)
+    args = parser.parse_args()
+    main(args.rows, args.columns)
@@ -0,0 +1,95 @@
+"""
+Load test: concurrent /query/query requests against a slow query.
+
+Runs the FastAPI app in-process with a stub LLM and a throwaway SQLite database, fires the
+same slow query sequentially and then concurrently, and samples event-loop lag while the
+requests are in flight. With the blocking driver path every query stalled the loop, so loop
+lag during the concurrent run grew to the sum of all query times and no other request could
+be served. The wall-clock speedup is bounded by available cores, since SQLite does the work
+in-process; against a networked database the concurrent run approaches a single query time.
+
+Usage (from backend/):
+    python -m benchmarks.load_concurrent_queries --requests 8
+    DB_ASYNC_DRIVERS_ENABLED=false python -m benchmarks.load_concurrent_queries
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+import httpx
+
+from app.llm.base import BaseLLMEngine
+from app.main import app
+import app.services.query_service as query_service
+
+# A few hundred ms of pure SQLite work; scale with --iterations
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {iterations}) "
+    "SELECT count(*) AS total FROM n"
+)
+
+
+class StubEngine(BaseLLMEngine):
+    """Returns the question verbatim as SQL so the benchmark measures the database path only."""
+
+    async def generate_sql(self, natural_language_query, db_schema):
+        return natural_language_query
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    interval = 0.005
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run(client: httpx.AsyncClient, sql: str, count: int, concurrent: bool):
+    payload = {"query_text": sql, "llm_provider": "groq"}
+    stop = asyncio.Event()
+    lag = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lag))
+    started = time.perf_counter()
+    if concurrent:
+        responses = await asyncio.gather(
+            *(client.post("/api/v1/query/query", json=payload) for _ in range(count))
+        )
+    else:
+        responses = [await client.post("/api/v1/query/query", json=payload) for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+    return elapsed, max(lag, default=0.0)
+
+
+async def main(count: int, iterations: int):
+    query_service.get_llm_engine = lambda provider: StubEngine()
+    db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+    sqlite3.connect(db_path).close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post("/api/v1/connection/connect", json={"db_url": f"sqlite:///{db_path}"})
+        response.raise_for_status()
+        client.headers["X-Session-ID"] = response.json()["session_id"]
+        sql = SLOW_QUERY.format(iterations=iterations)
+
+        sequential, sequential_lag = await run(client, sql, count, concurrent=False)
+        concurrent, concurrent_lag = await run(client, sql, count, concurrent=True)
+
+    print(f"requests:            {count}")
+    print(f"sequential:          {sequential:.2f}s (max loop lag {sequential_lag * 1000:.0f} ms)")
+    print(f"concurrent:          {concurrent:.2f}s (max loop lag {concurrent_lag * 1000:.0f} ms)")
+    print(f"concurrency speedup: {sequential / concurrent:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.iterations))
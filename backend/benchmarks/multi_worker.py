@@ -0,0 +1,126 @@
+"""
+Throughput of the query endpoint across uvicorn worker processes sharing session state.
+
+For each worker count, starts `uvicorn app.main:app --workers N` with the chosen state backend
+and the stub LLM server (as an OpenAI-compatible endpoint), connects one session and sends
+every query with it over many client connections, so requests land on workers that never
+saw the `/connect`. Any request failing with "No database connected" means session state is
+not shared. Caches are disabled so every request generates and runs its SQL.
+
+With --state redis and no --redis-url, the in-process stand-in (`stub_redis_server`) is used.
+
+Usage (from backend/):
+    python -m benchmarks.multi_worker --workers 1,2,4 --state sqlite
+    python -m benchmarks.multi_worker --workers 2 --state redis --requests 400
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run_suite import git_revision, measure
+from benchmarks.seed import SCALES, database_url, ensure_database
+from benchmarks.stub_llm_server import StubLLMServer
+from benchmarks.stub_redis_server import StubRedisServer
+
+QUERY = "SELECT kind, count(*) AS events, sum(amount) AS revenue FROM events GROUP BY kind ORDER BY kind"
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(workers: int, env: dict):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"{base_url}/", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def run_workers(base_url: str, db_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        response = await client.post("/api/v1/connection/connect", json={"db_url": db_url})
+        response.raise_for_status()
+        client.headers["X-Session-ID"] = response.json()["session_id"]
+        bodies = [{"query_text": f"question {i}", "llm_provider": "openai"} for i in range(args.requests)]
+        # Warm every worker's connection and schema catalog before measuring
+        await measure(client, "POST", "/api/v1/query/query", bodies[:args.concurrency * 2], args.concurrency)
+        return await measure(client, "POST", "/api/v1/query/query", bodies, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda v: [int(n) for n in v.split(",")], default=[1, 2, 4])
+    parser.add_argument("--state", choices=["sqlite", "redis"], default="sqlite")
+    parser.add_argument("--redis-url", help="use this server instead of the in-process stand-in")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "easyquery-bench"))
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    db_url = database_url("sqlite", ensure_database("sqlite", SCALES[args.scale], args.data_dir))
+    results = []
+    with contextlib.ExitStack() as stack:
+        llm = stack.enter_context(StubLLMServer(latency=args.latency, port=free_port(), sql=QUERY))
+        env = {
+            "OPENAI_BASE_URL": llm.base_url,
+            "OPENAI_API_KEY": "stub",
+            "LLM_STREAMING_ENABLED": "false",
+            "LLM_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+            "ADMISSION_CONTROL_ENABLED": "false",
+            "STATE_BACKEND": args.state,
+        }
+        if args.state == "redis":
+            env["STATE_REDIS_URL"] = args.redis_url or stack.enter_context(StubRedisServer(port=free_port())).url
+        for workers in args.workers:
+            if args.state == "sqlite":
+                env["STATE_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "state.sqlite")
+            with serve(workers, env) as base_url:
+                result = asyncio.run(run_workers(base_url, db_url, args))
+            result["workers"] = workers
+            results.append(result)
+            print(f"{workers:>2} workers  {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                  f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors'] or '-'}")
+
+    if args.output:
+        document = {"git": git_revision(), "cpus": os.cpu_count(), "options": vars(args), "results": results}
+        with open(args.output, "w") as handle:
+            json.dump(document, handle, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Benchmark suite: the NL -> SQL pipeline end to end, reproducibly.
+
+Runs the FastAPI app in-process behind httpx's ASGI transport with a deterministic stub LLM
+(fixed question -> SQL mapping, configurable artificial latency) against generated databases
+at several scales, and measures throughput, p50/p99 latency and peak RSS per endpoint. Results
+are written as JSON tagged with the git commit, so runs can be compared across commits:
+
+    python -m benchmarks.run_suite --scales small,medium --output before.json
+    git checkout <branch>
+    python -m benchmarks.run_suite --scales small,medium --output after.json --compare before.json
+
+Scales (dimension tables / fact rows): small 10/1k, medium 500/100k, large 5000/1M,
+xlarge 5000/10M. Databases are generated once into --data-dir and reused. The result and SQL
+caches are disabled unless --with-caches is given, so every request runs the whole pipeline.
+Admission control is off unless --with-admission is given: the suite drives one session at
+--concurrency, which the per-session cap would otherwise serialize.
+DuckDB databases are only generated when `duckdb` and `pyarrow` are installed; they are queried
+through the embedded engine (`DuckDBManager`).
+
+RSS is sampled from /proc while each endpoint runs; on other platforms the process-wide peak
+(getrusage) is reported instead, which never goes down between endpoints.
+
+Usage (from backend/):
+    python -m benchmarks.run_suite --scales small --requests 50 --concurrency 8 --latency 0.05
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import SCALES, database_url, ensure_database
+
+QUESTIONS = {
+    "revenue by event kind": (
+        "SELECT kind, count(*) AS events, sum(amount) AS revenue FROM events GROUP BY kind ORDER BY kind"
+    ),
+    "top spending users": (
+        "SELECT user_id, sum(amount) AS spent FROM events GROUP BY user_id ORDER BY spent DESC LIMIT 10"
+    ),
+    "latest purchases": (
+        "SELECT id, user_id, amount, created_at FROM events WHERE kind = 'purchase' "
+        "ORDER BY created_at DESC LIMIT 100"
+    ),
+    "events per category": (
+        "SELECT d.category, count(*) AS events FROM events e JOIN dim_0000 d ON d.id = e.dim_id "
+        "GROUP BY d.category ORDER BY d.category"
+    ),
+    "export purchases": "SELECT * FROM events WHERE kind = 'purchase'",
+}
+QUERY_QUESTIONS = [question for question in QUESTIONS if question != "export purchases"]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Peak resident set size while the block runs, sampled from a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss() or 0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if current_rss() is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, current_rss() or 0)
+        else:
+            self.peak = max_rss()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def git_revision() -> Dict[str, object]:
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def workloads(requests: int, stream_requests: int):
+    """(endpoint label, HTTP method, path, JSON bodies to send) for each measured endpoint."""
+
+    def query(question, **extra):
+        return {"query_text": question, "llm_provider": "groq", **extra}
+
+    return [
+        ("query", "POST", "/api/v1/query/query",
+         [query(QUERY_QUESTIONS[i % len(QUERY_QUESTIONS)]) for i in range(requests)]),
+        ("query_compact", "POST", "/api/v1/query/query",
+         [query(QUERY_QUESTIONS[i % len(QUERY_QUESTIONS)], row_format="compact") for i in range(requests)]),
+        ("query_ndjson", "POST", "/api/v1/query/query",
+         [query("export purchases", response_format="ndjson") for _ in range(stream_requests)]),
+        ("batch", "POST", "/api/v1/query/batch",
+         [{"questions": QUERY_QUESTIONS * 5, "llm_provider": "groq"}] * max(1, requests // 10)),
+        ("schema", "GET", "/api/v1/query/schema", [None] * requests),
+        ("schema_refresh", "POST", "/api/v1/query/schema/refresh", [None] * max(1, requests // 10)),
+    ]
+
+
+async def measure(client: httpx.AsyncClient, method: str, path: str, bodies: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    response_bytes = 0
+
+    async def one(body):
+        nonlocal response_bytes
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with client.stream(method, path, json=body) as response:
+                    async for chunk in response.aiter_bytes():
+                        response_bytes += len(chunk)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if status != "200":
+                errors[status] = errors.get(status, 0) + 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(body) for body in bodies))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(bodies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(bodies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "response_bytes": response_bytes,
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+    }
+
+
+def available_backends(requested: List[str]) -> List[str]:
+    backends = []
+    for backend in requested:
+        if backend == "duckdb" and not (importlib.util.find_spec("duckdb") and importlib.util.find_spec("pyarrow")):
+            print("skipping duckdb: install `duckdb` and `pyarrow` to benchmark it")
+            continue
+        backends.append(backend)
+    return backends
+
+
+async def run_scale(app, backend: str, scale, data_dir: str, args) -> List[dict]:
+    path = ensure_database(backend, scale, data_dir)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post("/api/v1/connection/connect", json={"db_url": database_url(backend, path)})
+        response.raise_for_status()
+        client.headers["X-Session-ID"] = response.json()["session_id"]
+        try:
+            for endpoint, method, url, bodies in workloads(args.requests, args.stream_requests):
+                if args.endpoints and endpoint not in args.endpoints:
+                    continue
+                # One untimed request so lazy setup (schema fetch, pools) isn't attributed to p99
+                await measure(client, method, url, bodies[:1], 1)
+                result = await measure(client, method, url, bodies, args.concurrency)
+                result.update({"scale": scale.name, "backend": backend, "endpoint": endpoint,
+                               "tables": scale.tables, "rows": scale.rows})
+                results.append(result)
+                print(
+                    f"{scale.name:>6} {backend:<6} {endpoint:<15} {result['throughput_rps']:>9} req/s  "
+                    f"p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+                    f"rss {result['peak_rss_mb']:>7.1f} MiB  errors {result['errors'] or '-'}"
+                )
+        finally:
+            await client.post("/api/v1/connection/disconnect")
+    return results
+
+
+def compare(results: List[dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["scale"], r["backend"], r["endpoint"]): r for r in baseline["results"]}
+    print(f"\ncompared with {baseline_path} ({(baseline['meta'].get('git') or {}).get('commit')})")
+    for result in results:
+        old = previous.get((result["scale"], result["backend"], result["endpoint"]))
+        if old is None:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p99_ms", "peak_rss_mb"):
+            if old.get(key) and result.get(key) is not None:
+                deltas.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+6.1f}%")
+        print(f"{result['scale']:>6} {result['backend']:<6} {result['endpoint']:<15} " + "  ".join(deltas))
+
+
+async def main(args):
+    # Settings are read at import time, so configure the app before importing it
+    if not args.with_caches:
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+    if not args.with_admission:
+        os.environ["ADMISSION_CONTROL_ENABLED"] = "false"
+    from app.core.config import settings
+    from app.main import app
+    from benchmarks.stub_engine import StubLLMEngine, install_stub_engine
+
+    engine = StubLLMEngine(QUESTIONS, latency=args.latency, jitter=args.jitter, seed=args.seed)
+    install_stub_engine(engine)
+
+    results = []
+    for backend in available_backends(args.backends):
+        for name in args.scales:
+            results.extend(await run_scale(app, backend, SCALES[name], args.data_dir, args))
+
+    report = {
+        "meta": {
+            "git": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "options": {
+                "scales": args.scales, "backends": args.backends, "requests": args.requests,
+                "stream_requests": args.stream_requests, "concurrency": args.concurrency,
+                "latency": args.latency, "jitter": args.jitter, "seed": args.seed, "with_caches": args.with_caches,
+                "with_admission": args.with_admission,
+            },
+            "settings": {
+                "DB_ASYNC_DRIVERS_ENABLED": settings.DB_ASYNC_DRIVERS_ENABLED,
+                "RESULT_CACHE_ENABLED": settings.RESULT_CACHE_ENABLED,
+                "LLM_CACHE_ENABLED": settings.LLM_CACHE_ENABLED,
+                "SCHEMA_PRUNING_ENABLED": settings.SCHEMA_PRUNING_ENABLED,
+                "SQL_GUARD_ENABLED": settings.SQL_GUARD_ENABLED,
+                "QUERY_MAX_ROWS": settings.QUERY_MAX_ROWS,
+            },
+            "llm_calls": engine.calls,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=lambda v: v.split(","), default=["small", "medium"],
+                        help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--backends", type=lambda v: v.split(","), default=["sqlite", "duckdb"])
+    parser.add_argument("--endpoints", type=lambda v: v.split(","), default=None,
+                        help="comma-separated subset of query, query_compact, query_ndjson, batch, schema, schema_refresh")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--stream-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of seeded random latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-caches", action="store_true", help="keep the SQL and result caches enabled")
+    parser.add_argument("--with-admission", action="store_true", help="keep admission control enabled")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "easyquery-bench"))
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", help="earlier results JSON to print deltas against")
+    args = parser.parse_args()
+    unknown = [name for name in args.scales if name not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    asyncio.run(main(args))
@@ -0,0 +1,145 @@
+"""
+Generated benchmark databases.
+
+Each database has `tables` small dimension tables (`dim_0000`, ...) chained by foreign keys,
+plus one `events` fact table with `rows` rows referencing the first dimension. All values are
+derived from the row number with integer hashing inside the database engine itself, so the
+data is identical on every run and seeding 10M rows doesn't go through Python.
+
+Usage (from backend/):
+    python -m benchmarks.seed --backend sqlite --tables 500 --rows 100000 --path /tmp/bench.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+
+# Rows per dimension table; kept small so wide schemas stay cheap to create
+DIMENSION_ROWS = 100
+
+
+@dataclass(frozen=True)
+class Scale:
+    name: str
+    tables: int
+    rows: int
+
+
+SCALES = {
+    "small": Scale("small", tables=10, rows=1_000),
+    "medium": Scale("medium", tables=500, rows=100_000),
+    "large": Scale("large", tables=5000, rows=1_000_000),
+    "xlarge": Scale("xlarge", tables=5000, rows=10_000_000),
+}
+
+
+def dimension_name(index: int) -> str:
+    return f"dim_{index:04d}"
+
+
+def _dimension_ddl(index: int) -> str:
+    reference = f", parent_id INTEGER REFERENCES {dimension_name(index - 1)}(id)" if index else ""
+    return (
+        f"CREATE TABLE {dimension_name(index)} ("
+        f"id INTEGER PRIMARY KEY, name VARCHAR(64), category VARCHAR(16), weight DOUBLE{reference})"
+    )
+
+
+EVENTS_DDL = (
+    "CREATE TABLE events ("
+    "id INTEGER PRIMARY KEY, dim_id INTEGER REFERENCES dim_0000(id), user_id INTEGER, "
+    "kind VARCHAR(16), amount DOUBLE, created_at TIMESTAMP)"
+)
+
+# Deterministic pseudo-random columns from the row number `i` (Knuth multiplicative hashing)
+EVENTS_SELECT = (
+    "SELECT i, i % {dims}, (i * 2654435761) % 100000, "
+    "CASE (i * 40503) % 4 WHEN 0 THEN 'view' WHEN 1 THEN 'click' WHEN 2 THEN 'cart' ELSE 'purchase' END, "
+    "((i * 2246822519) % 100000) / 100.0, "
+    "{timestamp}"
+)
+
+
+def seed_sqlite(path: str, scale: Scale):
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        for index in range(scale.tables):
+            connection.execute(_dimension_ddl(index))
+            parent = ", (i * 7) % 100" if index else ""
+            connection.execute(
+                f"INSERT INTO {dimension_name(index)} "
+                f"WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {DIMENSION_ROWS - 1}) "
+                f"SELECT i, 'name-' || i, 'cat-' || (i % 8), (i * 37 % 100) / 10.0{parent} FROM n"
+            )
+        connection.execute(EVENTS_DDL)
+        timestamp = "datetime(1704067200 + (i * 97) % 31536000, 'unixepoch')"
+        connection.execute(
+            f"INSERT INTO events "
+            f"WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {scale.rows - 1}) "
+            + EVENTS_SELECT.format(dims=DIMENSION_ROWS, timestamp=timestamp)
+            + " FROM n"
+        )
+        connection.execute("CREATE INDEX events_kind ON events(kind)")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def seed_duckdb(path: str, scale: Scale):
+    import duckdb
+
+    connection = duckdb.connect(path)
+    try:
+        for index in range(scale.tables):
+            connection.execute(_dimension_ddl(index))
+            parent = ", (i * 7) % 100" if index else ""
+            connection.execute(
+                f"INSERT INTO {dimension_name(index)} "
+                f"SELECT i, 'name-' || i, 'cat-' || (i % 8), (i * 37 % 100) / 10.0{parent} "
+                f"FROM range({DIMENSION_ROWS}) t(i)"
+            )
+        connection.execute(EVENTS_DDL)
+        timestamp = "to_timestamp(1704067200 + (i * 97) % 31536000)"
+        connection.execute(
+            "INSERT INTO events "
+            + EVENTS_SELECT.format(dims=DIMENSION_ROWS, timestamp=timestamp)
+            + f" FROM range({scale.rows}) t(i)"
+        )
+    finally:
+        connection.close()
+
+
+SEEDERS = {"sqlite": seed_sqlite, "duckdb": seed_duckdb}
+
+
+def database_url(backend: str, path: str) -> str:
+    return f"{backend}:///{path}"
+
+
+def ensure_database(backend: str, scale: Scale, data_dir: str) -> str:
+    """Path of the seeded database for `backend` at `scale`, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{scale.name}-{scale.tables}t-{scale.rows}r.{backend}")
+    if os.path.exists(path):
+        return path
+    started = time.perf_counter()
+    partial = f"{path}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    SEEDERS[backend](partial, scale)
+    os.replace(partial, path)
+    print(f"seeded {path} in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=sorted(SEEDERS), default="sqlite")
+    parser.add_argument("--tables", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--path", required=True)
+    args = parser.parse_args()
+    SEEDERS[args.backend](args.path, Scale("custom", args.tables, args.rows))
@@ -0,0 +1,141 @@
+"""
+Import time and memory of a fresh worker process.
+
+Each run starts a new interpreter with `-X importtime`, imports the app module and records
+the wall time, RSS and module count; with --warm-up it then runs the app's startup hooks
+(`lifespan`) and records them again. Reported numbers are medians over --repeat runs, plus
+the packages that spent the most time importing (self time summed per top-level package).
+
+Set LLM_PRELOAD_PROVIDERS / SPEECH_PRELOAD in the environment to measure warm-up of
+specific components.
+
+Usage (from backend/):
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --warm-up --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.run_suite import git_revision
+
+CHILD = r"""
+import importlib, json, sys, time
+
+def rss_kib():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+result = {"import_s": time.perf_counter() - started, "rss_kib": rss_kib(), "modules": len(sys.modules)}
+if sys.argv[2] == "1":
+    import asyncio
+    app = getattr(module, sys.argv[3])
+
+    async def warm_up():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+
+    started = time.perf_counter()
+    ready = asyncio.run(warm_up())
+    result.update(warmup_s=ready - started, warm_rss_kib=rss_kib(), warm_modules=len(sys.modules))
+print("STARTUP " + json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Self import time in seconds per top-level package, from `-X importtime` output."""
+    totals: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + int(self_us) / 1e6
+        except ValueError:
+            continue
+    return totals
+
+
+def run_once(module: str, attribute: str, warm_up: bool) -> dict:
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, module, "1" if warm_up else "0", attribute],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    wall = time.perf_counter() - started
+    line = next((line for line in process.stdout.splitlines() if line.startswith("STARTUP ")), None)
+    if process.returncode != 0 or line is None:
+        raise RuntimeError(f"startup run failed:\n{process.stderr[-2000:]}")
+    result = json.loads(line[len("STARTUP "):])
+    result["process_s"] = wall
+    result["packages"] = parse_importtime(process.stderr)
+    return result
+
+
+def summarize(runs: List[dict], top: int) -> dict:
+    keys = [key for key in runs[0] if key != "packages"]
+    summary = {key: statistics.median(run[key] for run in runs) for key in keys}
+    packages: Dict[str, List[float]] = {}
+    for run in runs:
+        for package, seconds in run["packages"].items():
+            packages.setdefault(package, []).append(seconds)
+    slowest = sorted(((statistics.median(times), package) for package, times in packages.items()), reverse=True)
+    summary["slowest_packages"] = {package: round(seconds, 4) for seconds, package in slowest[:top]}
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"import        {summary['import_s'] * 1000:9.1f} ms   (process {summary['process_s'] * 1000:.1f} ms)")
+    print(f"rss           {summary['rss_kib'] / 1024:9.1f} MiB  modules {summary['modules']:.0f}")
+    if "warmup_s" in summary:
+        print(f"warm-up       {summary['warmup_s'] * 1000:9.1f} ms")
+        print(f"rss (warm)    {summary['warm_rss_kib'] / 1024:9.1f} MiB  modules {summary['warm_modules']:.0f}")
+    print("slowest packages (self import time):")
+    for package, seconds in summary["slowest_packages"].items():
+        print(f"  {package:<30} {seconds * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--app", default="app", help="ASGI app attribute of --module, for --warm-up")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warm-up", action="store_true", help="also run the app's startup hooks")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write the summary as JSON")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module, args.app, args.warm_up) for _ in range(args.repeat)]
+    summary = summarize(runs, args.top)
+    print_summary(summary)
+    if args.output:
+        document = {
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "options": {"module": args.module, "repeat": args.repeat, "warm_up": args.warm_up},
+            "summary": summary,
+        }
+        with open(args.output, "w") as handle:
+            json.dump(document, handle, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
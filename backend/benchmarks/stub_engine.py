@@ -0,0 +1,54 @@
+"""
+Deterministic stand-in for an LLM provider, for benchmarks.
+
+`StubLLMEngine` answers from a fixed question -> SQL mapping (questions that already look like
+SQL are returned verbatim) after an artificial latency. The prompt is still rendered from the
+schema the pipeline passes in, so prompt building and schema size show up in the timings.
+Latency jitter comes from a seeded RNG, so runs are reproducible.
+"""
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
+from app.llm.base import BaseLLMEngine
+from app.llm import engine as llm_engine_registry
+
+
+class StubLLMEngine(BaseLLMEngine):
+    def __init__(
+        self,
+        mapping: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__("stub")
+        self.mapping = mapping or {}
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _create_prompt(self, query: str, schema: Dict[str, Any]) -> str:
+        return f"Based on the table schema below, write a SQL query.\nSchema: {schema}\n\nQuestion: {query}\n\nSQL Query:"
+
+    async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        prompt = self._create_prompt(natural_language_query, db_schema)
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sql = self.mapping.get(natural_language_query)
+        if sql is not None:
+            return sql
+        if natural_language_query.lstrip().lower().startswith(("select", "with")):
+            return natural_language_query
+        raise ValueError(f"Stub LLM has no SQL for question: {natural_language_query!r}")
+
+
+def install_stub_engine(engine: StubLLMEngine, providers=("openai", "gemini", "anthropic", "groq", "auto")):
+    """Serve every provider name from `engine` through the normal engine registry."""
+    for provider in providers:
+        llm_engine_registry._engines[provider] = engine
@@ -0,0 +1,83 @@
+"""
+Minimal OpenAI-compatible chat completions server for benchmarks.
+
+Answers every `POST /v1/chat/completions` with a fixed SQL statement after a configurable
+delay, so provider round trips can be benchmarked without network access or API keys.
+Streaming requests get the answer word by word as SSE chunks, `token_latency` apart.
+Runs in a background thread with its own event loop, so a client that blocks its own loop
+can't stall the server.
+"""
+import asyncio
+import threading
+import time
+
+import json
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_stub_app(latency: float, sql: str = "SELECT 1", token_latency: float = 0.0) -> FastAPI:
+    app = FastAPI()
+
+    async def chunks(model: str):
+        for token in re.findall(r"\s*\S+", sql):
+            await asyncio.sleep(token_latency)
+            delta = {"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}
+            yield _sse({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [delta]})
+        yield _sse({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        yield b"data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        if body.get("stream"):
+            return StreamingResponse(chunks(body.get("model", "stub")), media_type="text/event-stream")
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": sql}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return app
+
+
+def _sse(data: dict) -> bytes:
+    return b"data: " + json.dumps(data).encode() + b"\n\n"
+
+
+class StubLLMServer:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        sql: str = "SELECT 1",
+        token_latency: float = 0.0,
+    ):
+        config = uvicorn.Config(
+            create_stub_app(latency, sql, token_latency), host=host, port=port, log_level="warning"
+        )
+        self.server = uvicorn.Server(config)
+        self.base_url = f"http://{host}:{port}/v1"
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join()
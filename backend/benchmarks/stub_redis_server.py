@@ -0,0 +1,179 @@
+"""
+Minimal Redis stand-in for benchmarks and local multi-worker runs.
+
+Speaks enough of the Redis protocol (RESP2) for `RedisStateStore`: PING, GET, SET with EX/PX,
+DEL, EXISTS, PEXPIRE, EXPIRE, PERSIST, PTTL, SCAN with MATCH and FLUSHDB. Data lives in memory
+and keys expire lazily on access. Other commands (including the client's CLIENT SETINFO
+handshake) get an error reply, which redis-py ignores during the handshake.
+
+Runs in a background thread with its own event loop, like the stub LLM server, or standalone:
+
+Usage (from backend/):
+    python -m benchmarks.stub_redis_server --port 6390
+    STATE_BACKEND=redis STATE_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app.main:app --workers 4
+"""
+import argparse
+import asyncio
+import fnmatch
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Keyspace:
+    def __init__(self):
+        self.values: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def expire(self, key: bytes, expires_at: Optional[float]) -> int:
+        value = self.get(key)
+        if value is None:
+            return 0
+        self.values[key] = (value, expires_at)
+        return 1
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return f"-ERR {reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, e.g. from telnet
+        return line.split()
+    arguments = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        arguments.append((await reader.readexactly(length + 2))[:-2])
+    return arguments
+
+
+def execute(keyspace: _Keyspace, arguments: List[bytes]):
+    command, args = arguments[0].upper(), arguments[1:]
+    if command == b"PING":
+        return "PONG"
+    if command == b"SELECT":
+        return "OK"
+    if command == b"GET":
+        return keyspace.get(args[0])
+    if command == b"SET":
+        expires_at = None
+        options = [arg.upper() for arg in args[2:]]
+        for index, option in enumerate(options):
+            if option == b"EX":
+                expires_at = time.time() + int(args[2 + index + 1])
+            elif option == b"PX":
+                expires_at = time.time() + int(args[2 + index + 1]) / 1000
+        keyspace.values[args[0]] = (args[1], expires_at)
+        return "OK"
+    if command == b"DEL":
+        return sum(keyspace.values.pop(key, None) is not None for key in args)
+    if command == b"EXISTS":
+        return sum(keyspace.get(key) is not None for key in args)
+    if command == b"PEXPIRE":
+        return keyspace.expire(args[0], time.time() + int(args[1]) / 1000)
+    if command == b"EXPIRE":
+        return keyspace.expire(args[0], time.time() + int(args[1]))
+    if command == b"PERSIST":
+        entry = keyspace.values.get(args[0])
+        if keyspace.get(args[0]) is None or entry[1] is None:
+            return 0
+        return keyspace.expire(args[0], None)
+    if command == b"PTTL":
+        if keyspace.get(args[0]) is None:
+            return -2
+        expires_at = keyspace.values[args[0]][1]
+        return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+    if command == b"SCAN":
+        # One pass over everything; cursor 0 tells the client the scan is complete
+        pattern = b"*"
+        for index in range(1, len(args) - 1):
+            if args[index].upper() == b"MATCH":
+                pattern = args[index + 1]
+        keys = [key for key in list(keyspace.values) if fnmatch.fnmatchcase(key, pattern) and keyspace.get(key)]
+        return [b"0", keys]
+    if command == b"FLUSHDB":
+        keyspace.values.clear()
+        return "OK"
+    return ValueError(f"unknown command '{command.decode(errors='replace')}'")
+
+
+class StubRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        self.host = host
+        self.port = port
+        self.url = f"redis://{host}:{port}/0"
+        self.keyspace = _Keyspace()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._stop: Optional[asyncio.Event] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                arguments = await _read_command(reader)
+                if arguments is None:
+                    break
+                if not arguments:
+                    continue
+                writer.write(_encode(execute(self.keyspace, arguments)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+
+    def _run(self):
+        self._loop.run_until_complete(self._serve())
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    with StubRedisServer(args.host, args.port) as stub:
+        print(f"stub redis listening on {stub.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    # The app is built on asyncio (tasks, wait_for, to_thread); don't also run the async tests under trio
+    return "asyncio"
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.admission import (
+    AdmissionController, AdmissionMiddleware, AdmissionRejected, WS_TRY_AGAIN_LATER,
+)
+from app.core.config import settings
+
+
+def make_controller(limit=1, session_limit=10, queue_size=10, session_queue_size=10, queue_timeout=1.0):
+    return AdmissionController(
+        limits={"query": limit, "speech": limit},
+        session_limit=session_limit,
+        queue_size=queue_size,
+        session_queue_size=session_queue_size,
+        queue_timeout=queue_timeout,
+    )
+
+
+@pytest.mark.anyio
+async def test_admits_up_to_the_limit_then_queues():
+    controller = make_controller(limit=1)
+    await controller.acquire("query", "a")
+    waiting = asyncio.create_task(controller.acquire("query", "b"))
+    await asyncio.sleep(0.01)
+
+    assert not waiting.done()
+    assert controller.stats()["query"]["waiting"] == 1
+    controller.release("query", "a")
+    await asyncio.wait_for(waiting, 1)
+    assert controller.stats()["query"] == {**controller.stats()["query"], "in_flight": 1, "waiting": 0}
+
+
+@pytest.mark.anyio
+async def test_freed_slots_go_round_robin_between_sessions():
+    controller = make_controller(limit=1)
+    await controller.acquire("query", "holder")
+    order = []
+
+    async def request(session, label):
+        await controller.acquire("query", session)
+        order.append(label)
+
+    tasks = [
+        asyncio.create_task(request(session, label))
+        for session, label in (("burst", "burst-1"), ("burst", "burst-2"), ("burst", "burst-3"), ("other", "other-1"))
+    ]
+    await asyncio.sleep(0.01)
+    for session in ("holder", "burst", "other", "burst"):
+        controller.release("query", session)
+        await asyncio.sleep(0.01)
+
+    assert order == ["burst-1", "other-1", "burst-2", "burst-3"]
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.anyio
+async def test_session_limit_spans_endpoints():
+    controller = make_controller(limit=5, session_limit=1)
+    await controller.acquire("query", "a")
+    blocked = asyncio.create_task(controller.acquire("speech", "a"))
+    await controller.acquire("speech", "b")
+    await asyncio.sleep(0.01)
+
+    assert not blocked.done()
+    controller.release("query", "a")
+    await asyncio.wait_for(blocked, 1)
+
+
+@pytest.mark.anyio
+async def test_rejects_when_queues_are_full_or_the_wait_times_out():
+    controller = make_controller(limit=1, queue_size=2, session_queue_size=1, queue_timeout=0.05)
+    await controller.acquire("query", "a")
+    queued = asyncio.create_task(controller.acquire("query", "b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as session_full:
+        await controller.acquire("query", "b")
+    assert session_full.value.status_code == 429
+
+    other = asyncio.create_task(controller.acquire("query", "c"))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as queue_full:
+        await controller.acquire("query", "d")
+    assert queue_full.value.status_code == 503
+    assert queue_full.value.retry_after >= 1
+
+    with pytest.raises(AdmissionRejected) as timed_out:
+        await queued
+    assert timed_out.value.status_code == 503
+    assert "Timed out" in timed_out.value.detail
+    assert isinstance((await asyncio.gather(other, return_exceptions=True))[0], AdmissionRejected)
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_leaves_the_queue():
+    controller = make_controller(limit=1)
+    await controller.acquire("query", "a")
+    waiting = asyncio.create_task(controller.acquire("query", "b"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+
+    assert controller.stats()["query"]["waiting"] == 0
+    controller.release("query", "a")
+    assert controller.stats()["query"]["in_flight"] == 0
+
+
+def test_try_acquire_does_not_queue():
+    controller = make_controller(limit=1)
+
+    assert controller.try_acquire("speech", "a")
+    assert not controller.try_acquire("speech", "b")
+    controller.release("speech", "a")
+    assert controller.try_acquire("speech", "b")
+
+
+def test_speech_websocket_is_closed_with_1013_at_capacity(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_CONTROL_ENABLED", True)
+    controller = make_controller(limit=1)
+    app = FastAPI()
+
+    @app.websocket("/api/v1/query/speech-stream")
+    async def speech_stream(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_text(await websocket.receive_text())
+        await websocket.close()
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    client = TestClient(app)
+
+    with client.websocket_connect("/api/v1/query/speech-stream") as first:
+        assert controller.stats()["speech"]["in_flight"] == 1
+        with client.websocket_connect("/api/v1/query/speech-stream") as second:
+            with pytest.raises(WebSocketDisconnect) as refused:
+                second.receive_text()
+            assert refused.value.code == WS_TRY_AGAIN_LATER
+        first.send_text("hello")
+        assert first.receive_text() == "hello"
+
+    assert controller.stats()["speech"]["in_flight"] == 0
+    with client.websocket_connect("/api/v1/query/speech-stream") as again:
+        again.send_text("hi")
+        assert again.receive_text() == "hi"
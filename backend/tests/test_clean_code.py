@@ -0,0 +1,52 @@
+import pytest
+
+from app.utils.clean_code import SQLStreamExtractor, clean_ai_response
+
+
+def stream(text: str, chunk: int = 3):
+    """Feed `text` in small chunks; returns the extractor and how much was read when it completed."""
+    extractor = SQLStreamExtractor()
+    for index in range(0, len(text), chunk):
+        if extractor.feed(text[index:index + chunk]):
+            return extractor, index + chunk
+    return extractor, None
+
+
+@pytest.mark.parametrize("response, expected", [
+    ("SELECT id FROM users", "SELECT id FROM users"),
+    ("```sql\nSELECT id FROM users;\n```\nThis lists every user.", "SELECT id FROM users"),
+    ("Here you go:\n```\nSELECT id\nFROM users\n```", "SELECT id\nFROM users"),
+    ("SELECT name FROM users WHERE note = 'a; b'; -- trailing", "SELECT name FROM users WHERE note = 'a; b'"),
+    (
+        "Query:\nWITH recent AS (SELECT * FROM orders WHERE day > '2024-01-01') SELECT count(*) FROM recent;",
+        "WITH recent AS (SELECT * FROM orders WHERE day > '2024-01-01') SELECT count(*) FROM recent",
+    ),
+    ("We select users; query:\nSELECT id FROM users;", "SELECT id FROM users"),
+    ("Here I select the right table; the query is SELECT id FROM users", "SELECT id FROM users"),
+    ("I can't answer that.", "I can't answer that."),
+])
+def test_clean_ai_response(response, expected):
+    assert clean_ai_response(response) == expected
+
+
+def test_streaming_does_not_stop_on_prose():
+    text = "We select users; query:\nSELECT id FROM users;\nThis returns every id."
+    extractor, read = stream(text)
+
+    assert extractor.sql == "SELECT id FROM users"
+    assert read is not None and read < len(text)
+    assert read >= text.index("users;\nThis")
+
+
+def test_streaming_waits_for_the_closing_fence_or_semicolon():
+    extractor, read = stream("```sql\nSELECT 'x;y' AS v\nFROM t\n```\nDone.")
+
+    assert extractor.sql == "SELECT 'x;y' AS v\nFROM t"
+    assert read is not None
+
+
+def test_streaming_unterminated_statement_completes_on_finish():
+    extractor, read = stream("SELECT id FROM users")
+
+    assert read is None
+    assert extractor.finish() == "SELECT id FROM users"
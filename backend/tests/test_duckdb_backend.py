@@ -0,0 +1,87 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.db.duckdb_backend import DuckDBManager, parse_duckdb_url, resolve_source_path
+from app.core.config import settings
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    root = tmp_path / "data"
+    root.mkdir()
+    (root / "sales.csv").write_text("id,amount\n1,10\n2,32\n")
+    (root / "parts").mkdir()
+    (root / "parts" / "a.csv").write_text("id\n1\n")
+    (root / "parts" / "b.csv").write_text("id\n2\n")
+    monkeypatch.setattr(settings, "DUCKDB_DATA_DIR", str(root))
+    return root
+
+
+def test_relative_and_absolute_paths_under_the_data_dir(data_dir):
+    expected = os.path.realpath(data_dir / "sales.csv")
+
+    assert resolve_source_path("sales.csv") == expected
+    assert resolve_source_path(str(data_dir / "sales.csv")) == expected
+    assert resolve_source_path("parts/*.csv") == os.path.join(os.path.realpath(data_dir / "parts"), "*.csv")
+
+
+@pytest.mark.parametrize("path", ["../secret.csv", "parts/../../secret.csv", "/etc/passwd", "/etc/*.csv"])
+def test_paths_outside_the_data_dir_are_rejected(data_dir, path):
+    with pytest.raises(HTTPException) as excinfo:
+        resolve_source_path(path)
+    assert excinfo.value.status_code == 400
+
+
+def test_symlinks_out_of_the_data_dir_are_rejected(data_dir, tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "state.sqlite").write_bytes(b"SQLite format 3\x00")
+    (outside / "leak.csv").write_text("x\n1\n")
+    os.symlink(outside / "state.sqlite", data_dir / "state.sqlite")
+    os.symlink(outside, data_dir / "linked")
+    os.symlink(outside / "leak.csv", data_dir / "parts" / "c.csv")
+
+    for path in ("state.sqlite", "linked/leak.csv", "linked/*.csv", "parts/*.csv"):
+        with pytest.raises(HTTPException):
+            resolve_source_path(path)
+
+
+def test_url_sources_are_checked(data_dir):
+    config = parse_duckdb_url("duckdb:///sales.csv?parts=parts/*.csv")
+    assert [(source.name, source.kind) for source in config.sources] == [("sales", "csv"), ("parts", "csv")]
+
+    with pytest.raises(HTTPException):
+        parse_duckdb_url("duckdb:///sales.csv?state=/root/.cache/easyquery/state.sqlite")
+
+
+def test_memory_needs_no_data_dir(monkeypatch):
+    monkeypatch.setattr(settings, "DUCKDB_DATA_DIR", "")
+
+    assert parse_duckdb_url("duckdb:///:memory:").sources == []
+    with pytest.raises(HTTPException) as excinfo:
+        parse_duckdb_url("duckdb:///sales.csv")
+    assert "DUCKDB_DATA_DIR" in excinfo.value.detail
+
+
+@pytest.mark.anyio
+async def test_queries_sources_but_not_other_files(data_dir, tmp_path):
+    (tmp_path / "other.csv").write_text("secret\n1\n")
+    manager = DuckDBManager("duckdb:///sales.csv?parts=parts/*.csv")
+    await manager.connect()
+    try:
+        result = await manager.execute_query("SELECT sum(amount) AS total, (SELECT count(*) FROM parts) AS parts FROM sales")
+        assert result["results"] == [{"total": 42, "parts": 2}]
+
+        with pytest.raises(Exception, match="Permission"):
+            await manager.run_sync(
+                lambda cursor: cursor.execute(f"SELECT * FROM read_csv_auto('{tmp_path / 'other.csv'}')").fetchall()
+            )
+        with pytest.raises(Exception):
+            await manager.run_sync(lambda cursor: cursor.execute("SET enable_external_access = true"))
+    finally:
+        await manager.disconnect()
@@ -0,0 +1,54 @@
+import sqlite3
+from datetime import timedelta
+from uuid import UUID
+
+import orjson
+import pytest
+
+from app.api.v1.db import DatabaseManager
+from app.api.v1.db.result_cache import result_cache
+from app.core.config import settings
+from app.utils.json_response import dumps, iso_duration
+
+
+@pytest.mark.parametrize("value, expected", [
+    (timedelta(0), "PT0S"),
+    (timedelta(seconds=4), "PT4S"),
+    (timedelta(days=1, hours=2, minutes=3, seconds=4, microseconds=500000), "P1DT2H3M4.5S"),
+    (timedelta(days=2), "P2D"),
+    (timedelta(seconds=-90), "-PT1M30S"),
+])
+def test_iso_duration(value, expected):
+    assert iso_duration(value) == expected
+
+
+def test_dumps_driver_types():
+    values = [b"\x00\xff", bytearray(b"ab"), memoryview(b"x"), timedelta(minutes=5), UUID(int=1)]
+
+    assert orjson.loads(dumps(values)) == ["AP8=", "YWI=", "eA==", "PT5M", "00000000-0000-0000-0000-000000000001"]
+
+
+def test_unknown_types_still_raise():
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+@pytest.mark.anyio
+async def test_blob_results_are_served_and_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    path = tmp_path / "blobs.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE files (name TEXT, data BLOB)")
+    connection.execute("INSERT INTO files VALUES ('a', x'00ff')")
+    connection.commit()
+    connection.close()
+    manager = DatabaseManager(f"sqlite:///{path}", result_cache_ttl=60)
+    await manager.connect()
+    try:
+        first = await manager.execute_query("SELECT name, data FROM files")
+        repeat = await manager.execute_query("SELECT name, data FROM files")
+        assert orjson.loads(dumps(first["results"])) == [{"name": "a", "data": "AP8="}]
+        assert repeat["cached"] and repeat["results"] == [{"name": "a", "data": "AP8="}]
+    finally:
+        result_cache.invalidate_connection(manager.cache_key)
+        await manager.disconnect()
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from app.api.v1.db import ConnectionRegistry
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    def create(name: str) -> str:
+        path = tmp_path / f"{name}.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)")
+        connection.close()
+        return f"sqlite:///{path}"
+    return create
+
+
+async def test_sessions_on_one_database_share_a_pool(db_url):
+    registry = ConnectionRegistry()
+    first = await registry.connect(db_url("a"))
+    second = await registry.connect(db_url("a"))
+    other = await registry.connect(db_url("b"))
+    try:
+        assert first != second
+        assert await registry.get(first) is await registry.get(second)
+        assert await registry.get(other) is not await registry.get(first)
+        assert registry.metrics()["open_pools"] == 2
+        assert await registry.get("unknown") is None
+        assert await registry.get(None) is None
+    finally:
+        await registry.close_all()
+
+
+async def test_the_pool_closes_with_its_last_session(db_url):
+    registry = ConnectionRegistry()
+    first = await registry.connect(db_url("a"))
+    second = await registry.connect(db_url("a"))
+    manager = await registry.get(first)
+
+    assert await registry.disconnect(first)
+    assert await registry.get(first) is None
+    assert manager.connected
+
+    assert await registry.disconnect(second)
+    assert not manager.connected
+    assert registry.metrics()["open_pools"] == 0
+    assert not await registry.disconnect(second)
+
+
+async def test_least_recently_used_session_is_evicted_at_the_limit(db_url):
+    registry = ConnectionRegistry(max_sessions=2)
+    oldest = await registry.connect(db_url("a"))
+    recent = await registry.connect(db_url("b"))
+    await registry.get(oldest)
+    newest = await registry.connect(db_url("c"))
+    try:
+        # Touching `oldest` made `recent` the least recently used
+        assert await registry.get(recent) is None
+        assert await registry.get(oldest) is not None
+        assert await registry.get(newest) is not None
+        assert registry.evictions == 1
+    finally:
+        await registry.close_all()
+
+
+async def test_idle_sessions_are_reaped(db_url):
+    registry = ConnectionRegistry(idle_timeout=60)
+    idle = await registry.connect(db_url("a"))
+    active = await registry.connect(db_url("b"))
+    registry._sessions[idle].last_used -= 120
+    try:
+        assert await registry.reap() == 1
+        assert await registry.get(idle) is None
+        assert await registry.get(active) is not None
+    finally:
+        await registry.close_all()
+
+
+def test_session_tokens_over_http(db_url):
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+
+    url = db_url("a")
+    # One event loop for the whole exchange: the registry's pools belong to it
+    with TestClient(create_app()) as client:
+        first = client.post("/api/v1/connection/connect", json={"db_url": url}).json()["session_id"]
+        # Reconnecting with a token replaces that session
+        second = client.post(
+            "/api/v1/connection/connect", json={"db_url": url}, headers={"X-Session-ID": first}
+        ).json()["session_id"]
+
+        assert client.post("/api/v1/connection/disconnect").status_code == 401
+        assert client.post("/api/v1/connection/disconnect", headers={"X-Session-ID": first}).status_code == 404
+        assert client.post("/api/v1/connection/disconnect", headers={"X-Session-ID": second}).status_code == 200
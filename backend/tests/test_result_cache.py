@@ -0,0 +1,177 @@
+import sqlite3
+
+import pytest
+
+from app.api.v1.db import DatabaseManager
+from app.api.v1.db.result_cache import ResultCache, analyze_sql, decode_columns, encode_columns, result_cache
+from app.core.config import settings
+from app.services.sql_guard import guard_query
+
+
+def test_analyze_sql_normalizes_formatting_and_collects_tables():
+    first, tables = analyze_sql("select  a\nFROM Orders o join customers c on o.cid = c.id", "postgresql")
+    second, _ = analyze_sql("SELECT a FROM Orders AS o JOIN customers AS c ON o.cid = c.id", "postgresql")
+
+    assert first == second
+    assert tables == {"orders", "customers"}
+
+
+def test_analyze_sql_skips_ctes_and_handles_unparseable_sql():
+    _, tables = analyze_sql("WITH recent AS (SELECT * FROM orders) SELECT * FROM recent", "sqlite")
+    assert tables == {"orders"}
+
+    normalized, tables = analyze_sql("SELECT (  FROM;", "sqlite")
+    assert normalized == "SELECT ( FROM"
+    assert tables is None
+
+
+def test_columns_round_trip():
+    payload = encode_columns(["id", "name"], [[1, 2], ["a", None]], True)
+    assert decode_columns(payload) == (["id", "name"], [[1, 2], ["a", None]], True)
+
+
+def test_get_and_put():
+    cache = ResultCache(max_bytes=1000)
+    key = cache.key("conn", "SELECT 1", 10)
+
+    assert cache.get(key) is None
+    cache.put(key, "conn", b"payload", frozenset({"t"}))
+
+    assert cache.get(key) == b"payload"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.key("conn", "SELECT 1", 20) != key
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResultCache(max_bytes=400)
+    for name in ("a", "b", "c", "d"):
+        cache.put(name, "conn", b"x" * 100, frozenset({name}))
+    cache.get("a")
+    cache.put("e", "conn", b"x" * 100, frozenset({"e"}))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.bytes == 400
+    assert cache.evictions == 1
+
+
+def test_skips_results_over_a_quarter_of_the_cache():
+    cache = ResultCache(max_bytes=400)
+    cache.put("big", "conn", b"x" * 101, None)
+
+    assert cache.get("big") is None
+    assert cache.bytes == 0
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResultCache(max_bytes=1000, ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.api.v1.db.result_cache.time.monotonic", lambda: now[0])
+    cache.put("short", "conn", b"1", None, ttl_seconds=1)
+    cache.put("default", "conn", b"2", None)
+    cache.put("never", "conn", b"3", None, ttl_seconds=0)
+
+    now[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == b"2"
+    assert cache.get("never") is None
+    assert cache.bytes == 1
+
+
+def test_invalidates_by_table_and_connection():
+    cache = ResultCache(max_bytes=1000)
+    cache.put("orders", "conn", b"1", frozenset({"orders"}))
+    cache.put("customers", "conn", b"2", frozenset({"customers"}))
+    cache.put("unknown", "conn", b"3", None)
+    cache.put("other", "other-conn", b"4", frozenset({"orders"}))
+
+    # Results with an unknown table set go with any invalidation on their connection
+    assert cache.invalidate_tables("conn", ["Orders"]) == 2
+    assert cache.get("orders") is None
+    assert cache.get("unknown") is None
+    assert cache.get("customers") == b"2"
+    assert cache.get("other") == b"4"
+
+    assert cache.invalidate_connection("conn") == 1
+    assert cache.get("customers") is None
+    assert cache.get("other") == b"4"
+    assert cache.invalidations == 3
+
+
+def test_contains_leaves_stats_and_order_alone(monkeypatch):
+    cache = ResultCache(max_bytes=400)
+    now = [1000.0]
+    monkeypatch.setattr("app.api.v1.db.result_cache.time.monotonic", lambda: now[0])
+    for name in ("a", "b", "c", "d"):
+        cache.put(name, "conn", b"x" * 100, None, ttl_seconds=5)
+
+    assert cache.contains("a")
+    assert not cache.contains("missing")
+    assert (cache.hits, cache.misses) == (0, 0)
+    # "a" is still the least recently used
+    cache.put("e", "conn", b"x" * 100, None)
+    assert not cache.contains("a")
+
+    now[0] += 10
+    assert not cache.contains("b")
+    assert cache.contains("e")
+
+
+@pytest.mark.anyio
+async def test_database_manager_serves_repeats_from_cache_and_invalidates_on_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    path = tmp_path / "cache.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.execute("INSERT INTO items (name) VALUES ('a')")
+    connection.commit()
+    connection.close()
+    manager = DatabaseManager(f"sqlite:///{path}", result_cache_ttl=60)
+    await manager.connect()
+    try:
+        first = await manager.execute_query("SELECT name FROM items")
+        repeat = await manager.execute_query("select name  from items")
+        assert not first["cached"]
+        assert repeat["cached"]
+        assert repeat["results"] == first["results"] == [{"name": "a"}]
+
+        # A statement without rows may have written anything on the connection
+        await manager.execute_query("INSERT INTO items (name) VALUES ('b')")
+        assert not (await manager.execute_query("SELECT name FROM items"))["cached"]
+    finally:
+        result_cache.invalidate_connection(manager.cache_key)
+        await manager.disconnect()
+
+
+@pytest.mark.anyio
+async def test_guard_skips_explain_for_cached_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_GUARD_ENABLED", True)
+    path = tmp_path / "guard.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.commit()
+    connection.close()
+    manager = DatabaseManager(f"sqlite:///{path}", result_cache_ttl=60)
+    await manager.connect()
+    explained = []
+    explain = manager.explain
+
+    async def counting_explain(sql):
+        explained.append(sql)
+        return await explain(sql)
+
+    monkeypatch.setattr(manager, "explain", counting_explain)
+    max_rows = settings.QUERY_MAX_ROWS + 1
+    try:
+        sql, report = await guard_query(manager, "SELECT name FROM items", max_rows, manager.has_cached_result)
+        assert "cached" not in report
+        await manager.execute_query(sql)
+
+        repeat, report = await guard_query(manager, "select name from items", max_rows, manager.has_cached_result)
+        assert report["cached"] and report["limit_added"]
+        assert len(explained) == 1
+        assert (await manager.execute_query(repeat))["cached"]
+    finally:
+        result_cache.invalidate_connection(manager.cache_key)
+        await manager.disconnect()
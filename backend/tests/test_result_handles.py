@@ -0,0 +1,165 @@
+import asyncio
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.result_handles import ResultHandleStore, decode_cursor, encode_cursor, ordering_key
+from app.utils.json_response import dumps
+
+KEYS = {"orders": {"id"}, "lines": {"order_id", "line"}}
+
+
+@pytest.mark.parametrize("sql, columns, expected", [
+    ("SELECT id, total FROM orders ORDER BY id", ["id", "total"], [("id", False)]),
+    ("SELECT id AS order_no, total FROM orders ORDER BY order_no DESC", ["order_no", "total"], [("order_no", True)]),
+    ("SELECT * FROM orders ORDER BY 1", ["id", "total"], [("id", False)]),
+    (
+        "SELECT order_id, line, qty FROM lines ORDER BY order_id, line",
+        ["order_id", "line", "qty"], [("order_id", False), ("line", False)],
+    ),
+    (
+        "SELECT customer, count(*) AS n FROM orders GROUP BY customer ORDER BY customer",
+        ["customer", "n"], [("customer", False)],
+    ),
+    ("SELECT DISTINCT customer FROM orders ORDER BY customer", ["customer"], [("customer", False)]),
+])
+def test_ordering_key_for_unique_orders(sql, columns, expected):
+    assert ordering_key(sql, "postgres", columns, KEYS) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id, total FROM orders",
+    # Ties: the key must identify each row
+    "SELECT id, total FROM orders ORDER BY total",
+    "SELECT order_id, line FROM lines ORDER BY order_id",
+    "SELECT o.id, l.line FROM orders o JOIN lines l ON l.order_id = o.id ORDER BY o.id",
+    "SELECT customer, count(*) AS n FROM orders GROUP BY customer, region ORDER BY customer",
+    # Mixed directions and expressions can't be continued with one comparison
+    "SELECT order_id, line FROM lines ORDER BY order_id, line DESC",
+    "SELECT id, total FROM orders ORDER BY id + 1",
+    "SELECT id, total FROM orders UNION SELECT id, total FROM orders ORDER BY id",
+])
+def test_no_ordering_key_without_a_unique_order(sql):
+    assert ordering_key(sql, "postgres", ["id", "total", "order_id", "line", "customer", "n"], KEYS) is None
+
+
+def test_unknown_primary_keys_rule_out_table_orders():
+    assert ordering_key("SELECT id, total FROM orders ORDER BY id", "postgres", ["id", "total"]) is None
+
+
+def test_cursor_keeps_key_types():
+    key = [Decimal("12345678901234567890.01"), datetime(2024, 1, 2, 3, 4, 5, 6), date(2024, 1, 2), "a", 3, None]
+
+    offset, decoded = decode_cursor(encode_cursor(40, key))
+
+    assert offset == 40
+    assert decoded == key
+    assert [type(value) for value in decoded] == [type(value) for value in key]
+
+
+@pytest.mark.parametrize("key", [[{"decimal": "x"}], [{"uuid": "1"}], [{"decimal": "1", "date": "2024-01-01"}], {"a": 1}])
+def test_malformed_cursors_are_rejected(key):
+    cursor = base64.urlsafe_b64encode(dumps({"o": 0, "k": key})).decode("ascii")
+
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.fixture
+async def duck(tmp_path, monkeypatch):
+    """A DuckDB database whose keys are DECIMAL and TIMESTAMP, which JSON alone would not round-trip."""
+    duckdb = pytest.importorskip("duckdb")
+    pytest.importorskip("pyarrow")
+    from app.api.v1.db.duckdb_backend import DuckDBManager
+
+    connection = duckdb.connect(str(tmp_path / "keys.duckdb"))
+    connection.execute("CREATE TABLE events (amount DECIMAL(20, 2), created TIMESTAMP)")
+    connection.execute(
+        "INSERT INTO events SELECT 10000000000000000.01 + i, TIMESTAMP '2024-01-01' + i * INTERVAL 1 SECOND "
+        "FROM range(10) t(i)"
+    )
+    connection.close()
+    monkeypatch.setattr(settings, "DUCKDB_DATA_DIR", str(tmp_path))
+    manager = DuckDBManager("duckdb:///keys.duckdb")
+    await manager.connect()
+    yield manager
+    await manager.disconnect()
+
+
+async def read_all(handle, limit: int):
+    page = await handle.page(0, limit)
+    pages = [page]
+    while page["page"]["next_cursor"]:
+        offset, after = decode_cursor(page["page"]["next_cursor"])
+        page = await handle.page(offset, limit, after=after)
+        pages.append(page)
+    return pages
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sql, column", [
+    ("SELECT DISTINCT amount FROM events ORDER BY amount", "amount"),
+    ("SELECT created, count(*) AS n FROM events GROUP BY created ORDER BY created DESC", "created"),
+])
+async def test_cursors_resume_past_the_snapshot(duck, sql, column):
+    store = ResultHandleStore(max_rows=3, max_bytes=1 << 20, idle_ttl=60, max_per_session=2)
+    handle = store.open("session", duck, sql)
+    try:
+        pages = await read_all(handle, 2)
+    finally:
+        store.close_all()
+
+    expected = [row[0] for row in await duck.run_sync(lambda cursor: cursor.execute(sql).fetchall())]
+    snapshot = [row[column] for page in pages if page["page"]["source"] == "snapshot" for row in page["results"]]
+    keyset = [row[column] for page in pages if page["page"]["source"] == "keyset" for row in page["results"]]
+    assert snapshot == orjson.loads(dumps(expected[:3]))
+    # Exact, so no row was skipped or repeated; as floats these decimals would collapse
+    assert keyset == expected[3:]
+    assert {page["page"]["source"] for page in pages} == {"snapshot", "keyset"}
+    assert pages[-1]["page"]["total"] == {"rows": 10, "exact": True, "source": "keyset"}
+
+
+@pytest.mark.anyio
+async def test_idle_handles_expire(duck):
+    store = ResultHandleStore(max_rows=3, max_bytes=1 << 20, idle_ttl=60, max_per_session=2)
+    idle = store.open("session", duck, "SELECT amount FROM events")
+    active = store.open("session", duck, "SELECT created FROM events")
+    await idle.ready(1)
+    idle.last_used -= 120
+
+    assert store.reap() == 1
+    with pytest.raises(HTTPException) as excinfo:
+        await store.get(idle.id, "session", duck)
+    assert excinfo.value.status_code == 404
+    assert await store.get(active.id, "session", duck) is active
+    with pytest.raises(HTTPException):
+        await store.get(active.id, "other-session", duck)
+    store.close_all()
+
+
+@pytest.mark.anyio
+async def test_closing_a_handle_cancels_its_estimate(duck, monkeypatch):
+    store = ResultHandleStore(max_rows=3, max_bytes=1 << 20, idle_ttl=60, max_per_session=2)
+    handle = store.open("session", duck, "SELECT amount FROM events LIMIT 11")
+    await handle.ready(4)
+    explaining = asyncio.Event()
+
+    async def slow_explain(sql):
+        explaining.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(duck, "explain", slow_explain)
+    store.record_guard(handle.id, {"limit_added": True})
+    (estimate,) = handle._background
+    await explaining.wait()
+
+    store.close(handle.id)
+    await asyncio.gather(estimate, return_exceptions=True)
+    assert estimate.cancelled()
+    assert not handle._background
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+import pytest
+from fastapi import HTTPException
+
+from app.llm.base import BaseLLMEngine
+from app.llm.router import ProviderStats, RoutingLLMEngine
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeEngine(BaseLLMEngine):
+    """Answers `sql` after `latency` seconds, or raises `error`."""
+
+    def __init__(self, sql: str = "SELECT 1", latency: float = 0.0, error: Exception = None):
+        super().__init__("fake")
+        self.sql = sql
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.sql
+
+
+async def test_hedges_to_next_provider_after_delay():
+    slow = FakeEngine("SELECT 'slow'", latency=5.0)
+    fast = FakeEngine("SELECT 'fast'", latency=0.01)
+    router = RoutingLLMEngine({"slow": slow, "fast": fast}, hedge_delay=0.05)
+
+    started = time.perf_counter()
+    sql = await router.generate_sql("question", {})
+
+    assert sql == "SELECT 'fast'"
+    assert time.perf_counter() - started < 1.0
+    assert (slow.calls, fast.calls) == (1, 1)
+    await asyncio.sleep(0)
+    assert slow.cancelled == 1
+    # The loser keeps a latency sample so it isn't ranked first again as "unmeasured"
+    assert len(router.stats["slow"].latencies) == 1
+    assert router.ranked_providers() == ["fast", "slow"]
+
+
+async def test_no_hedge_when_first_provider_answers_in_time():
+    first = FakeEngine("SELECT 'first'", latency=0.01)
+    second = FakeEngine("SELECT 'second'")
+    router = RoutingLLMEngine({"first": first, "second": second}, hedge_delay=1.0)
+
+    assert await router.generate_sql("question", {}) == "SELECT 'first'"
+    assert second.calls == 0
+
+
+async def test_no_hedge_without_delay():
+    slow = FakeEngine("SELECT 'slow'", latency=0.1)
+    fast = FakeEngine("SELECT 'fast'")
+    router = RoutingLLMEngine({"slow": slow, "fast": fast}, hedge_delay=0)
+
+    assert router.hedge_delay is None
+    assert await router.generate_sql("question", {}) == "SELECT 'slow'"
+    assert fast.calls == 0
+
+
+async def test_falls_back_to_next_provider_on_error():
+    broken = FakeEngine(error=RuntimeError("rate limited"))
+    working = FakeEngine("SELECT 'ok'")
+    router = RoutingLLMEngine({"broken": broken, "working": working})
+
+    assert await router.generate_sql("question", {}) == "SELECT 'ok'"
+    assert router.stats["broken"].error_rate == 1.0
+    assert router.stats["working"].error_rate == 0.0
+
+
+async def test_all_providers_failing_raises_502():
+    router = RoutingLLMEngine({
+        "a": FakeEngine(error=RuntimeError("down")),
+        "b": FakeEngine(error=ValueError("bad key")),
+    })
+
+    with pytest.raises(HTTPException) as excinfo:
+        await router.generate_sql("question", {})
+    assert excinfo.value.status_code == 502
+    assert "a: down" in excinfo.value.detail
+    assert "b: bad key" in excinfo.value.detail
+
+
+async def test_hedged_failure_falls_back_to_remaining_provider():
+    failing = FakeEngine(latency=0.1, error=RuntimeError("boom"))
+    hedge = FakeEngine(latency=0.2, error=RuntimeError("boom too"))
+    last = FakeEngine("SELECT 'last'")
+    router = RoutingLLMEngine({"failing": failing, "hedge": hedge, "last": last}, hedge_delay=0.05)
+
+    assert await router.generate_sql("question", {}) == "SELECT 'last'"
+    assert (failing.calls, hedge.calls, last.calls) == (1, 1, 1)
+
+
+def test_ranking_prefers_unmeasured_then_fastest_then_unhealthy():
+    engines = {name: FakeEngine() for name in ("slow", "fast", "new", "failing")}
+    router = RoutingLLMEngine(engines)
+    for _ in range(5):
+        router.stats["slow"].record_success(0.5)
+        router.stats["fast"].record_success(0.1)
+        router.stats["failing"].record_failure()
+
+    assert router.ranked_providers() == ["new", "fast", "slow", "failing"]
+
+
+def test_unhealthy_provider_recovers_after_cooldown():
+    stats = ProviderStats(min_samples=2, max_error_rate=0.5, cooldown=10.0)
+    stats.record_failure()
+    stats.record_failure()
+    assert not stats.healthy
+    stats.last_failure_at -= 11.0
+    assert stats.healthy
+
+
+def test_needs_at_least_one_engine():
+    with pytest.raises(ValueError):
+        RoutingLLMEngine({})
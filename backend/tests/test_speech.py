@@ -0,0 +1,135 @@
+import asyncio
+import sys
+from typing import Dict, List, Optional
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.query import query_router
+from app.core.config import settings
+from app.services import speech
+from app.services.speech import BaseRecognizer, RecognizerStream, StreamingTranscription, _BufferedStream
+
+# Stands in for ffmpeg: copies the container on stdin to "PCM" on stdout
+COPY_COMMAND = [sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer, 4096)"]
+
+
+class CountingStream(RecognizerStream):
+    """A `partial` event per second of audio, and a `final` one with the byte count on finish."""
+
+    def __init__(self, sample_rate: int):
+        self.second = sample_rate * speech.SAMPLE_WIDTH
+        self.received = 0
+
+    def accept(self, pcm: bytes) -> Optional[Dict[str, str]]:
+        before = self.received // self.second
+        self.received += len(pcm)
+        if self.received // self.second > before:
+            return {"type": "partial", "text": f"{self.received // self.second}s"}
+        return None
+
+    def finish(self) -> Optional[Dict[str, str]]:
+        return {"type": "final", "text": f"{self.received} bytes"}
+
+
+class CountingRecognizer(BaseRecognizer):
+    name = "counting"
+
+    def stream(self, sample_rate: int) -> RecognizerStream:
+        return CountingStream(sample_rate)
+
+
+class CappedRecognizer(BaseRecognizer):
+    """Buffers like the Google recognizer, with a 1000-byte limit."""
+
+    name = "capped"
+
+    def stream(self, sample_rate: int) -> RecognizerStream:
+        return _BufferedStream(self, sample_rate, 1000)
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        return f"{len(pcm)} bytes"
+
+
+async def drain(transcription: StreamingTranscription) -> List[Dict[str, str]]:
+    events = []
+    while (event := await transcription.events.get()) is not None:
+        events.append(event)
+    return events
+
+
+def test_decoding_is_killed_after_the_clip_length_limit(monkeypatch):
+    # Stands in for an ffmpeg that never finishes (e.g. stuck on a crafted upload)
+    monkeypatch.setattr(speech, "_ffmpeg_command", lambda sample_rate: [sys.executable, "-c", "import time; time.sleep(30)"])
+    monkeypatch.setattr(settings, "SPEECH_MAX_SECONDS", 0.2)
+
+    with pytest.raises(HTTPException) as excinfo:
+        speech.decode_audio(b"\x1aE\xdf\xa3", "audio/webm", 16000)
+    assert excinfo.value.status_code == 422
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("input_format", ["pcm", "webm"])
+async def test_streaming_transcription_emits_partial_final_and_done(monkeypatch, input_format):
+    monkeypatch.setattr(speech, "_ffmpeg_command", lambda sample_rate: COPY_COMMAND)
+    transcription = StreamingTranscription(CountingRecognizer(), 16000, input_format)
+    await transcription.start()
+    try:
+        for _ in range(5):
+            await transcription.feed(b"\0" * 16000)
+        await transcription.finish()
+    finally:
+        await transcription.close()
+
+    events = await drain(transcription)
+    assert {"type": "partial", "text": "2s"} in events
+    assert events[-2:] == [{"type": "final", "text": "80000 bytes"}, {"type": "done", "text": "80000 bytes"}]
+
+
+@pytest.mark.anyio
+async def test_decoded_stream_over_the_limit_stops_ffmpeg(monkeypatch):
+    monkeypatch.setattr(speech, "_ffmpeg_command", lambda sample_rate: COPY_COMMAND)
+    transcription = StreamingTranscription(CappedRecognizer(), 16000, "webm")
+    await transcription.start()
+    process = transcription._process
+
+    with pytest.raises(HTTPException) as excinfo:
+        for _ in range(100):
+            await asyncio.wait_for(transcription.feed(b"\0" * 65536), 5)
+    await asyncio.wait_for(transcription.close(), 5)
+
+    assert excinfo.value.status_code == 413
+    assert process.returncode is not None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = FastAPI()
+    app.include_router(query_router, prefix="/api/v1/query")
+
+    def use(recognizer: BaseRecognizer):
+        monkeypatch.setattr(speech, "_recognizer", recognizer)
+        return TestClient(app)
+    return use
+
+
+def test_websocket_streams_events_until_done(client):
+    with client(CountingRecognizer()).websocket_connect("/api/v1/query/speech-stream") as websocket:
+        for _ in range(3):
+            websocket.send_bytes(b"\0" * 32000)
+        websocket.send_text("end")
+        events = [websocket.receive_json() for _ in range(5)]
+
+    assert [event["type"] for event in events] == ["partial", "partial", "partial", "final", "done"]
+    assert events[-1]["text"] == "96000 bytes"
+
+
+def test_websocket_reports_errors_and_closes(client):
+    with client(CappedRecognizer()).websocket_connect("/api/v1/query/speech-stream") as websocket:
+        websocket.send_bytes(b"\0" * 2000)
+        event = websocket.receive_json()
+        message = websocket.receive()
+
+    assert event == {"type": "error", "detail": "Audio stream exceeds the maximum utterance length."}
+    assert message == {"type": "websocket.close", "code": 1011, "reason": ""}
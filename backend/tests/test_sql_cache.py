@@ -0,0 +1,103 @@
+import sqlite3
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.db import DatabaseManager
+from app.core.config import settings
+from app.llm.base import BaseLLMEngine
+from app.llm.cache import SQLCache
+from app.services import query_service
+
+pytestmark = pytest.mark.anyio
+
+
+class CannedEngine(BaseLLMEngine):
+    """Answers every question with `sql`; repairs with `repairs`, in order."""
+
+    def __init__(self, sql: str, repairs: List[str] = ()):
+        super().__init__("canned")
+        self.sql = sql
+        self.repairs = list(repairs)
+        self.requests: List[Dict[str, Any]] = []
+
+    async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        return self.sql
+
+    async def repair_sql(self, natural_language_query, db_schema, failed_sql, error, variant=0) -> str:
+        self.requests.append({"failed_sql": failed_sql, "error": error})
+        return self.repairs.pop(0)
+
+
+async def test_persists_entries_across_restarts(tmp_path):
+    path = str(tmp_path / "sql_cache.db")
+    cache = SQLCache(db_path=path)
+    await cache.put("How many items?", "fp", "groq", "m", "SELECT count(*) FROM items")
+
+    restarted = SQLCache(db_path=path)
+    hit = await restarted.get("how many items", "fp", "groq", "m")
+    assert hit is not None and hit.sql == "SELECT count(*) FROM items"
+
+    await restarted.clear()
+    assert await SQLCache(db_path=path).get("how many items", "fp", "groq", "m") is None
+
+
+@pytest.fixture
+async def pipeline(tmp_path, monkeypatch):
+    path = tmp_path / "items.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.commit()
+    connection.close()
+    manager = DatabaseManager(f"sqlite:///{path}", result_cache_ttl=0)
+    await manager.connect()
+    await manager.fetch_schema()
+    cache = SQLCache()
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_GUARD_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_REPAIR_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(settings, "SQL_REPAIR_CANDIDATES", 1)
+    monkeypatch.setattr("app.llm.cache.sql_cache", cache)
+    monkeypatch.setattr(query_service, "sql_cache", cache)
+
+    def use(engine: BaseLLMEngine):
+        monkeypatch.setattr(query_service, "get_llm_engine", lambda provider: engine)
+
+    yield manager, cache, use
+    await manager.disconnect()
+
+
+async def cached_sql(manager: DatabaseManager, cache: SQLCache, question: str):
+    hit = await cache.get(question, manager.schema_fingerprint, "canned", "canned")
+    return hit.sql if hit is not None else None
+
+
+async def test_sql_is_cached_after_it_runs(pipeline):
+    manager, cache, use = pipeline
+    use(CannedEngine("SELECT count(*) AS n FROM items"))
+
+    await query_service._generate_sql(manager, "canned", "how many items", 100, execute=manager.execute_query)
+
+    assert await cached_sql(manager, cache, "how many items") == "SELECT count(*) AS n FROM items"
+
+
+async def test_refused_sql_is_not_cached(pipeline):
+    manager, cache, use = pipeline
+    use(CannedEngine("DELETE FROM items"))
+
+    with pytest.raises(HTTPException):
+        await query_service._generate_sql(manager, "canned", "remove the items", 100, execute=manager.execute_query)
+
+    assert await cached_sql(manager, cache, "remove the items") is None
+
+
+async def test_failing_sql_is_not_cached_but_its_repair_is(pipeline):
+    manager, cache, use = pipeline
+    engine = CannedEngine("SELECT * FROM itemz", repairs=["SELECT * FROM items"])
+    use(engine)
+
+    await query_service._generate_sql(manager, "canned", "list items", 100, execute=manager.execute_query)
+
+    assert engine.requests[0]["failed_sql"] == "SELECT * FROM itemz"
+    assert await cached_sql(manager, cache, "list items") == "SELECT * FROM items"
@@ -0,0 +1,168 @@
+import sqlite3
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.db import DatabaseManager, QueryError
+from app.core.config import settings
+from app.llm.base import BaseLLMEngine
+from app.services.sql_repair import run_with_repair
+
+pytestmark = pytest.mark.anyio
+
+GOOD_SQL = "SELECT count(*) AS n FROM items"
+
+
+class ScriptedRepairEngine(BaseLLMEngine):
+    """Answers repair requests from `rounds`: one list of candidates (indexed by variant) per round."""
+
+    def __init__(self, rounds: List[List[str]]):
+        super().__init__("scripted")
+        self.rounds = rounds
+        self.requests: List[Dict[str, Any]] = []
+
+    async def generate_sql(self, natural_language_query: str, db_schema: Dict[str, Any]) -> str:
+        raise AssertionError("run_with_repair should only ask for repairs")
+
+    async def repair_sql(self, natural_language_query, db_schema, failed_sql, error, variant=0) -> str:
+        round_index = sum(1 for request in self.requests if request["variant"] == variant)
+        self.requests.append({"failed_sql": failed_sql, "error": error, "variant": variant})
+        answer = self.rounds[round_index][variant]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+async def db_manager(tmp_path):
+    path = tmp_path / "repair.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.execute("INSERT INTO items (name) VALUES ('a'), ('b')")
+    connection.commit()
+    connection.close()
+    manager = DatabaseManager(f"sqlite:///{path}", result_cache_ttl=0)
+    await manager.connect()
+    yield manager
+    await manager.disconnect()
+
+
+@pytest.fixture
+def repair_settings(monkeypatch):
+    def configure(max_attempts: int = 2, candidates: int = 1):
+        monkeypatch.setattr(settings, "SQL_GUARD_ENABLED", True)
+        monkeypatch.setattr(settings, "SQL_REPAIR_MAX_ATTEMPTS", max_attempts)
+        monkeypatch.setattr(settings, "SQL_REPAIR_CANDIDATES", candidates)
+    return configure
+
+
+async def test_valid_sql_needs_no_repair(db_manager, repair_settings):
+    repair_settings()
+    engine = ScriptedRepairEngine([])
+
+    outcome = await run_with_repair(db_manager, engine, "how many items", {}, GOOD_SQL, 100, db_manager.execute_query)
+
+    assert outcome.result["results"] == [{"n": 2}]
+    assert outcome.report["rounds"] == 0
+    assert not outcome.report["repaired"]
+    assert engine.requests == []
+
+
+async def test_repairs_with_the_database_error(db_manager, repair_settings):
+    repair_settings()
+    engine = ScriptedRepairEngine([[GOOD_SQL]])
+
+    outcome = await run_with_repair(
+        db_manager, engine, "how many items", {}, "SELECT count(*) AS n FROM itemz", 100, db_manager.execute_query
+    )
+
+    assert outcome.candidate == GOOD_SQL
+    assert outcome.result["results"] == [{"n": 2}]
+    assert outcome.report["repaired"]
+    assert (outcome.report["rounds"], outcome.report["attempts"]) == (1, 2)
+    assert engine.requests[0]["failed_sql"] == "SELECT count(*) AS n FROM itemz"
+    assert "itemz" in engine.requests[0]["error"]
+
+
+async def test_later_round_repairs_the_previous_candidate(db_manager, repair_settings):
+    repair_settings(max_attempts=3)
+    engine = ScriptedRepairEngine([["SELECT nope FROM items"], [GOOD_SQL]])
+
+    outcome = await run_with_repair(db_manager, engine, "q", {}, "SELECT * FROM itemz", 100, db_manager.execute_query)
+
+    assert outcome.candidate == GOOD_SQL
+    assert outcome.report["rounds"] == 2
+    assert len(outcome.report["errors"]) == 2
+    # Each round repairs the candidate that failed last, not the original SQL
+    assert engine.requests[1]["failed_sql"] == "SELECT nope FROM items"
+
+
+async def test_gives_up_after_max_rounds(db_manager, repair_settings):
+    repair_settings(max_attempts=2)
+    engine = ScriptedRepairEngine([["SELECT * FROM itemz2"], ["SELECT * FROM itemz3"], [GOOD_SQL]])
+
+    with pytest.raises(QueryError) as excinfo:
+        await run_with_repair(db_manager, engine, "q", {}, "SELECT * FROM itemz", 100, db_manager.execute_query)
+    assert "itemz3" in excinfo.value.error
+    assert len(engine.requests) == 2
+
+
+async def test_candidates_are_deduplicated_and_run_one_at_a_time(db_manager, repair_settings):
+    repair_settings(candidates=4)
+    failed_sql = "SELECT * FROM itemz"
+    second = "SELECT name FROM items"
+    engine = ScriptedRepairEngine([[failed_sql, GOOD_SQL, GOOD_SQL, second]])
+    executed = []
+    running = 0
+
+    async def execute(sql: str):
+        nonlocal running
+        running += 1
+        try:
+            assert running == 1, "candidates must not execute concurrently"
+            executed.append(sql)
+            if "COUNT" in sql.upper():
+                raise QueryError("Query execution failed: busy", "busy")
+            return await db_manager.execute_query(sql)
+        finally:
+            running -= 1
+
+    outcome = await run_with_repair(db_manager, engine, "q", {}, failed_sql, 100, execute)
+
+    # The original SQL and the duplicate are dropped; a candidate failing to run falls through to the next
+    assert [request["variant"] for request in engine.requests] == [0, 1, 2, 3]
+    assert outcome.report["attempts"] == 3
+    assert outcome.candidate == second
+    assert executed[-1] == outcome.sql
+    assert len(executed) <= 2
+
+
+async def test_first_passing_candidate_wins(db_manager, repair_settings):
+    repair_settings(candidates=2)
+    engine = ScriptedRepairEngine([["SELECT nope FROM items", GOOD_SQL]])
+
+    outcome = await run_with_repair(db_manager, engine, "q", {}, "SELECT * FROM itemz", 100, db_manager.execute_query)
+
+    assert outcome.candidate == GOOD_SQL
+    assert outcome.report["rounds"] == 1
+    assert outcome.report["errors"][0] == "no such table: itemz"
+
+
+async def test_failed_repair_requests_are_skipped(db_manager, repair_settings):
+    repair_settings(candidates=2)
+    engine = ScriptedRepairEngine([[RuntimeError("provider down"), GOOD_SQL]])
+
+    outcome = await run_with_repair(db_manager, engine, "q", {}, "SELECT * FROM itemz", 100, db_manager.execute_query)
+
+    assert outcome.candidate == GOOD_SQL
+
+
+async def test_refusals_are_not_repaired(db_manager, repair_settings):
+    repair_settings()
+    engine = ScriptedRepairEngine([[GOOD_SQL]])
+
+    with pytest.raises(HTTPException) as excinfo:
+        await run_with_repair(db_manager, engine, "q", {}, "DELETE FROM items", 100, db_manager.execute_query)
+    assert not isinstance(excinfo.value, QueryError)
+    assert engine.requests == []
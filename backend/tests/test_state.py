@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sqlite3
+import stat
+
+import pytest
+
+from app.api.v1.db import ConnectionRegistry
+from app.core.state import MemoryStateStore, SQLiteStateStore
+from app.llm.cache import SQLCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStateStore() if request.param == "memory" else SQLiteStateStore(str(tmp_path / "state.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.state.time.time", lambda: now[0])
+    return now
+
+
+def test_namespaces_hold_separate_keys(store):
+    store.set("a", "key", "1")
+    store.set("b", "key", "2")
+
+    assert (store.get("a", "key"), store.get("b", "key"), store.get("a", "missing")) == ("1", "2", None)
+    assert store.delete("a", "key")
+    assert not store.delete("a", "key")
+    store.clear("b")
+    assert store.get("b", "key") is None
+
+
+def test_entries_expire_and_touch_restarts_the_ttl(store, clock):
+    store.set("ns", "short", "1", 10)
+    store.set("ns", "touched", "2", 10)
+    store.set("ns", "forever", "3")
+
+    clock[0] += 8
+    assert store.touch("ns", "touched", 10)
+    clock[0] += 5
+
+    assert store.get("ns", "short") is None
+    assert not store.touch("ns", "short", 10)
+    assert store.get("ns", "touched") == "2"
+    assert store.get("ns", "forever") == "3"
+    assert not store.touch("ns", "missing", 10)
+    clock[0] += 10
+    # The memory store already dropped `short` when it was read
+    assert store.purge() == (1 if isinstance(store, MemoryStateStore) else 2)
+    assert store.purge() == 0
+    assert store.get("ns", "forever") == "3"
+
+
+@pytest.mark.anyio
+async def test_submitted_writes_run_in_order(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.sqlite"))
+    assert store._last_submitted is None
+
+    for value in range(20):
+        store.submit(store.set, "ns", "key", str(value), None, action="write")
+    await asyncio.wait([store._last_submitted])
+
+    assert store.get("ns", "key") == "19"
+
+
+def test_submit_without_a_loop_runs_inline():
+    store = MemoryStateStore()
+    store.submit(store.set, "ns", "key", "value", None, action="write")
+
+    assert store.get("ns", "key") == "value"
+    assert store._last_submitted is None
+
+
+def test_sqlite_store_is_private_and_seen_by_every_worker(tmp_path):
+    path = str(tmp_path / "private" / "state.sqlite")
+    first, second = SQLiteStateStore(path), SQLiteStateStore(path)
+    try:
+        first.set("session", "token", "{}")
+
+        assert second.get("session", "token") == "{}"
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.anyio
+async def test_sessions_move_between_workers(tmp_path):
+    path = tmp_path / "items.db"
+    sqlite3.connect(path).close()
+    state = str(tmp_path / "state.sqlite")
+    first = ConnectionRegistry(store=SQLiteStateStore(state), sync_interval=0)
+    second = ConnectionRegistry(store=SQLiteStateStore(state), sync_interval=0)
+    try:
+        session_id = await first.connect(f"sqlite:///{path}")
+
+        # The other worker opens its own connection from the shared metadata
+        manager = await second.get(session_id)
+        assert manager is not None and manager is not await first.get(session_id)
+        assert second.adoptions == 1
+
+        # Reaping it on one worker only releases that worker's connection
+        second._sessions[session_id].last_used -= second.idle_timeout + 1
+        assert await second.reap() == 1
+        assert not manager.connected
+        manager = await second.get(session_id)
+        assert manager is not None and second.adoptions == 2
+
+        # Disconnecting ends it everywhere
+        assert await first.disconnect(session_id)
+        assert await second.get(session_id) is None
+        assert not manager.connected
+    finally:
+        await first.close_all()
+        await second.close_all()
+
+
+@pytest.mark.anyio
+async def test_sql_cache_entries_are_shared(tmp_path):
+    state = str(tmp_path / "state.sqlite")
+    first, second = SQLCache(store=SQLiteStateStore(state)), SQLCache(store=SQLiteStateStore(state))
+
+    await first.put("How many items?", "fp", "groq", "m", "SELECT count(*) FROM items")
+    await asyncio.wait([first.store._last_submitted])
+
+    hit = await second.get("how many items", "fp", "groq", "m")
+    assert hit is not None and hit.sql == "SELECT count(*) FROM items"
+    # Not shared through a store only this process sees
+    assert SQLCache(store=MemoryStateStore()).store is None
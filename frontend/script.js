@@ -17,6 +17,11 @@ document.addEventListener('DOMContentLoaded', () => {
     const tabButtons = document.querySelectorAll('.tab-btn');
     const tabPanes = document.querySelectorAll('.tab-pane');
 
+    // Result pager: the server-side result handle and the cursors of the pages shown so far
+    const PAGE_SIZE = 100;
+    let resultHandle = null;
+    let pageCursors = [];
+
     // Speech recognition variables
     let mediaRecorder;
     let audioChunks = [];
@@ -26,6 +31,13 @@ document.addEventListener('DOMContentLoaded', () => {
     const API_BASE_URL = '/api/v1';
     console.log('EasyQuery frontend running. API_BASE_URL =', API_BASE_URL);
 
+    // Session token issued by the backend on connect; sent with every request
+    let sessionId = sessionStorage.getItem('easyquery_session_id');
+
+    function sessionHeaders(headers = {}) {
+        return sessionId ? { ...headers, 'X-Session-ID': sessionId } : headers;
+    }
+
     // Initialize tab functionality
     function initTabs() {
         tabButtons.forEach(button => {
@@ -91,14 +103,16 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log('Requesting', url);
             const response = await fetch(url, {
                 method: 'POST',
-                headers: {
+                headers: sessionHeaders({
                     'Content-Type': 'application/json'
-                },
+                }),
                 body: JSON.stringify({ db_url: dbUrl })
             });
             const data = await response.json();
 
             if (response.ok) {
+                sessionId = data.session_id;
+                sessionStorage.setItem('easyquery_session_id', sessionId);
                 updateStatus(connectionStatus, `Connected to ${data.db_url}`, 'success');
                 fetchSchema(); // Fetch schema on successful connection
             } else {
@@ -113,7 +127,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- Fetch Database Schema ---
     async function fetchSchema() {
         try {
-            const response = await fetch(`${API_BASE_URL}/query/schema`);
+            const response = await fetch(`${API_BASE_URL}/query/schema`, {
+                headers: sessionHeaders()
+            });
             const data = await response.json();
 
             if (response.ok) {
@@ -143,30 +159,160 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
-        updateStatus(queryResults, 'Executing query...', 'info');
+        updateStatus(queryResults, 'Generating SQL...', 'info');
 
         try {
-            const response = await fetch(`${API_BASE_URL}/query/query`, {
+            // Server-Sent Events: LLM tokens as they arrive, then the SQL, then the result
+            const response = await fetch(`${API_BASE_URL}/query/stream`, {
                 method: 'POST',
-                headers: {
+                headers: sessionHeaders({
                     'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ query_text: queryText, llm_provider: provider })
+                }),
+                // The result stays on the server; only its first page comes back
+                body: JSON.stringify({
+                    query_text: queryText, llm_provider: provider, page_size: PAGE_SIZE, row_format: 'compact'
+                })
             });
-            const data = await response.json();
 
-            if (response.ok) {
-                queryResults.textContent = JSON.stringify(data.results, null, 2);
-                queryResults.style.color = 'var(--text-color, var(--dark-color))';
-            } else {
+            if (!response.ok) {
+                const data = await response.json();
                 updateStatus(queryResults, `Query failed: ${data.detail || data.message}`, 'error');
+                return;
             }
+            releaseResult();
+
+            let generated = '';
+            await readEventStream(response, (event, data) => {
+                if (event === 'token') {
+                    generated += data.text;
+                    queryResults.textContent = generated;
+                } else if (event === 'sql') {
+                    updateStatus(queryResults, `Executing query...\n\n${data.sql_query}`, 'info');
+                } else if (event === 'result') {
+                    if (data.page) {
+                        resultHandle = data.page.handle_id;
+                        pageCursors = [null];
+                        renderResultPage(data);
+                    } else {
+                        queryResults.textContent = JSON.stringify(data.results, null, 2);
+                    }
+                    queryResults.style.color = 'var(--text-color, var(--dark-color))';
+                } else if (event === 'error') {
+                    updateStatus(queryResults, `Query failed: ${data.detail}`, 'error');
+                }
+            });
         } catch (error) {
             console.error('Error executing query:', error);
             updateStatus(queryResults, `Query error: ${error.message}`, 'error');
         }
     });
 
+    // --- Result Pager ---
+    function renderResultPage(data) {
+        const { columns, rows } = data.results;
+        const page = data.page;
+        updateStatus(queryResults, '', null);
+
+        const table = document.createElement('table');
+        table.className = 'result-table';
+        const headerRow = table.createTHead().insertRow();
+        columns.forEach(column => {
+            const th = document.createElement('th');
+            th.textContent = column;
+            headerRow.appendChild(th);
+        });
+        const body = table.createTBody();
+        rows.forEach(row => {
+            const tr = body.insertRow();
+            row.forEach(value => {
+                tr.insertCell().textContent = value === null ? 'NULL' : String(value);
+            });
+        });
+
+        const pager = document.createElement('div');
+        pager.className = 'result-pager';
+        const label = document.createElement('span');
+        const total = page.total.exact ? page.total.rows : `~${page.total.rows}${page.total.source === 'lower_bound' ? '+' : ''}`;
+        label.textContent = page.rows
+            ? `Rows ${page.offset + 1}–${page.offset + page.rows} of ${total}`
+            : `No rows (of ${total})`;
+        const prev = document.createElement('button');
+        prev.className = 'btn btn-secondary';
+        prev.textContent = 'Prev';
+        prev.disabled = pageCursors.length < 2;
+        prev.addEventListener('click', () => {
+            pageCursors.pop();
+            loadResultPage(pageCursors[pageCursors.length - 1], false);
+        });
+        const next = document.createElement('button');
+        next.className = 'btn btn-secondary';
+        next.textContent = 'Next';
+        next.disabled = !page.next_cursor;
+        next.addEventListener('click', () => loadResultPage(page.next_cursor, true));
+        pager.append(prev, label, next);
+
+        queryResults.replaceChildren(pager, table);
+        if (page.error) {
+            const warning = document.createElement('div');
+            warning.className = 'error';
+            warning.textContent = `Reading the result stopped early: ${page.error}`;
+            queryResults.appendChild(warning);
+        }
+    }
+
+    async function loadResultPage(cursor, forward) {
+        const params = new URLSearchParams({ limit: PAGE_SIZE, row_format: 'compact' });
+        if (cursor) params.set('cursor', cursor);
+        try {
+            const response = await fetch(`${API_BASE_URL}/query/results/${resultHandle}?${params}`, {
+                headers: sessionHeaders()
+            });
+            const data = await response.json();
+            if (!response.ok) {
+                updateStatus(queryResults, `Could not load rows: ${data.detail || data.message}`, 'error');
+                return;
+            }
+            if (forward) pageCursors.push(cursor);
+            renderResultPage(data);
+        } catch (error) {
+            console.error('Error loading result page:', error);
+            updateStatus(queryResults, `Could not load rows: ${error.message}`, 'error');
+        }
+    }
+
+    // Free the previous result on the server when a new query replaces it
+    function releaseResult() {
+        if (!resultHandle) return;
+        fetch(`${API_BASE_URL}/query/results/${resultHandle}`, { method: 'DELETE', headers: sessionHeaders() })
+            .catch(() => {});
+        resultHandle = null;
+        pageCursors = [];
+    }
+
+    // Parse a text/event-stream response body, calling onEvent(eventName, parsedData) per event
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     // --- Speech Recognition ---
     startSpeechButton.addEventListener('click', async () => {
         const { provider } = getLlmConfig();